@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FormBuilderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'form_builder'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='schema_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='نسخه ساختار فرم'),
+        ),
+    ]
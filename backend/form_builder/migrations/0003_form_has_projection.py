@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0002_form_schema_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='has_projection',
+            field=models.BooleanField(default=False, editable=False, verbose_name='دارای جدول تخت گزارش'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0003_form_has_projection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='تاریخ ویرایش'),
+            preserve_default=False,
+        ),
+    ]
@@ -12,8 +12,14 @@ class Form(models.Model):
     name = models.CharField(max_length=100, verbose_name="نام فرم")
     form_type = models.CharField(max_length=20, choices=FORM_TYPE_CHOICES, default='SINGLE_SECTION', verbose_name="نوع فرم")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ایجاد")
+    # همراه schema_version به‌روز می‌شود و Last-Modified تعریف فرم است
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ ویرایش")
     display_order = models.PositiveIntegerField(default=10, verbose_name="ترتیب نمایش")
     color = models.CharField(max_length=7, default="#FFFFFF", verbose_name="کد رنگ هگزادسیمال")
+    # با هر تغییر در تعریف فرم یا فیلدهایش یکی زیاد می‌شود (form_builder/signals.py) و کلید کش ساختار فرم است
+    schema_version = models.PositiveIntegerField(default=1, editable=False, verbose_name="نسخه ساختار فرم")
+    # جدول تخت گزارش‌گیری (records.RecordProjection) فقط با دستور rebuild_projections فعال می‌شود
+    has_projection = models.BooleanField(default=False, editable=False, verbose_name="دارای جدول تخت گزارش")
 
     def __str__(self):
         return self.name
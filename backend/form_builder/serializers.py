@@ -3,6 +3,7 @@
 from rest_framework import serializers
 from .models import Form, Field
 from django.db.models import Q
+from records.formulas import FormulaError, compile_formula
 
 class FieldSerializer(serializers.ModelSerializer):
     can_delete = serializers.SerializerMethodField()
@@ -30,13 +31,20 @@ class FieldSerializer(serializers.ModelSerializer):
     def _get_delete_reasons(self, obj: Field) -> list:
         reasons = []
         # شرط ۱: فرم نباید هیچ رکوردی داشته باشد
-        if obj.form.records.exists():
+        # ویوها این مقادیر را annotate می‌کنند؛ در غیر این صورت (مثلاً بعد از ایجاد فیلد) کوئری زده می‌شود
+        has_records = getattr(obj, 'form_has_records', None)
+        if has_records is None:
+            record_count = getattr(obj.form, 'record_count', None)
+            has_records = record_count > 0 if record_count is not None else obj.form.records.exists()
+        if has_records:
             reasons.append("فرم دارای رکورد ثبت شده است.")
         
         # شرط ۲: این فیلد نباید در هیچ فیلد لوکاپ دیگری استفاده شده باشد
-        is_used_in_lookup = Field.objects.filter(
-            Q(lookup_reference_field=obj) | Q(lookup_display_field=obj)
-        ).exclude(pk=obj.pk).exists()
+        is_used_in_lookup = getattr(obj, 'is_used_in_lookup', None)
+        if is_used_in_lookup is None:
+            is_used_in_lookup = Field.objects.filter(
+                Q(lookup_reference_field=obj) | Q(lookup_display_field=obj)
+            ).exclude(pk=obj.pk).exists()
 
         if is_used_in_lookup:
             reasons.append("این فیلد در تنظیمات یک فیلد لوکاپ دیگر استفاده شده است.")
@@ -57,6 +65,13 @@ class FieldSerializer(serializers.ModelSerializer):
             if not data.get('lookup_reference_field'):
                 raise serializers.ValidationError("برای فیلدهای نوع لوکاپ نمایشی، تعیین فیلد لوکاپ وابسته اجباری است.")
 
+        # فرمول فیلد محاسباتی همان‌جا پارس می‌شود تا فرمول نامعتبر ذخیره نشود
+        if data.get('is_computed') and data.get('computation_formula'):
+            try:
+                compile_formula(data['computation_formula'], data.get('computation_level') != 'ITEM')
+            except FormulaError as e:
+                raise serializers.ValidationError({'computation_formula': str(e)})
+
         return data
 
 
@@ -73,9 +88,14 @@ class FormSerializer(serializers.ModelSerializer):
         ]
 
     def get_record_count(self, obj):
+        record_count = getattr(obj, 'record_count', None)
+        if record_count is not None:
+            return record_count
         return obj.records.count()
 
     def get_last_record_date(self, obj):
+        if hasattr(obj, 'last_record_date'):
+            return obj.last_record_date
         last_record = obj.records.order_by('-created_at').first()
         if last_record:
             return last_record.created_at
@@ -0,0 +1,57 @@
+# backend/form_builder/signals.py
+
+from django.db.models import F, Q
+from django.db.models.functions import Now
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Form, Field
+
+
+def bump_schema_version(form_ids) -> None:
+    """نسخه ساختار فرم‌ها را زیاد می‌کند تا کش ساختار آن‌ها (records/schema.py) باطل شود."""
+    form_ids = {form_id for form_id in form_ids if form_id}
+    if form_ids:
+        Form.objects.filter(pk__in=form_ids).update(schema_version=F('schema_version') + 1, updated_at=Now())
+
+
+def _affected_form_ids(field: Field, previous_targets=()) -> set:
+    # فرم‌هایی که لوکاپ‌شان به این فیلد اشاره می‌کند مشخصات آن را در کش خود دارند،
+    # و فرم مرجع لوکاپ این فیلد (و فرم مرجع قبلی، اگر لوکاپ به فرم دیگری منتقل شده) فهرست لوکاپ‌های ورودی را
+    target_ids = [pk for pk in (field.lookup_reference_field_id, field.lookup_display_field_id, *previous_targets) if pk]
+    related = Field.objects.filter(Q(lookup_reference_field=field) | Q(lookup_display_field=field) | Q(pk__in=target_ids))
+    return {field.form_id} | set(related.values_list('form_id', flat=True))
+
+
+@receiver(pre_save, sender=Form)
+def form_pre_save(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        instance.schema_version = F('schema_version') + 1
+
+
+@receiver(post_save, sender=Form)
+def form_post_save(sender, instance, **kwargs):
+    # مقدار F() بعد از ذخیره روی نمونه می‌ماند؛ مقدار واقعی دوباره خوانده می‌شود
+    if not isinstance(instance.schema_version, int):
+        instance.refresh_from_db(fields=['schema_version'])
+
+
+@receiver(pre_save, sender=Field)
+def field_pre_save(sender, instance, raw=False, **kwargs):
+    # جفت (فیلد مرجع، فیلد نمایشی) ذخیره‌شده قبلی برای گیرنده‌های post_save (فرم مرجع قبلی، ایندکس جستجوی لوکاپ)
+    previous = None
+    if instance.pk and not raw:
+        previous = Field.objects.filter(pk=instance.pk).values_list('lookup_reference_field_id', 'lookup_display_field_id').first()
+    instance._previous_lookup_pair = previous or (None, None)
+
+
+@receiver(post_save, sender=Field)
+def field_post_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_schema_version(_affected_form_ids(instance, getattr(instance, '_previous_lookup_pair', ())))
+
+
+@receiver(pre_delete, sender=Field)
+def field_pre_delete(sender, instance, **kwargs):
+    # در pre_delete ارجاعات لوکاپ هنوز SET_NULL نشده‌اند؛ حذف و افزایش نسخه در یک تراکنش هستند
+    bump_schema_version(_affected_form_ids(instance))
@@ -0,0 +1,51 @@
+# backend/form_builder/tests.py
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Field, Form
+
+# لیست فرم‌ها: یک کوئری ETag (نسخه و آمار رکوردهای فرم‌ها) + یک کوئری فرم‌ها (با تعداد و تاریخ آخرین رکورد)
+# + یک کوئری فیلدها (با وضعیت استفاده در لوکاپ)
+FORM_LIST_MAX_QUERIES = 3
+# لیست فیلدهای یک فرم: یک کوئری فیلدها با هر دو شرط حذف
+FIELD_LIST_MAX_QUERIES = 1
+
+
+class FormListQueryTests(TestCase):
+    """تعداد کوئری لیست فرم‌ها و فیلدها نباید به تعداد فرم یا فیلد وابسته باشد."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create(username='tester')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _add_forms(self, count):
+        for index in range(count):
+            form = Form.objects.create(code=f'form{Form.objects.count()}', name=f'فرم {index}')
+            code = Field.objects.create(form=form, code='code', name='کد', field_type='NUMBER')
+            name = Field.objects.create(form=form, code='name', name='نام', field_type='TEXT')
+            Field.objects.create(form=form, code='self', name='ارجاع', field_type='LOOKUP',
+                                 lookup_form=form, lookup_reference_field=code, lookup_display_field=name)
+        return form
+
+    def test_form_list(self):
+        self._add_forms(1)
+        with self.assertNumQueries(FORM_LIST_MAX_QUERIES):
+            self.assertEqual(self.client.get('/api/forms/').status_code, 200)
+        self._add_forms(5)
+        with self.assertNumQueries(FORM_LIST_MAX_QUERIES):
+            response = self.client.get('/api/forms/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 6)
+
+    def test_field_list(self):
+        form = self._add_forms(1)
+        with self.assertNumQueries(FIELD_LIST_MAX_QUERIES):
+            response = self.client.get(f'/api/forms/{form.pk}/fields/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
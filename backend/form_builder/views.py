@@ -1,45 +1,105 @@
 # backend/form_builder/views.py
 
-from django.db.models import Max, Q
+from django.db.models import Count, Exists, Max, OuterRef, Prefetch, Q
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from raveshgostar_back.conditional import conditional_get
+from raveshgostar_back.profiling import ProfiledViewMixin
+from raveshgostar_back.routing import ReplicaReadMixin
 from .models import Form, Field
 from .serializers import FormSerializer, FormCreateUpdateSerializer, FieldSerializer
 
-class FormViewSet(viewsets.ModelViewSet):
-    queryset = Form.objects.all().prefetch_related('fields')
+def annotate_field_usage(queryset):
+    """قابل حذف بودن هر فیلد (استفاده در لوکاپ دیگر) را با یک زیرکوئری EXISTS در همان کوئری فیلدها حساب می‌کند."""
+    used_in_lookup = Field.objects.filter(
+        Q(lookup_reference_field=OuterRef('pk')) | Q(lookup_display_field=OuterRef('pk'))
+    ).exclude(pk=OuterRef('pk'))
+    return queryset.annotate(is_used_in_lookup=Exists(used_in_lookup))
+
+
+class FormViewSet(ProfiledViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
+    # تعداد و تاریخ آخرین رکورد و وضعیت فیلدها با annotate محاسبه می‌شوند تا تعداد کوئری لیست ثابت بماند
+    queryset = Form.objects.annotate(
+        record_count=Count('records'),
+        last_record_date=Max('records__created_at'),
+    ).prefetch_related(Prefetch('fields', queryset=annotate_field_usage(Field.objects.all())))
+    replica_actions = {'list', 'retrieve'}
     
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return FormCreateUpdateSerializer
         return FormSerializer
+
+    def get_validators(self):
+        # خروجی فرم فقط با نسخه ساختار، تعداد رکوردها و تاریخ آخرین رکورد عوض می‌شود
+        if self.action == 'list':
+            forms = Form.objects.all()
+        elif str(self.kwargs.get('pk', '')).isdigit():
+            forms = Form.objects.filter(pk=self.kwargs['pk'])
+        else:
+            return None
+        rows = list(
+            forms.annotate(record_count=Count('records'), last_record_date=Max('records__created_at'))
+            .order_by('pk').values_list('pk', 'schema_version', 'updated_at', 'record_count', 'last_record_date')
+        )
+        last_modified = max((date for row in rows for date in (row[2], row[4]) if date is not None), default=None)
+        return rows, last_modified
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def perform_destroy(self, instance):
+        from records.deletion import FORM_DELETE_INLINE_MAX_RECORDS, delete_form
+
+        # حذف فرم‌های بسیار بزرگ در یک درخواست HTTP طول می‌کشد؛ دستور delete_form دسته به دسته و قابل ادامه است
+        if instance.record_count > FORM_DELETE_INLINE_MAX_RECORDS:
+            raise ValidationError(
+                f"فرم دارای {instance.record_count} رکورد است و باید با دستور 'manage.py delete_form {instance.pk}' حذف شود."
+            )
+        delete_form(instance)
         
-class FieldViewSet(viewsets.ModelViewSet):
+class FieldViewSet(ProfiledViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = FieldSerializer
+    # suggest_auto_increment شمارنده فعلی را می‌خواند (و با POST رزرو می‌کند) و روی default می‌ماند
+    replica_actions = {'list', 'retrieve', 'search_lookup'}
 
     def get_queryset(self):
-        return Field.objects.filter(form_id=self.kwargs['form_pk'])
+        from records.models import RecordHeader
+
+        return annotate_field_usage(Field.objects.filter(form_id=self.kwargs['form_pk'])).annotate(
+            form_has_records=Exists(RecordHeader.objects.filter(form_id=OuterRef('form_id')))
+        )
 
     def perform_create(self, serializer):
         form = Form.objects.get(pk=self.kwargs['form_pk'])
         serializer.save(form=form)
 
-    @action(detail=True, methods=['get'], url_path='suggest-auto-increment')
+    def perform_destroy(self, instance):
+        from records.deletion import delete_field
+
+        delete_field(instance)
+
+    @action(detail=True, methods=['get', 'post'], url_path='suggest-auto-increment')
     def suggest_auto_increment(self, request, *args, **kwargs):
         field = self.get_object()
         if not field.has_auto_increment:
             return Response({"detail": "این فیلد از نوع افزایشی خودکار نیست."}, status=400)
         
-        from records.models import HeaderValue
-        
-        max_value = HeaderValue.objects.filter(field=field).aggregate(max_val=Max('value_number'))['max_val']
-        
-        next_value = 1
-        if max_value is not None:
-            next_value = int(max_value) + 1
-            
-        return Response({"next_value": next_value})
+        from records.sequences import allocate_values, auto_increment_mode, peek_next_value
+
+        # GET فقط شماره بعدی را نشان می‌دهد؛ رزرو (که شمارنده را جلو می‌برد) فقط با POST و در حالت reserve انجام می‌شود
+        # تا دو کاربر همزمان شماره یکسان نگیرند و درخواست‌های GET (پیش‌واکشی، تکرار) شماره مصرف نکنند
+        reserve = request.method == 'POST' and auto_increment_mode() == 'reserve'
+        next_value = allocate_values(field)[0] if reserve else peek_next_value(field)
+
+        return Response({"next_value": next_value, "reserved": reserve})
 
     @action(detail=True, methods=['get'], url_path='search-lookup')
     # ✅ تابع search_lookup با نسخه جدید و هوشمند جایگزین می‌شود
@@ -49,55 +109,16 @@ class FieldViewSet(viewsets.ModelViewSet):
         if field.field_type != 'LOOKUP':
             return Response({"detail": "این فیلد از نوع لوکاپ نیست."}, status=400)
 
-        lookup_form = field.lookup_form
         ref_field = field.lookup_reference_field
         disp_field = field.lookup_display_field
 
-        if not all([lookup_form, ref_field, disp_field]):
+        if not all([field.lookup_form_id, ref_field, disp_field]):
             return Response({"detail": "تنظیمات لوکاپ برای این فیلد کامل نیست."}, status=400)
         
         search_query = request.query_params.get('q', '')
-        
-        from records.models import RecordHeader
-
-        # شروع ساخت کوئری برای جستجو در فرم مرجع
-        qs = RecordHeader.objects.filter(form=lookup_form).order_by('-created_at')
 
-        # ✅ منطق جستجوی جدید و بهینه در سطح دیتابیس
-        if search_query:
-            # جستجو هم در فیلدهای متنی و هم در فیلدهای عددی
-            qs = qs.filter(
-                Q(values__field=ref_field, values__value_text__icontains=search_query) |
-                Q(values__field=disp_field, values__value_text__icontains=search_query) |
-                Q(values__field=ref_field, values__value_number__icontains=search_query) |
-                Q(values__field=disp_field, values__value_number__icontains=search_query)
-            ).distinct()
+        from records.search import search_lookup_records
 
-        results = []
+        # ✅ جستجو روی ایندکس نرمال‌شده کلمات کد و متن نمایشی، با یک کوئری و رتبه‌بندی تطابق از ابتدا
         # محدود کردن به ۵۰ نتیجه برای جلوگیری از کندی
-        for record in qs[:50]:
-            try:
-                ref_obj = record.values.get(field=ref_field)
-                disp_obj = record.values.get(field=disp_field)
-
-                ref_val = getattr(ref_obj, f"value_{ref_obj.field.field_type.lower()}", ref_obj.value_text)
-                disp_val = getattr(disp_obj, f"value_{disp_obj.field.field_type.lower()}", disp_obj.value_text)
-
-                # ✅ اصلاح فرمت اعداد: حذف صفرهای اضافی
-                if ref_obj.field.field_type == 'NUMBER' and ref_val is not None:
-                    # اگر عدد اعشاری نبود، به صورت عدد صحیح نمایش بده
-                    ref_val = int(ref_val) if ref_val == int(ref_val) else ref_val
-
-                combined_label = f"{ref_val} - {disp_val}"
-
-                # ✅ ساختار جدید پاسخ برای پشتیبانی از قابلیت جدید فرانت‌اند
-                results.append({
-                    "value": record.pk,
-                    "label": combined_label,
-                    "display_value": disp_val,
-                    "code_value": ref_val
-                })
-            except Exception:
-                continue
-
-        return Response(results)
\ No newline at end of file
+        return Response(search_lookup_records(ref_field, disp_field, search_query))
\ No newline at end of file
@@ -0,0 +1,42 @@
+# backend/raveshgostar_back/conditional.py
+
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts) -> str:
+    return quote_etag(hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest())
+
+
+def conditional_get(method):
+    """
+    دکوریتور اکشن‌های GET ویوست‌ها: ETag قوی و Last-Modified از view.get_validators() (یک کوئری ارزان)
+    ساخته می‌شوند و اگر If-None-Match با ETag یکی باشد، پیش از کوئری‌های اصلی و سریالایزر 304 برمی‌گردد.
+    get_validators یک جفت (اجزای ETag، زمان آخرین تغییر) یا None (بدون اعتبارسنجی) برمی‌گرداند.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return method(self, request, *args, **kwargs)
+
+        parts, last_modified = validators
+        # آدرس کامل (فیلتر، کرسر، اندازه صفحه) و نوع خروجی هم جزو ETag هستند
+        etag = make_etag(self.action, request.get_full_path(), request.META.get('HTTP_ACCEPT'), parts)
+        # حذف رکورد زمانی ثبت نمی‌کند، پس فقط ETag (که تعداد رکوردها را هم دارد) درباره 304 تصمیم می‌گیرد
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            # مرورگر پاسخ را نگه می‌دارد ولی هر بار با If-None-Match اعتبارسنجی می‌کند
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
@@ -0,0 +1,183 @@
+# backend/raveshgostar_back/profiling.py
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import FileResponse, StreamingHttpResponse
+
+logger = logging.getLogger('api.profiling')
+
+PROFILED_PATH_PREFIX = '/api/'
+# یک کوئری یکسان (با پارامترهای متفاوت) که در یک درخواست این تعداد بار اجرا شود، الگوی N+1 است
+DUPLICATE_QUERY_THRESHOLD = 3
+_REPORTED_DUPLICATES = 5
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_fingerprint(sql: str) -> str:
+    """متن کوئری بدون مقادیر؛ کوئری‌هایی که فقط در پارامتر یا طول لیست IN فرق دارند یکی می‌شوند."""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    return _PLACEHOLDER_LIST.sub('(...)', sql)
+
+
+class RequestProfile:
+    """آمار کوئری‌ها و بخش‌های زمان‌بندی‌شده یک درخواست؛ به عنوان execute_wrapper روی همه اتصال‌ها ثبت می‌شود."""
+
+    def __init__(self):
+        self.endpoint = None
+        self.query_count = 0
+        self.db_time = 0.0
+        self.sections = Counter()
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.fingerprints[query_fingerprint(sql)] += 1
+
+    @contextmanager
+    def section(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] += time.perf_counter() - started
+
+    def duplicates(self) -> list:
+        return [(sql, count) for sql, count in self.fingerprints.most_common(_REPORTED_DUPLICATES)
+                if count >= DUPLICATE_QUERY_THRESHOLD]
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"']
+        parts += [f'{name};dur={duration * 1000:.1f}' for name, duration in self.sections.items()]
+        parts.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(parts)
+
+
+@contextmanager
+def _wrap_connections(profile):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(profile))
+        yield
+
+
+def get_profile(request):
+    # request می‌تواند HttpRequest جنگو یا Request در DRF باشد که ویژگی‌ها را از HttpRequest می‌خواند
+    return getattr(request, '_api_profile', None)
+
+
+class APIProfilingMiddleware:
+    """
+    برای درخواست‌های /api/ تعداد و زمان کوئری‌ها، کوئری‌های تکراری (N+1) و زمان سریالایز را
+    در هدر Server-Timing و لاگ api.profiling (یک JSON در هر خط) گزارش می‌کند و سقف کوئری
+    تعریف‌شده در API_QUERY_BUDGETS را کنترل می‌کند. با API_PROFILING=False کاری انجام نمی‌دهد.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'API_PROFILING', False) or not request.path.startswith(PROFILED_PATH_PREFIX):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        request._api_profile = profile
+        started = time.perf_counter()
+        with _wrap_connections(profile):
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        # هدر قبل از بدنه فرستاده می‌شود؛ در پاسخ‌های استریم فقط زمان ویو را نشان می‌دهد
+        response['Server-Timing'] = profile.server_timing(total)
+        if isinstance(response, StreamingHttpResponse) and not isinstance(response, FileResponse) and not response.is_async:
+            # کوئری‌های خروجی‌ها هنگام تولید بدنه اجرا می‌شوند؛ گزارش و سقف کوئری بعد از پایان بدنه
+            response.streaming_content = self._profile_stream(request, response, response.streaming_content, profile, started)
+            return response
+        self._log(request, response, profile, total)
+        self._check_budget(profile)
+        return response
+
+    def _profile_stream(self, request, response, content, profile, started):
+        chunks = iter(content)
+        try:
+            while True:
+                with _wrap_connections(profile):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # با قطع اتصال کاربر هم (GeneratorExit) آمار تا همان‌جا ثبت می‌شود
+            self._log(request, response, profile, time.perf_counter() - started)
+        self._check_budget(profile)
+
+    def _log(self, request, response, profile, total):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': profile.endpoint,
+            'status': response.status_code,
+            'queries': profile.query_count,
+            'db_ms': round(profile.db_time * 1000, 1),
+            **{f'{name}_ms': round(duration * 1000, 1) for name, duration in profile.sections.items()},
+            'total_ms': round(total * 1000, 1),
+        }
+        duplicates = profile.duplicates()
+        if duplicates:
+            record['duplicate_queries'] = [{'count': count, 'sql': sql[:300]} for sql, count in duplicates]
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False), extra={'api_profile': record})
+
+    def _check_budget(self, profile):
+        budget = getattr(settings, 'API_QUERY_BUDGETS', {}).get(profile.endpoint)
+        if budget is None or profile.query_count <= budget:
+            return
+        message = f"{profile.endpoint}: {profile.query_count} کوئری، بیش از سقف {budget}"
+        if getattr(settings, 'API_QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class ProfiledViewMixin:
+    """
+    میکسین ویوهای DRF: نام endpoint را به شکل «کلاس.اکشن» (کلید API_QUERY_BUDGETS) ثبت می‌کند
+    و زمان تبدیل خروجی سریالایزرهای ساخته‌شده با get_serializer را جداگانه اندازه می‌گیرد.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        profile = get_profile(request)
+        if profile is not None:
+            profile.endpoint = f'{type(self).__name__}.{self.action}'
+        super().initial(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        profile = get_profile(self.request)
+        if profile is not None:
+            to_representation = serializer.to_representation
+
+            def timed_to_representation(instance):
+                with profile.section('serialize'):
+                    return to_representation(instance)
+
+            serializer.to_representation = timed_to_representation
+        return serializer
@@ -0,0 +1,99 @@
+# backend/raveshgostar_back/routing.py
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import FileResponse, StreamingHttpResponse
+from rest_framework.permissions import SAFE_METHODS
+
+# alias دیتابیسی که خواندن‌های درخواست فعلی به آن می‌روند؛ None یعنی دیتابیس اصلی
+_read_alias = ContextVar('read_alias', default=None)
+
+PRIMARY_HEADER = 'HTTP_X_READ_PRIMARY'
+_PIN_KEY = 'db-primary-pin:{}'
+
+
+def replica_aliases() -> list:
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def pin_to_primary(user) -> None:
+    """خواندن‌های این کاربر تا REPLICA_PIN_SECONDS از دیتابیس اصلی انجام می‌شوند تا تغییر خودش را ببیند."""
+    if user is not None and user.is_authenticated:
+        cache.set(_PIN_KEY.format(user.pk), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(request) -> bool:
+    if request.META.get(PRIMARY_HEADER, '').lower() in ('1', 'true', 'yes'):
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and bool(cache.get(_PIN_KEY.format(user.pk)))
+
+
+class ReplicaRouter:
+    """
+    خواندن‌های اکشن‌های فقط‌خواندنی (ReplicaReadMixin) به یکی از DATABASE_REPLICAS می‌روند و بقیه به default.
+    نوشتن همیشه روی default است و بعد از اولین نوشتن، خواندن‌های بقیه همان درخواست هم به default برمی‌گردند.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # داخل تراکنش (معمولاً بعد از نوشتن) خواندن از replica ممکن است داده قدیمی ببیند
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        if _read_alias.get() is not None:
+            _read_alias.set(None)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicaها کپی همان دیتابیس اصلی هستند
+        return True
+
+
+def _stream_on(alias, chunks):
+    # بدنه پاسخ‌های استریم بعد از پایان ویو تولید می‌شود؛ کوئری‌های هر تکه هم به همان replica می‌روند
+    iterator = iter(chunks)
+    while True:
+        token = _read_alias.set(alias)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _read_alias.reset(token)
+        yield chunk
+
+
+class ReplicaReadMixin:
+    """
+    میکسین ویوست‌ها: اکشن‌های replica_actions در درخواست‌های GET از replica خوانده می‌شوند، مگر اینکه
+    درخواست هدر X-Read-Primary داشته باشد یا کاربر در چند ثانیه اخیر (REPLICA_PIN_SECONDS) چیزی نوشته باشد.
+    """
+    replica_actions = set()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._replica_token = None
+        if self.action in self.replica_actions and request.method in SAFE_METHODS:
+            aliases = replica_aliases()
+            if aliases and not is_pinned(request):
+                self._replica_token = _read_alias.set(random.choice(aliases))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            alias = _read_alias.get()
+            _read_alias.reset(token)
+            self._replica_token = None
+            if alias is not None and isinstance(response, StreamingHttpResponse) and not isinstance(response, FileResponse):
+                response.streaming_content = _stream_on(alias, response.streaming_content)
+        elif request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            pin_to_primary(request.user)
+        return response
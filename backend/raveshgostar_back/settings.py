@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,6 +28,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'raveshgostar_back.profiling.APIProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -61,9 +63,23 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # دیتابیس تست فایلی است تا تست‌های همزمانی (records.tests.SequenceConcurrencyTests) با چند اتصال اجرا شوند؛
+        # SQLite حافظه‌ای بین اتصال‌ها قفل جدول می‌دهد و منتظر نمی‌ماند
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# خواندن اکشن‌های فقط‌خواندنی (لیست و جزئیات رکوردها، جستجوی لوکاپ، لیست فرم‌ها، خروجی و گزارش تجمیعی)
+# از replicaها (raveshgostar_back/routing.py)؛ نوشتن و خواندن‌های بعد از آن همیشه روی default است.
+# مثال محلی با دو SQLite (فایل replica کپی db.sqlite3 است):
+#   DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3', 'TEST': {'MIRROR': 'default'}}
+#   DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['raveshgostar_back.routing.ReplicaRouter']
+# بعد از هر نوشتن، خواندن‌های همان کاربر این چند ثانیه (بیشتر از تأخیر replication) از default انجام می‌شوند؛
+# با چند پروسه، کش default باید مشترک باشد (مثلاً Redis). هدر X-Read-Primary: 1 هم درخواست را روی default نگه می‌دارد
+REPLICA_PIN_SECONDS = 5
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -89,4 +105,48 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-}
\ No newline at end of file
+}
+
+# نحوه تخصیص شماره فیلدهای افزایشی خودکار:
+# 'reserve' = شماره هنگام پیشنهاد رزرو می‌شود | 'save' = پیشنهاد فقط نمایشی است و شماره هنگام ذخیره (اگر خالی باشد) تخصیص می‌یابد
+AUTO_INCREMENT_MODE = 'reserve'
+
+# پروفایل درخواست‌های /api/: تعداد و زمان کوئری‌ها، کوئری‌های تکراری (N+1) و زمان سریالایز
+# در هدر Server-Timing و لاگ api.profiling؛ پیش‌فرض خاموش است و با متغیر محیطی API_PROFILING=1 روشن می‌شود
+API_PROFILING = os.environ.get('API_PROFILING', '').lower() in ('1', 'true', 'yes')
+
+# سقف تعداد کوئری هر endpoint با کلید «کلاس ویو.اکشن» (شامل کوئری احراز هویت کاربر)؛
+# عبور از سقف در لاگ هشدار داده می‌شود و با API_QUERY_BUDGET_STRICT=True (در تست‌ها) خطا می‌دهد
+API_QUERY_BUDGETS = {
+    'FormViewSet.list': 4,
+    'FormViewSet.retrieve': 4,
+    'FieldViewSet.list': 2,
+    'FieldViewSet.search_lookup': 5,
+    'RecordViewSet.list': 8,
+    'RecordViewSet.retrieve': 8,
+    'RecordViewSet.record_items': 7,
+}
+API_QUERY_BUDGET_STRICT = False
+
+# همگام‌سازی تدریجی رکوردها (records/changes/): رکوردهای این چند ثانیه آخر در درخواست بعدی دوباره فرستاده می‌شوند
+# تا تراکنش‌های دیر commit شده جا نمانند؛ سنگ‌قبر رکوردهای حذف‌شده این تعداد روز نگه داشته می‌شود
+RECORD_CHANGES_SAFETY_SECONDS = 5
+RECORD_TOMBSTONE_RETENTION_DAYS = 30
+
+# فرم‌های با رکورد بیشتر از این از API حذف نمی‌شوند و باید با دستور delete_form (دسته به دسته و قابل ادامه) حذف شوند
+FORM_DELETE_INLINE_MAX_RECORDS = 20000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO' if DEBUG else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
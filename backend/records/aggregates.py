@@ -0,0 +1,250 @@
+# backend/records/aggregates.py
+
+from django.db.models import Avg, Case, Count, F, FilteredRelation, IntegerField, Max, Min, Q, Sum, When
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear, Floor, TruncMonth, TruncYear
+from django.db.models.lookups import LessThanOrEqual
+from rest_framework.exceptions import ValidationError
+
+from .jalali import format_jalali_many, jalali_to_gregorian
+from .lookups import LookupResolver, format_lookup_code
+from .models import VALUE_TYPES, RecordHeader, RecordItem, ItemValue, value_column_for
+
+AGGREGATE_FUNCTIONS = {'sum': Sum, 'avg': Avg, 'min': Min, 'max': Max, 'count': Count}
+# بازه‌های گروه‌بندی تاریخ؛ ماه و سال شمسی با محاسبه عددی روی ستون تاریخ میلادی در خود SQL ساخته می‌شوند
+DATE_BUCKETS = ['day', 'month', 'year', 'jalali_month', 'jalali_year']
+JALALI_BUCKET_UNITS = {'jalali_month': 'month', 'jalali_year': 'year'}
+MAX_GROUPS = 10000
+# شماره روز (toordinal) روز قبل از ۱ فروردین سال ۱
+_JALALI_EPOCH = jalali_to_gregorian(1, 1, 1).toordinal() - 1
+
+
+class GroupSpec:
+    def __init__(self, field, bucket=None):
+        self.field = field
+        self.bucket = bucket
+        self.name = field.code if bucket is None else f'{field.code}__{bucket}'
+
+
+class MetricSpec:
+    def __init__(self, func, field=None):
+        self.func = func
+        self.field = field
+        self.name = func if field is None else f'{func}_{field.code}'
+
+
+def parse_group_by(raw: str, fields_by_code: dict) -> list:
+    """?group_by=customer,date:jalali_month"""
+    specs = []
+    for part in filter(None, (p.strip() for p in (raw or '').split(','))):
+        code, _, bucket = part.partition(':')
+        field = fields_by_code.get(code)
+        if field is None:
+            raise ValidationError({'group_by': f"فیلدی با کد '{code}' در فرم وجود ندارد."})
+        if bucket and (field.field_type != 'DATE' or bucket not in DATE_BUCKETS):
+            raise ValidationError({'group_by': f"بازه '{bucket}' فقط برای فیلدهای تاریخی و یکی از {', '.join(DATE_BUCKETS)} است."})
+        specs.append(GroupSpec(field, bucket or None))
+    return specs
+
+
+def parse_metrics(raw: str, fields_by_code: dict) -> list:
+    """?metrics=sum:qty,avg:price,count (count بدون فیلد یعنی تعداد ردیف‌ها)"""
+    specs = []
+    for part in filter(None, (p.strip() for p in (raw or 'count').split(','))):
+        func, _, code = part.partition(':')
+        if func not in AGGREGATE_FUNCTIONS:
+            raise ValidationError({'metrics': f"تابع '{func}' پشتیبانی نمی‌شود."})
+        if not code:
+            if func != 'count':
+                raise ValidationError({'metrics': f"تابع '{func}' به کد فیلد نیاز دارد (مثلاً {func}:amount)."})
+            specs.append(MetricSpec(func))
+            continue
+        field = fields_by_code.get(code)
+        if field is None:
+            raise ValidationError({'metrics': f"فیلدی با کد '{code}' در فرم وجود ندارد."})
+        if func in ('sum', 'avg') and field.field_type != 'NUMBER':
+            raise ValidationError({'metrics': f"تابع '{func}' فقط روی فیلدهای عددی ممکن است."})
+        if func in ('min', 'max') and field.field_type not in ('NUMBER', 'DATE'):
+            raise ValidationError({'metrics': f"تابع '{func}' فقط روی فیلدهای عددی یا تاریخی ممکن است."})
+        specs.append(MetricSpec(func, field))
+    return specs
+
+
+def _group_expression(column_path: str, spec: GroupSpec):
+    field, bucket = spec.field, spec.bucket
+    if field.field_type == 'DATE':
+        column = f'{column_path}value_date_gregorian'
+        if bucket == 'month': return TruncMonth(column)
+        if bucket == 'year': return TruncYear(column)
+        if bucket in JALALI_BUCKET_UNITS:
+            return _jalali_bucket(column, JALALI_BUCKET_UNITS[bucket])
+        return F(column)
+    return F(f'{column_path}{value_column_for(field.field_type)}')
+
+
+def _div(dividend, divisor):
+    # تقسیم صحیح؛ EXTRACT در PostgreSQL عدد اعشاری برمی‌گرداند
+    return Floor(dividend / divisor, output_field=IntegerField())
+
+
+def _jalali_bucket(column: str, unit: str):
+    """
+    سال شمسی (YYYY) یا ماه شمسی (YYYY*100+MM) هر ردیف با همان محاسبه records/jalali.py در خود SQL:
+    شماره روز از سال/ماه/روز میلادی و سپس سال و روزِ سال شمسی با تقسیم صحیح. اندازه عبارت ثابت است و به بازه داده بستگی ندارد.
+    """
+    year, month, day = ExtractYear(column), ExtractMonth(column), ExtractDay(column)
+    shift = _div(14 - month, 12)
+    shifted_year = year + 4800 - shift
+    shifted_month = month + 12 * shift - 3
+    # شماره روز ژولیانی منهای فاصله آن تا toordinal پایتون و روز قبل از ۱ فروردین سال ۱
+    days = (
+        day + _div(153 * shifted_month + 2, 5) + 365 * shifted_year
+        + _div(shifted_year, 4) - _div(shifted_year, 100) + _div(shifted_year, 400)
+        - 32045 - 1721425 - _JALALI_EPOCH
+    )
+    # سال‌های کامل گذشته: 365 روز و 8 کبیسه در هر 33 سال (_days_before_year)
+    past_years = _div(33 * (days - 1) + 3, 12053)
+    if unit == 'year':
+        return past_years + 1
+    day_of_year = days - _div(12053 * past_years + 29, 33)
+    jalali_month = Case(
+        When(LessThanOrEqual(day_of_year, 186), then=_div(day_of_year - 1, 31) + 1),
+        default=_div(day_of_year - 187, 30) + 7,
+    )
+    return (past_years + 1) * 100 + jalali_month
+
+
+def _relations(queryset, fields, header_relation: str):
+    """هر فیلد با یک LEFT JOIN شرطی (FilteredRelation) روی جدول مقادیر؛ خروجی: پیشوند ستون‌های هر فیلد"""
+    relations = {}
+    for field in fields:
+        if field.pk in relations:
+            continue
+        relation = 'values' if field.section == 'ITEM' else header_relation
+        alias = f'v{field.pk}'
+        queryset = queryset.alias(**{alias: FilteredRelation(relation, condition=Q(**{f'{relation}__field': field}))})
+        relations[field.pk] = f'{alias}__'
+    return queryset, relations
+
+
+def _grouped_rows(queryset, header_relation: str, group_specs: list, metric_specs: list) -> list:
+    fields = [s.field for s in group_specs] + [s.field for s in metric_specs if s.field is not None]
+    queryset, relations = _relations(queryset, fields, header_relation)
+
+    groups = {spec.name: _group_expression(relations[spec.field.pk], spec) for spec in group_specs}
+    metrics = {}
+    for spec in metric_specs:
+        if spec.field is None:
+            # count بدون فیلد تعداد رکوردهاست؛ روی اقلام هر رکورد در هر گروه یک بار شمرده می‌شود
+            metrics[spec.name] = Count('header', distinct=True) if queryset.model is RecordItem else Count('pk')
+            continue
+        column = 'value_date_gregorian' if spec.field.field_type == 'DATE' else value_column_for(spec.field.field_type)
+        metrics[spec.name] = AGGREGATE_FUNCTIONS[spec.func](f'{relations[spec.field.pk]}{column}')
+
+    if not groups:
+        return [queryset.aggregate(**metrics)]
+    rows = list(queryset.values(**groups).annotate(**metrics).order_by(*groups)[:MAX_GROUPS + 1])
+    if len(rows) > MAX_GROUPS:
+        raise ValidationError(f"تعداد گروه‌ها بیش از {MAX_GROUPS} است؛ گروه‌بندی یا فیلترها را محدودتر کنید.")
+    return rows
+
+
+def aggregate_records(headers, group_specs: list, metric_specs: list) -> list:
+    """
+    گروه‌بندی و تجمیع با کوئری GROUP BY؛ هر فیلد با یک LEFT JOIN شرطی روی جدول مقادیر آورده می‌شود و چون هر رکورد/ردیف
+    برای هر فیلد حداکثر یک مقدار دارد ردیف‌ها تکثیر نمی‌شوند. معیارهای هدر (و count) روی رکوردها و معیارهای اقلام روی
+    اقلام حساب می‌شوند؛ اگر هر دو لازم باشند دو کوئری با گروه‌های یکسان اجرا و بر اساس کلید گروه ادغام می‌شوند.
+    اگر یکی از گروه‌ها در بخش اقلام باشد همه چیز روی اقلام است و جمع/میانگین/تعداد فیلدهای هدر (که به ازای
+    هر ردیف اقلام تکرار می‌شوند) پذیرفته نیست.
+    headers: کوئری رکوردهای فیلترشده فرم
+    """
+    items = RecordItem.objects.filter(header__in=headers)
+    if any(spec.field.section == 'ITEM' for spec in group_specs):
+        for spec in metric_specs:
+            if spec.field is not None and spec.field.section != 'ITEM' and spec.func in ('sum', 'avg', 'count'):
+                raise ValidationError({'metrics': f"'{spec.name}' روی فیلد هدر با گروه‌بندی بر اساس فیلد اقلام ممکن نیست."})
+        rows = _grouped_rows(items, 'header__values', group_specs, metric_specs)
+        _format_rows(rows, group_specs, metric_specs)
+        return rows
+
+    item_metrics = [s for s in metric_specs if s.field is not None and s.field.section == 'ITEM']
+    header_metrics = [s for s in metric_specs if s not in item_metrics]
+    if not item_metrics:
+        rows = _grouped_rows(RecordHeader.objects.filter(pk__in=headers), 'values', group_specs, header_metrics)
+    elif not header_metrics:
+        rows = _grouped_rows(items, 'header__values', group_specs, item_metrics)
+    else:
+        # گروه‌های رکوردها شامل گروه‌های اقلام است؛ گروهی که قلمی ندارد معیار اقلامش خالی (تعداد صفر) است
+        rows = _grouped_rows(RecordHeader.objects.filter(pk__in=headers), 'values', group_specs, header_metrics)
+        item_rows = {
+            tuple(row[s.name] for s in group_specs): row
+            for row in _grouped_rows(items, 'header__values', group_specs, item_metrics)
+        }
+        for row in rows:
+            item_row = item_rows.get(tuple(row[s.name] for s in group_specs), {})
+            for spec in item_metrics:
+                row[spec.name] = item_row.get(spec.name, 0 if spec.func == 'count' else None)
+
+    _format_rows(rows, group_specs, metric_specs)
+    return rows
+
+
+def attach_item_summaries(records, schema) -> None:
+    """
+    تعداد اقلام و جمع فیلدهای عددی اقلام هر رکورد (item_count و item_totals بر اساس کد فیلد)
+    برای کل یک صفحه با دو کوئری GROUP BY، تا لیست رکوردها بدون خود اقلام خلاصه آن‌ها را نشان دهد.
+    """
+    for record in records:
+        record.item_count, record.item_totals = 0, {}
+    if schema.form_type != 'DOUBLE_SECTION' or not records:
+        return
+    by_id = {record.pk: record for record in records}
+
+    counts = RecordItem.objects.filter(header_id__in=by_id).values('header_id').annotate(count=Count('pk'))
+    for header_id, count in counts.values_list('header_id', 'count'):
+        by_id[header_id].item_count = count
+
+    number_codes = {f.pk: f.code for f in schema.fields if f.section == 'ITEM' and f.field_type == 'NUMBER'}
+    if not number_codes:
+        return
+    totals = ItemValue.objects.filter(item__header_id__in=by_id, field_id__in=number_codes, value_type=VALUE_TYPES['NUMBER'])\
+        .values('item__header_id', 'field_id').annotate(total=Sum('value_number'))
+    for header_id, field_id, total in totals.values_list('item__header_id', 'field_id', 'total'):
+        by_id[header_id].item_totals[number_codes[field_id]] = format_lookup_code(total.normalize(), 'NUMBER')
+
+
+def _format_rows(rows, group_specs, metric_specs):
+    lookup_specs = [s for s in group_specs if s.field.field_type == 'LOOKUP']
+    date_metrics = [s for s in metric_specs if s.field is not None and s.field.field_type == 'DATE']
+    resolver = LookupResolver()
+    date_groups = [s for s in group_specs if s.field.field_type == 'DATE' and s.bucket in (None, 'day')]
+    # گروه‌های روزانه و کمینه/بیشینه تاریخ مانند بقیه برنامه شمسی برگردانده می‌شوند؛ هر تاریخ یکتا یک بار تبدیل می‌شود
+    jalali = format_jalali_many(row[spec.name] for spec in date_metrics + date_groups for row in rows)
+    for spec in lookup_specs:
+        # برچسب همه گروه‌های لوکاپ با یک کوئری برای هر فیلد واکشی می‌شود
+        field_ids = {i for i in (spec.field.lookup_reference_field_id, spec.field.lookup_display_field_id) if i}
+        resolver.prime_ids({int(row[spec.name]) for row in rows if row[spec.name] is not None}, field_ids)
+
+    for row in rows:
+        for spec in group_specs:
+            value = row[spec.name]
+            if value is None:
+                continue
+            if spec.field.field_type == 'LOOKUP':
+                row[spec.name] = int(value)
+                row[f'{spec.name}__label'] = resolver.label_for(spec.field, int(value))
+            elif spec.field.field_type == 'NUMBER':
+                row[spec.name] = format_lookup_code(value.normalize(), 'NUMBER')
+            elif spec in date_groups:
+                row[spec.name] = jalali[value]
+            elif spec.bucket == 'month':
+                row[spec.name] = value.strftime('%Y-%m')
+            elif spec.bucket == 'year':
+                row[spec.name] = value.strftime('%Y')
+            elif spec.bucket == 'jalali_month':
+                row[spec.name] = f'{value // 100:04d}/{value % 100:02d}'
+            elif spec.bucket == 'jalali_year':
+                row[spec.name] = f'{value:04d}'
+        for spec in date_metrics:
+            if row[spec.name] is not None:
+                row[spec.name] = jalali[row[spec.name]]
+
@@ -3,4 +3,6 @@ from django.apps import AppConfig
 
 class RecordsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'records'
\ No newline at end of file
+    name = 'records'
+    def ready(self):
+        from . import signals  # noqa: F401
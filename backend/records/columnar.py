@@ -0,0 +1,94 @@
+# backend/records/columnar.py
+
+from datetime import date
+from decimal import Decimal
+
+from django.db import connections
+from django.utils import timezone
+
+from .aggregates import attach_item_summaries
+from .models import VALUE_TYPES, HeaderValue
+
+VALUE_ROW = ['header_id', 'field_id', 'value_type', 'value_text', 'value_number', 'value_lookup', 'value_date_gregorian']
+_NUMBER, _LOOKUP, _DATE = VALUE_TYPES['NUMBER'], VALUE_TYPES['LOOKUP'], VALUE_TYPES['DATE']
+
+
+def _number(value):
+    # عدد صحیح بدون .0 نوشته می‌شود؛ در جاوااسکریپت هر دو یک عدد هستند
+    if isinstance(value, (Decimal, float)):
+        return int(value) if value == int(value) else float(value)
+    return value
+
+
+def _date(value):
+    # SQLite تاریخ را به شکل رشته 'YYYY-MM-DD' و PostgreSQL به شکل date برمی‌گرداند
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _value_rows(record_ids):
+    """ردیف‌های مقدار به همان شکلی که دیتابیس برمی‌گرداند؛ تبدیل‌گرهای ORM برای هر خانه اجرا نمی‌شوند."""
+    queryset = HeaderValue.objects.filter(header_id__in=record_ids).values_list(*VALUE_ROW)
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _timestamps(values):
+    # همان خروجی DateTimeField در DRF (ساعت محلی و Z برای UTC) با یک بار خواندن منطقه زمانی
+    tz = timezone.get_current_timezone()
+    return [value.astimezone(tz).isoformat().replace('+00:00', 'Z') for value in values]
+
+
+def columnar_page(records: list, schema, resolver) -> dict:
+    """
+    یک صفحه از لیست رکوردها به شکل ستونی: کد فیلدهای هدر یک بار، یک آرایه برای هر ستون (هم‌ترتیب id)
+    و برای هر فیلد لوکاپ یک دیکشنری «شناسه رکورد مرجع -> [کد، برچسب]».
+    مقادیر مستقیماً از ردیف‌های دیتابیس خوانده می‌شوند و سریالایزر مدل برای هر خانه اجرا نمی‌شود.
+    """
+    fields = [field for field in schema.fields if field.section == 'HEADER']
+    record_ids = [record.pk for record in records]
+    positions = {record_id: position for position, record_id in enumerate(record_ids)}
+    columns = {field.pk: [None] * len(records) for field in fields}
+
+    lookup_targets = {}
+    for header_id, field_id, value_type, text, number, lookup, day in _value_rows(record_ids):
+        column = columns.get(field_id)
+        if column is None:
+            continue
+        if value_type == _NUMBER:
+            value = _number(number)
+        elif value_type == _LOOKUP:
+            value = lookup
+            if lookup is not None:
+                lookup_targets.setdefault(field_id, set()).add(lookup)
+        elif value_type == _DATE:
+            value = _date(day)
+        else:
+            value = text
+        column[positions[header_id]] = value
+
+    lookups = {}
+    for field_id, targets in lookup_targets.items():
+        field = schema.fields_by_id[field_id]
+        resolver.prime_ids(targets, [pk for pk in (field.lookup_reference_field_id, field.lookup_display_field_id) if pk])
+        lookups[field.code] = {
+            str(target): [_number(resolver.code_for(field, target)), resolver.label_for(field, target)]
+            for target in targets
+        }
+
+    attach_item_summaries(records, schema)
+    item_codes = [field.code for field in schema.fields if field.section == 'ITEM' and field.field_type == 'NUMBER']
+
+    return {
+        'fields': [field.code for field in fields],
+        'types': [field.field_type for field in fields],
+        'id': record_ids,
+        'created_at': _timestamps(record.created_at for record in records),
+        'updated_at': _timestamps(record.updated_at for record in records),
+        'can_delete': [not record.is_referenced for record in records],
+        'columns': [columns[field.pk] for field in fields],
+        'lookups': lookups,
+        'item_count': [record.item_count for record in records],
+        'item_totals': {code: [_number(record.item_totals.get(code)) for record in records] for code in item_codes},
+    }
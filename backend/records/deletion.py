@@ -0,0 +1,125 @@
+# backend/records/deletion.py
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from form_builder.models import Field, Form
+from .models import (
+    FieldSequence, HeaderValue, ItemValue, LookupSearchEntry, LookupSearchToken, RecordHeader, RecordItem,
+    RecordProjection, RecordReference, RecordTombstone, UniqueValueKey,
+)
+
+# تعداد رکورد هر دسته حذف فرم؛ هر دسته تراکنش جداگانه دارد
+DELETE_BATCH_SIZE = 500
+# تعداد ردیف (اقلام یا مقادیر) هر دستور DELETE
+ROW_DELETE_BATCH_SIZE = 5000
+# فرم‌های بزرگ‌تر از این از API حذف نمی‌شوند و با دستور delete_form (قابل ادامه بعد از قطع) حذف می‌شوند
+FORM_DELETE_INLINE_MAX_RECORDS = getattr(settings, 'FORM_DELETE_INLINE_MAX_RECORDS', 20000)
+
+
+def _raw_delete(queryset) -> int:
+    """
+    ردیف‌های queryset را با یک دستور DELETE ... WHERE pk IN (زیرکوئری) روی cursor حذف می‌کند.
+    queryset.delete() از Collector جنگو می‌گذرد که برای مدل‌های دارای رابطه وابسته (RecordHeader، RecordItem،
+    LookupSearchEntry) همه ردیف‌ها را پیش از حذف در حافظه بارگذاری و جدول‌های وابسته را یکی‌یکی پرس‌وجو می‌کند.
+    اینجا جداول وابسته از قبل به ترتیب پاک شده‌اند و این مدل‌ها گیرنده سیگنال حذف ندارند، پس Collector کاری جز کند کردن حذف ندارد.
+    """
+    model = queryset.model
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN ({sql})', params)
+        return cursor.rowcount
+
+
+def _delete_in_batches(queryset, batch_size: int = ROW_DELETE_BATCH_SIZE) -> int:
+    model, deleted = queryset.model, 0
+    ids = queryset.order_by().values_list('pk', flat=True)
+    while True:
+        chunk = list(ids[:batch_size])
+        if not chunk:
+            return deleted
+        deleted += _raw_delete(model.objects.filter(pk__in=chunk))
+
+
+def delete_items(items, batch_size: int = ROW_DELETE_BATCH_SIZE) -> int:
+    """ردیف‌های اقلام (queryset از RecordItem) را همراه مقادیرشان دسته به دسته حذف می‌کند."""
+    ids, deleted = items.order_by().values_list('pk', flat=True), 0
+    while True:
+        chunk = list(ids[:batch_size])
+        if not chunk:
+            return deleted
+        _raw_delete(ItemValue.objects.filter(item_id__in=chunk))
+        deleted += _raw_delete(RecordItem.objects.filter(pk__in=chunk))
+
+
+def delete_headers(header_ids: list) -> int:
+    """رکوردها و همه ردیف‌های وابسته‌شان را به ترتیب وابستگی با دستورهای DELETE مجموعه‌ای حذف می‌کند."""
+    delete_items(RecordItem.objects.filter(header_id__in=header_ids))
+    _delete_in_batches(HeaderValue.objects.filter(header_id__in=header_ids))
+    _raw_delete(LookupSearchToken.objects.filter(entry__header_id__in=header_ids))
+    for model in (LookupSearchEntry, UniqueValueKey, RecordProjection):
+        _raw_delete(model.objects.filter(header_id__in=header_ids))
+    _raw_delete(RecordReference.objects.filter(Q(source_id__in=header_ids) | Q(target_id__in=header_ids)))
+    return _raw_delete(RecordHeader.objects.filter(pk__in=header_ids))
+
+
+def check_form_deletable(form: Form, header_ids=None) -> None:
+    # ارجاع رکوردهای فرم‌های دیگر مانع حذف است؛ ارجاع رکوردهای خود فرم همراه آن حذف می‌شود
+    if header_ids is None:
+        references = RecordReference.objects.filter(target__form=form)
+    else:
+        references = RecordReference.objects.filter(target_id__in=header_ids)
+    reference = references.exclude(source__form=form).select_related('field__form').first()
+    if reference is not None:
+        raise ValidationError(
+            f"فرم '{form.name}' قابل حذف نیست زیرا رکوردهای آن در فرم '{reference.field.form.name}' به عنوان مرجع استفاده شده‌اند."
+        )
+
+
+def delete_form_records(form: Form, batch_size: int = DELETE_BATCH_SIZE, progress=None) -> int:
+    """
+    رکوردهای فرم را دسته به دسته و هر دسته در تراکنش جداگانه حذف می‌کند؛ اگر اجرا قطع شود، اجرای دوباره
+    از رکوردهای باقی‌مانده ادامه می‌دهد. محافظت ارجاع لوکاپ برای هر دسته دوباره بررسی می‌شود.
+    """
+    deleted = 0
+    ids = RecordHeader.objects.filter(form=form).order_by('pk').values_list('pk', flat=True)
+    while True:
+        with transaction.atomic():
+            header_ids = list(ids[:batch_size])
+            if not header_ids:
+                return deleted
+            check_form_deletable(form, header_ids)
+            deleted += delete_headers(header_ids)
+        if progress is not None:
+            progress(deleted)
+
+
+def delete_form(form: Form, batch_size: int = DELETE_BATCH_SIZE, progress=None) -> int:
+    """فرم را با رکوردهایش حذف می‌کند و تعداد رکوردهای حذف‌شده را برمی‌گرداند."""
+    check_form_deletable(form)
+    deleted = delete_form_records(form, batch_size, progress)
+    with transaction.atomic():
+        for model in (RecordTombstone, RecordProjection):
+            _raw_delete(model.objects.filter(form=form))
+        # فرم و فیلدهایش دیگر ردیف وابسته‌ای ندارند؛ حذف عادی سیگنال‌ها (افزایش نسخه فرم‌های مرتبط) را اجرا می‌کند
+        form.delete()
+    return deleted
+
+
+@transaction.atomic
+def delete_field(field: Field) -> None:
+    """فیلد را همراه مقادیر و ایندکس‌های آن (ارجاعات، کلیدهای یکتا، ایندکس جستجو، شمارنده) حذف می‌کند."""
+    if Field.objects.filter(Q(lookup_reference_field=field) | Q(lookup_display_field=field)).exclude(pk=field.pk).exists():
+        raise ValidationError("این فیلد قابل حذف نیست زیرا در تنظیمات یک فیلد لوکاپ دیگر استفاده شده است.")
+
+    for model in (HeaderValue, ItemValue):
+        _delete_in_batches(model.objects.filter(field=field))
+    for model in (RecordReference, UniqueValueKey, FieldSequence):
+        _raw_delete(model.objects.filter(field=field))
+    _raw_delete(LookupSearchToken.objects.filter(Q(reference_field=field) | Q(entry__reference_field=field) | Q(entry__display_field=field)))
+    _raw_delete(LookupSearchEntry.objects.filter(Q(reference_field=field) | Q(display_field=field)))
+    field.delete()
@@ -0,0 +1,197 @@
+# backend/records/exporters.py
+
+import csv
+import datetime
+import json
+import tempfile
+from decimal import Decimal
+
+from rest_framework.exceptions import ValidationError
+
+from form_builder.models import Form
+from .models import RecordHeader, HeaderValue, ItemValue, RecordProjection
+from .jalali import format_jalali
+from .lookups import LookupResolver, format_lookup_code
+from .importers import RECORD_KEY_COLUMN
+from .schema import get_form_schema
+from .projections import projection_field_id
+
+EXPORT_FORMATS = ['csv', 'jsonl', 'xlsx']
+EXPORT_CHUNK_SIZE = 500
+# سقف اندازه کش لوکاپ؛ بعد از آن کش خالی می‌شود تا حافظه ثابت بماند
+LOOKUP_CACHE_LIMIT = 100000
+
+VALUE_FIELDS = ['field_id', 'value_text', 'value_number', 'value_lookup', 'value_date_gregorian']
+
+
+class _Echo:
+    # شبه‌بافری که csv.writer مستقیماً خروجی را از آن برمی‌گرداند (الگوی مستندات جنگو)
+    def write(self, value):
+        return value
+
+
+def _format_number(value):
+    if value is None: return None
+    return format_lookup_code(value.normalize(), 'NUMBER')
+
+
+class RecordExporter:
+    """
+    رکوردهای یک فرم را به شکل ردیف‌های تخت (یک ستون برای هر فیلد) و به صورت جریانی تولید می‌کند.
+    در فرم‌های دوبخشی به ازای هر ردیف اقلام یک سطر خروجی ساخته می‌شود و ستون‌های هدر تکرار می‌شوند؛
+    این همان قالبی است که ورود اطلاعات (import) می‌پذیرد.
+    """
+
+    def __init__(self, form: Form, chunk_size: int = EXPORT_CHUNK_SIZE):
+        self.form = form
+        self.chunk_size = chunk_size
+        schema = get_form_schema(form)
+        self.fields = schema.fields
+        self.fields_by_id = schema.fields_by_id
+        self.lookup_fields = [f for f in self.fields if f.field_type == 'LOOKUP']
+        self.use_projection = schema.has_projection
+        self.resolver = LookupResolver()
+
+    @property
+    def columns(self) -> list:
+        columns = [RECORD_KEY_COLUMN]
+        for field in self.fields:
+            columns.append(field.code)
+            if field.field_type == 'LOOKUP':
+                columns.append(f'{field.code}__display')
+        return columns
+
+    def iter_rows(self):
+        record_ids = RecordHeader.objects.filter(form=self.form).order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for record_id in record_ids.iterator(chunk_size=self.chunk_size):
+            batch.append(record_id)
+            if len(batch) >= self.chunk_size:
+                yield from self._rows_for_batch(batch)
+                batch = []
+        if batch:
+            yield from self._rows_for_batch(batch)
+
+    def _rows_for_batch(self, record_ids):
+        if self.use_projection:
+            header_rows = self._projection_header_rows(record_ids)
+        else:
+            header_rows = {record_id: {} for record_id in record_ids}
+            header_values = HeaderValue.objects.filter(header_id__in=record_ids).values_list('header_id', *VALUE_FIELDS)
+            for header_id, *value in header_values.iterator(chunk_size=self.chunk_size * 10):
+                header_rows[header_id][value[0]] = value
+
+        item_rows = {record_id: {} for record_id in record_ids}
+        if self.form.form_type == 'DOUBLE_SECTION':
+            item_values = ItemValue.objects.filter(item__header_id__in=record_ids)\
+                .order_by('item_id').values_list('item__header_id', 'item_id', *VALUE_FIELDS)
+            for header_id, item_id, *value in item_values.iterator(chunk_size=self.chunk_size * 10):
+                item_rows[header_id].setdefault(item_id, {})[value[0]] = value
+
+        self._prime_lookups(header_rows, item_rows)
+
+        for record_id in record_ids:
+            header = {RECORD_KEY_COLUMN: record_id, **self._flatten(header_rows[record_id])}
+            items = item_rows[record_id]
+            if not items:
+                yield header
+                continue
+            for values in items.values():
+                yield {**header, **self._flatten(values)}
+
+    def _projection_header_rows(self, record_ids):
+        """مقادیر هدر را از جدول تخت (یک ردیف برای هر رکورد) به همان شکل ردیف‌های VALUE_FIELDS می‌سازد."""
+        header_rows = {record_id: {} for record_id in record_ids}
+        projections = RecordProjection.objects.filter(header_id__in=record_ids).values_list('header_id', 'data')
+        for header_id, data in projections:
+            for key, value in data.items():
+                field = self.fields_by_id.get(projection_field_id(key))
+                if field is not None:
+                    header_rows[header_id][field.pk] = _value_from_projection(field, value)
+        return header_rows
+
+    def _prime_lookups(self, header_rows, item_rows):
+        if not self.lookup_fields:
+            return
+        if len(self.resolver) > LOOKUP_CACHE_LIMIT:
+            self.resolver.clear()
+        target_ids = set()
+        for rows in [header_rows.values()] + [items.values() for items in item_rows.values()]:
+            for values in rows:
+                for field in self.lookup_fields:
+                    value = values.get(field.pk)
+                    if value is not None and value[3] is not None:
+                        target_ids.add(value[3])
+        field_ids = {f.lookup_reference_field_id for f in self.lookup_fields if f.lookup_reference_field_id}
+        field_ids |= {f.lookup_display_field_id for f in self.lookup_fields if f.lookup_display_field_id}
+        self.resolver.prime_ids(target_ids, field_ids)
+
+    def _flatten(self, values: dict) -> dict:
+        row = {}
+        for field_id, text, number, lookup, date in values.values():
+            field = self.fields_by_id.get(field_id)
+            if field is None:
+                continue
+            if field.field_type == 'LOOKUP':
+                row[field.code], row[f'{field.code}__display'] = self._lookup_cells(field, lookup)
+            elif field.field_type == 'NUMBER':
+                row[field.code] = _format_number(number)
+            elif field.field_type == 'DATE':
+                # تاریخ شمسی با همان قالبی که ورود اطلاعات می‌پذیرد
+                row[field.code] = format_jalali(date).replace('/', '-') if date else None
+            else:
+                row[field.code] = text
+        return row
+
+    def _lookup_cells(self, field, target):
+        if target is None:
+            return None, None
+        ref_obj = self.resolver.get(target, field.lookup_reference_field_id) if field.lookup_reference_field_id else None
+        disp_obj = self.resolver.get(target, field.lookup_display_field_id) if field.lookup_display_field_id else None
+        code = format_lookup_code(ref_obj.get_value(), ref_obj.field_type) if ref_obj else target
+        return code, disp_obj.get_value() if disp_obj else None
+
+    def iter_csv(self):
+        writer = csv.DictWriter(_Echo(), fieldnames=self.columns, extrasaction='ignore')
+        # BOM برای باز شدن درست حروف فارسی در اکسل
+        yield '\ufeff' + writer.writerow(dict(zip(self.columns, self.columns)))
+        for row in self.iter_rows():
+            yield writer.writerow(row)
+
+    def iter_jsonl(self):
+        for row in self.iter_rows():
+            yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+    def write_xlsx(self):
+        """فایل اکسل را در حالت write-only روی یک فایل موقت می‌نویسد و فایل باز را برمی‌گرداند."""
+        try:
+            from openpyxl import Workbook
+        except ImportError:
+            raise ValidationError("برای خروجی اکسل، کتابخانه openpyxl باید نصب باشد.")
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(self.form.code[:31])
+        sheet.append(self.columns)
+        for row in self.iter_rows():
+            sheet.append([_xlsx_cell(row.get(column)) for column in self.columns])
+
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return output
+
+
+def _value_from_projection(field, value):
+    if field.field_type == 'NUMBER':
+        return field.pk, None, Decimal(repr(value)), None, None
+    if field.field_type == 'LOOKUP':
+        return field.pk, None, None, int(value), None
+    if field.field_type == 'DATE':
+        return field.pk, None, None, None, datetime.date.fromisoformat(value)
+    return field.pk, value, None, None, None
+
+
+def _xlsx_cell(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
@@ -0,0 +1,170 @@
+# backend/records/filters.py
+
+import datetime
+from decimal import Decimal, InvalidOperation
+from django.db.models import BigIntegerField, DateField, DecimalField, Exists, FloatField, OuterRef, Q, Subquery, TextField, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Coalesce
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+from form_builder.models import Field
+from .jalali import parse_jalali, parse_jalali_period
+from .lookups import parse_lookup_id
+from .models import HeaderValue, ItemValue, value_column_for
+from .projections import projection_condition, projection_key
+
+FIELD_FILTER_PREFIX = 'f.'
+FIELD_FILTER_LOOKUPS = ['exact', 'gt', 'gte', 'lt', 'lte', 'range', 'in', 'icontains', 'isnull', 'period']
+
+ORDERING_PARAM = 'ordering'
+SORT_ANNOTATION = 'sort_value'
+# کوچک‌تر از هر مقدار ممکن DecimalField(20, 5)
+SORT_NUMBER_MIN = -10 ** 15
+
+
+def values_subquery(field: Field, **lookups):
+    """زیرکوئری مقادیر یک فیلد برای رکورد بیرونی (OuterRef('pk')) در جدول هدر یا اقلام."""
+    if field.section == 'ITEM':
+        return ItemValue.objects.filter(item__header_id=OuterRef('pk'), field=field, **lookups)
+    return HeaderValue.objects.filter(header_id=OuterRef('pk'), field=field, **lookups)
+
+
+def _parse_scalar(field: Field, raw: str):
+    raw = raw.strip()
+    try:
+        if field.field_type == 'NUMBER':
+            return Decimal(raw)
+        if field.field_type == 'LOOKUP':
+            return parse_lookup_id(raw)
+        if field.field_type == 'DATE':
+            # ورودی تاریخ مثل مسیر ثبت رکورد، شمسی است و روی ستون میلادی مقایسه می‌شود
+            return parse_jalali(raw)[0]
+    except (ValueError, InvalidOperation):
+        raise ValidationError({f'{FIELD_FILTER_PREFIX}{field.code}': f"مقدار '{raw}' برای فیلد '{field.name}' نامعتبر است."})
+    return raw
+
+
+def field_condition(field: Field, lookup: str, raw: str, projected: bool = False):
+    """
+    یک شرط فیلتر (مثل amount__gte=100) را به یک EXISTS روی جداول مقادیر تبدیل می‌کند؛
+    با projected=True شرط مستقیماً روی ستون JSON جدول تخت فرم اعمال می‌شود.
+    """
+    if lookup not in FIELD_FILTER_LOOKUPS:
+        raise ValidationError({f'{FIELD_FILTER_PREFIX}{field.code}': f"عملگر '{lookup}' پشتیبانی نمی‌شود."})
+
+    column = value_column_for(field.field_type)
+    if lookup == 'isnull':
+        is_null = raw.lower() in ('1', 'true')
+        if projected:
+            return projection_condition(field, lookup, is_null)
+        has_value = Exists(values_subquery(field, **{f'{column}__isnull': False}))
+        return ~has_value if is_null else has_value
+    if lookup == 'period':
+        # سال، فصل یا ماه شمسی (1403، 1403-Q2، 1403-02) به بازه میلادی روی ایندکس (field, date) تبدیل می‌شود
+        if field.field_type != 'DATE':
+            raise ValidationError({f'{FIELD_FILTER_PREFIX}{field.code}': "عملگر period فقط برای فیلدهای تاریخی است."})
+        try:
+            values = list(parse_jalali_period(raw))
+        except ValueError:
+            raise ValidationError({f'{FIELD_FILTER_PREFIX}{field.code}': f"دوره '{raw}' نامعتبر است (مثلاً 1403، 1403-Q2 یا 1403-02)."})
+        if projected:
+            return projection_condition(field, 'range', values)
+        return Exists(values_subquery(field, **{f'{column}__range': values}))
+    if lookup in ('range', 'in'):
+        values = [_parse_scalar(field, part) for part in raw.split(',') if part.strip()]
+        if lookup == 'range' and len(values) != 2:
+            raise ValidationError({f'{FIELD_FILTER_PREFIX}{field.code}': "بازه باید به شکل «از,تا» باشد."})
+        if projected:
+            return projection_condition(field, lookup, values)
+        return Exists(values_subquery(field, **{f'{column}__{lookup}': values}))
+    if lookup == 'icontains':
+        if projected:
+            return projection_condition(field, lookup, raw)
+        return Exists(values_subquery(field, **{'value_text__icontains': raw}))
+    value = _parse_scalar(field, raw)
+    if projected:
+        return projection_condition(field, lookup, value)
+    return Exists(values_subquery(field, **{f'{column}__{lookup}': value}))
+
+
+def sort_expression(field: Field, projected: bool = False):
+    """
+    مقدار یک فیلد هدر برای مرتب‌سازی. مقدار خالی با کمترین مقدار ممکن جایگزین می‌شود
+    چون صفحه‌بندی cursor موقعیت را از همین مقدار می‌سازد و None را نمی‌پذیرد.
+    """
+    is_number = field.field_type in ['NUMBER', 'LOOKUP']
+    if projected:
+        value = KeyTextTransform(projection_key(field.pk), 'projection__data')
+        if is_number:
+            return Coalesce(Cast(value, FloatField()), Value(SORT_NUMBER_MIN, output_field=FloatField()))
+        return Coalesce(value, Value('', output_field=TextField()))
+
+    column = value_column_for(field.field_type)
+    value = Subquery(HeaderValue.objects.filter(header_id=OuterRef('pk'), field=field).values(column)[:1])
+    if field.field_type == 'LOOKUP':
+        return Coalesce(value, Value(SORT_NUMBER_MIN, output_field=BigIntegerField()))
+    if is_number:
+        return Coalesce(value, Value(Decimal(SORT_NUMBER_MIN), output_field=DecimalField(max_digits=20, decimal_places=5)))
+    if field.field_type == 'DATE':
+        return Coalesce(value, Value(datetime.date.min, output_field=DateField()))
+    return Coalesce(value, Value('', output_field=TextField()))
+
+
+class FieldValueFilter(BaseFilterBackend):
+    """
+    فیلتر رکوردها بر اساس کد فیلد: ?f.amount__gte=100 یا ?f.date__range=1403-01-01,1403-01-31 یا ?f.customer=<id>
+    یا دوره شمسی ?f.date__period=1403-Q2
+    هر شرط به یک زیرکوئری EXISTS تبدیل می‌شود، پس نیازی به join چندگانه و distinct نیست.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = []
+        for key in request.query_params:
+            if not key.startswith(FIELD_FILTER_PREFIX):
+                continue
+            code, _, lookup = key[len(FIELD_FILTER_PREFIX):].partition('__')
+            conditions.append((code, lookup or 'exact', request.query_params[key]))
+        if not conditions:
+            return queryset
+
+        schema = view.get_form_schema()
+        for code, lookup, raw in conditions:
+            field = schema.fields_by_code.get(code)
+            if field is None:
+                raise ValidationError({f'{FIELD_FILTER_PREFIX}{code}': "فیلدی با این کد در فرم وجود ندارد."})
+            projected = schema.has_projection and field.section == 'HEADER'
+            queryset = queryset.filter(field_condition(field, lookup, raw, projected))
+        return queryset
+
+
+class FieldOrderingFilter(BaseFilterBackend):
+    """
+    مرتب‌سازی بر اساس یک فیلد هدر: ?ordering=amount یا ?ordering=-amount
+    مقدار فیلد با نام sort_value روی کوئری annotate می‌شود و RecordCursorPagination از آن استفاده می‌کند.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        param = request.query_params.get(ORDERING_PARAM)
+        if not param:
+            return queryset
+        schema = view.get_form_schema()
+        field = schema.fields_by_code.get(param.lstrip('-'))
+        if field is None or field.section != 'HEADER':
+            raise ValidationError({ORDERING_PARAM: "مرتب‌سازی فقط بر اساس کد یکی از فیلدهای هدر فرم ممکن است."})
+        if schema.has_projection:
+            # مانند projection_condition، تا شرط ایندکس‌های جزئی جدول تخت در PostgreSQL برقرار باشد
+            queryset = queryset.filter(projection__form_id=field.form_id)
+        return queryset.annotate(**{SORT_ANNOTATION: sort_expression(field, schema.has_projection)})
+
+
+class RecordSearchFilter(SearchFilter):
+    """جستجوی متنی روی مقادیر هدر با EXISTS؛ برخلاف join روی values ردیف تکراری تولید نمی‌کند."""
+
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            matches = HeaderValue.objects.filter(header_id=OuterRef('pk')).filter(
+                Q(value_text__icontains=term) | Q(value_number__icontains=term)
+            )
+            queryset = queryset.filter(Exists(matches))
+        return queryset
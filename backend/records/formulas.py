@@ -0,0 +1,193 @@
+# backend/records/formulas.py
+
+import ast
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+# فرمول‌ها همان نحو فرانت‌اند را دارند: عبارت ریاضی روی کد فیلدها، و در سطح تجمعی SUM(code)
+AGGREGATE_FUNCTIONS = ['SUM', 'AVG', 'MIN', 'MAX', 'COUNT']
+LEVEL_ORDER = ['ITEM', 'AGGREGATE', 'HEADER']
+
+_BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow)
+_UNARY_OPERATORS = (ast.UAdd, ast.USub)
+_DECIMAL = '__decimal__'
+_ZERO = Decimal(0)
+
+
+class FormulaError(ValueError):
+    pass
+
+
+class CompiledFormula:
+    """
+    فرمول پارس و اعتبارسنجی‌شده که به یک تابع پایتون روی Decimal کامپایل شده است.
+    names: کد فیلدهایی که فرمول به آن‌ها وابسته است (به ترتیب آرگومان‌های تابع)
+    aggregates: لیست (تابع تجمعی، کد فیلد اقلام) به ترتیب آرگومان‌های بعد از names
+    """
+
+    __slots__ = ('names', 'aggregates', 'function')
+
+    def __init__(self, names, aggregates, function):
+        self.names = names
+        self.aggregates = aggregates
+        self.function = function
+
+
+class _AggregateExtractor(ast.NodeTransformer):
+    def __init__(self):
+        self.aggregates = []
+
+    def visit_Call(self, node):
+        if not (isinstance(node.func, ast.Name) and node.func.id.upper() in AGGREGATE_FUNCTIONS):
+            raise FormulaError("فقط توابع تجمعی SUM، AVG، MIN، MAX و COUNT مجاز هستند.")
+        if len(node.args) != 1 or node.keywords or not isinstance(node.args[0], ast.Name):
+            raise FormulaError(f"تابع {node.func.id} باید دقیقاً یک کد فیلد بگیرد.")
+        spec = (node.func.id.upper(), node.args[0].id)
+        if spec not in self.aggregates:
+            self.aggregates.append(spec)
+        return ast.copy_location(ast.Name(id=f'__agg_{self.aggregates.index(spec)}', ctx=ast.Load()), node)
+
+
+class _Validator(ast.NodeTransformer):
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Name, ast.Constant, ast.Load)
+                          + _BINARY_OPERATORS + _UNARY_OPERATORS):
+            raise FormulaError(f"عبارت '{type(node).__name__}' در فرمول مجاز نیست.")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise FormulaError("در فرمول فقط اعداد ثابت مجاز هستند.")
+        # ثابت‌ها هم Decimal می‌شوند تا محاسبات مالی دقیق بماند
+        call = ast.Call(func=ast.Name(id=_DECIMAL, ctx=ast.Load()), args=[ast.Constant(repr(node.value))], keywords=[])
+        return ast.copy_location(call, node)
+
+
+@lru_cache(maxsize=2048)
+def compile_formula(formula: str, allow_aggregates: bool = True) -> CompiledFormula:
+    """فرمول را یک بار پارس و کامپایل می‌کند؛ نتیجه بر اساس متن فرمول کش می‌شود."""
+    try:
+        tree = ast.parse((formula or '').strip(), mode='eval')
+    except SyntaxError as e:
+        raise FormulaError(f"فرمول نامعتبر است: {e.msg}")
+
+    extractor = _AggregateExtractor()
+    tree = extractor.visit(tree)
+    if extractor.aggregates and not allow_aggregates:
+        raise FormulaError("توابع تجمعی فقط در فرمول‌های سطح تجمعی یا هدر مجاز هستند.")
+    tree = _Validator().visit(tree)
+
+    aggregate_names = [f'__agg_{i}' for i in range(len(extractor.aggregates))]
+    names = sorted({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)} - set(aggregate_names) - {_DECIMAL})
+
+    arguments = ast.arguments(
+        posonlyargs=[], args=[ast.arg(arg=name) for name in names + aggregate_names],
+        kwonlyargs=[], kw_defaults=[], defaults=[],
+    )
+    lambda_tree = ast.fix_missing_locations(ast.Expression(body=ast.Lambda(args=arguments, body=tree.body)))
+    function = eval(compile(lambda_tree, '<formula>', 'eval'), {'__builtins__': {}, _DECIMAL: Decimal})
+    return CompiledFormula(names, extractor.aggregates, function)
+
+
+def to_decimal(value):
+    # مانند فرانت‌اند: مقدار خالی یا غیرعددی صفر حساب می‌شود
+    if value is None or isinstance(value, dict):
+        return _ZERO
+    try:
+        return Decimal(str(value).strip() or 0)
+    except InvalidOperation:
+        return _ZERO
+
+
+def _format_result(value):
+    if value is None or not value.is_finite():
+        return None
+    return format(value, 'f')
+
+
+def _safe_call(function, *args):
+    try:
+        return function(*args)
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+
+
+def _aggregate(func, column, present):
+    values = [v for v, has_value in zip(column, present) if has_value]
+    if func == 'SUM': return sum(column, _ZERO)
+    if func == 'COUNT': return Decimal(len(values))
+    if not values: return None
+    if func == 'AVG': return sum(values, _ZERO) / len(values)
+    if func == 'MIN': return min(values)
+    return max(values)
+
+
+def _dependency_order(fields, formulas):
+    """فیلدهای یک سطح را بر اساس وابستگی مرتب می‌کند؛ در تساوی computation_order تعیین‌کننده است."""
+    pending = sorted(fields, key=lambda f: (f.computation_order, f.pk))
+    codes = {f.code for f in pending}
+    ordered, done = [], set()
+    while pending:
+        for field in pending:
+            deps = set(formulas[field.code].names) | {code for _, code in formulas[field.code].aggregates}
+            if not (deps & codes) - done - {field.code}:
+                break
+        else:
+            # وابستگی حلقوی: بقیه به ترتیب computation_order محاسبه می‌شوند
+            field = pending[0]
+        pending.remove(field)
+        done.add(field.code)
+        ordered.append(field)
+    return ordered
+
+
+class ComputationPlan:
+    """ترتیب و فرمول‌های کامپایل‌شده فیلدهای محاسباتی یک فرم."""
+
+    def __init__(self, fields):
+        computed = [f for f in fields if f.is_computed and f.computation_formula and f.computation_level in LEVEL_ORDER]
+        self.steps = {level: [] for level in LEVEL_ORDER}
+        formulas = {}
+        for field in computed:
+            try:
+                formulas[field.code] = compile_formula(field.computation_formula, field.computation_level != 'ITEM')
+            except FormulaError:
+                # فرمول نامعتبر قدیمی نباید ثبت رکورد را متوقف کند
+                continue
+        for level in LEVEL_ORDER:
+            level_fields = [f for f in computed if f.computation_level == level and f.code in formulas]
+            self.steps[level] = [(f.code, formulas[f.code]) for f in _dependency_order(level_fields, formulas)]
+
+    def __bool__(self):
+        return any(self.steps.values())
+
+    def apply(self, header_data: dict, items_data: list):
+        """مقادیر محاسباتی را حساب می‌کند و نسخه جدید (header_data, items_data) را برمی‌گرداند."""
+        header_data = dict(header_data or {})
+        items_data = [dict(item) if item else item for item in (items_data or [])]
+        rows = [item for item in items_data if item]
+
+        # ستون‌های Decimal اقلام یک بار ساخته و بین فرمول‌ها به اشتراک گذاشته می‌شوند
+        columns = {}
+
+        def column(code):
+            if code not in columns:
+                columns[code] = [to_decimal(row.get(code)) for row in rows]
+            return columns[code]
+
+        for code, formula in self.steps['ITEM']:
+            results = list(map(lambda *args: _safe_call(formula.function, *args), *[column(n) for n in formula.names])) \
+                if formula.names else [_safe_call(formula.function)] * len(rows)
+            columns[code] = [r if r is not None else _ZERO for r in results]
+            for row, result in zip(rows, results):
+                row[code] = _format_result(result)
+
+        for level in ('AGGREGATE', 'HEADER'):
+            for code, formula in self.steps[level]:
+                args = [to_decimal(header_data.get(name)) for name in formula.names]
+                for func, item_code in formula.aggregates:
+                    present = [row.get(item_code) not in (None, '') for row in rows]
+                    args.append(_aggregate(func, column(item_code), present))
+                header_data[code] = _format_result(_safe_call(formula.function, *args))
+
+        return header_data, items_data
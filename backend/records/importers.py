@@ -0,0 +1,316 @@
+# backend/records/importers.py
+
+import codecs
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from form_builder.models import Form
+from .jalali import parse_jalali
+from .lookups import parse_lookup_id
+from .models import HeaderValue, ItemValue, UniqueValueKey, value_column_for
+from .services import _build_values, bulk_create_records
+from .schema import get_form_schema
+from .sequences import advance_past, allocate_values
+from .uniqueness import duplicate_message, unique_key
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_FORMATS = ['csv', 'jsonl']
+
+# در CSV ردیف‌های پشت‌سرهم با مقدار یکسان در این ستون، اقلام یک رکورد دوبخشی هستند
+RECORD_KEY_COLUMN = '_record'
+
+
+def guess_import_format(filename: str) -> str:
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('jsonl', 'ndjson'): return 'jsonl'
+    return 'csv'
+
+
+def _split_row(row: dict, item_codes: set):
+    header_values = {k: v for k, v in row.items() if k not in item_codes and k != RECORD_KEY_COLUMN}
+    item_values = {k: v for k, v in row.items() if k in item_codes}
+    return header_values, item_values
+
+
+def iter_csv_records(lines, item_codes: set):
+    """
+    رکوردها را از خطوط یک فایل CSV به صورت جریانی می‌خواند.
+    خروجی: (شماره خط، {'header_values': ..., 'items': [...]})
+    """
+    reader = csv.DictReader(lines)
+    current_key, current_line, current = None, None, None
+    for row in reader:
+        key = row.get(RECORD_KEY_COLUMN)
+        header_values, item_values = _split_row(row, item_codes)
+        if current is not None and key and key == current_key:
+            current['items'].append(item_values)
+            continue
+        if current is not None:
+            yield current_line, current
+        current_key, current_line = key, reader.line_num
+        current = {'header_values': header_values, 'items': [item_values] if any(item_values.values()) else []}
+    if current is not None:
+        yield current_line, current
+
+
+def iter_jsonl_records(lines, item_codes: set):
+    """هر خط یک شیء JSON است: یا به شکل {'header_values', 'items'} یا یک دیکشنری تخت از کد فیلدها."""
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValidationError(f"خط JSON نامعتبر است: {e}")
+            continue
+        if not isinstance(obj, dict):
+            yield line_number, ValidationError("هر خط باید یک شیء JSON باشد.")
+            continue
+        if 'header_values' in obj or 'items' in obj:
+            header_values, items = obj.get('header_values') or {}, obj.get('items') or []
+        else:
+            header_values, _ = _split_row(obj, item_codes)
+            items = []
+        if not isinstance(header_values, dict):
+            yield line_number, ValidationError("header_values باید یک شیء JSON باشد.")
+        elif not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            yield line_number, ValidationError("items باید آرایه‌ای از شیءهای JSON باشد.")
+        else:
+            yield line_number, {'header_values': header_values, 'items': items}
+
+
+def iter_import_records(stream, import_format: str, item_codes: set):
+    # stream هر شیء قابل پیمایشی از خطوط بایتی است (فایل آپلودشده یا فایل باز شده با 'rb')
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if import_format == 'jsonl':
+        return iter_jsonl_records(lines, item_codes)
+    return iter_csv_records(lines, item_codes)
+
+
+def _is_empty(value):
+    return value is None or str(value).strip() == ''
+
+
+class RecordImporter:
+    """
+    رکوردها را به صورت دسته‌ای (chunk) وارد یک فرم می‌کند.
+    خطای هر ردیف ثبت می‌شود و بقیه فایل ادامه پیدا می‌کند؛ حافظه مصرفی فقط به اندازه یک دسته است.
+    """
+
+    def __init__(self, form: Form, chunk_size: int = IMPORT_CHUNK_SIZE, max_errors: int = 1000):
+        self.form = form
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+        schema = get_form_schema(form)
+        self.fields_map = schema.fields_by_code
+        self.item_codes = schema.item_codes
+        self.lookup_fields = schema.lookup_fields
+        self.unique_fields = schema.unique_fields
+        self.auto_increment_fields = schema.auto_increment_fields
+        self.plan = schema.plan
+
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, records) -> dict:
+        chunk = []
+        for entry in records:
+            chunk.append(entry)
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+        return self.summary()
+
+    def summary(self) -> dict:
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def _add_error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def _import_chunk(self, chunk):
+        first_error = len(self.errors)
+        try:
+            self._import_rows(chunk)
+        finally:
+            # خطاهای هر دسته در مراحل مختلف ثبت می‌شوند؛ به ترتیب ردیف مرتبشان می‌کنیم
+            self.errors[first_error:] = sorted(self.errors[first_error:], key=lambda e: e['row'])
+
+    def _import_rows(self, chunk):
+        rows = []
+        for row_number, data in chunk:
+            if isinstance(data, ValidationError):
+                self._add_error(row_number, _error_text(data))
+            else:
+                rows.append((row_number, data))
+
+        rows = self._resolve_lookups(rows)
+        self._allocate_auto_values(rows)
+        rows = self._build(rows)
+        rows = self._check_unique(rows)
+        if not rows:
+            return
+
+        try:
+            with transaction.atomic():
+                bulk_create_records(self.form, [built for _, built in rows])
+                self._advance_sequences(rows)
+        except ValidationError as e:
+            # مقدار یکتایی که بعد از بررسی بالا همزمان در درخواست دیگری ثبت شده؛ کل دسته ثبت نمی‌شود
+            for row_number, _ in rows:
+                self._add_error(row_number, _error_text(e))
+            return
+        self.created += len(rows)
+
+    def _allocate_auto_values(self, rows):
+        """
+        مانند ثبت تکی، فیلد افزایشی خالی از شمارنده فیلد شماره می‌گیرد؛ برای کل دسته یک تخصیص انجام می‌شود.
+        شماره ردیف‌هایی که بعداً رد شوند مصرف‌شده می‌ماند (مانند حالت reserve).
+        """
+        for field in self.auto_increment_fields:
+            blanks = []
+            for _, data in rows:
+                data['header_values'] = data['header_values'] or {}
+                if _is_empty(data['header_values'].get(field.code)):
+                    blanks.append(data['header_values'])
+            if blanks:
+                for values, number in zip(blanks, allocate_values(field, len(blanks))):
+                    values[field.code] = str(number)
+
+    def _advance_sequences(self, rows):
+        # شماره‌های واردشده دستی بزرگ‌تر از شمارنده، آن را جلو می‌برند تا پیشنهاد بعدی تکراری نباشد
+        for field in self.auto_increment_fields:
+            numbers = [
+                header_values[field.pk].value_number for _, (header_values, _) in rows
+                if field.pk in header_values and header_values[field.pk].value_number is not None
+            ]
+            if numbers:
+                advance_past(field, int(max(numbers)))
+
+    def _resolve_lookups(self, rows):
+        """کد مرجع هر مقدار لوکاپ را با یک کوئری برای هر فیلد لوکاپ به شناسه رکورد تبدیل می‌کند."""
+        for field in self.lookup_fields:
+            ref_field = field.lookup_reference_field
+            column = value_column_for(ref_field.field_type)
+            sections = [row['items'] for _, row in rows] if field.section == 'ITEM' else [[row['header_values']] for _, row in rows]
+
+            codes = {}
+            for section in sections:
+                for values in section:
+                    raw = values.get(field.code)
+                    if not _is_empty(raw):
+                        codes[raw] = _normalize_code(raw, column)
+            if not codes:
+                continue
+
+            targets = {}
+            wanted = {code for code in codes.values() if code is not None}
+            matches = HeaderValue.objects.filter(field=ref_field, **{f'{column}__in': wanted})
+            for code, header_id in matches.values_list(column, 'header_id'):
+                targets[code] = header_id
+
+            for section in sections:
+                for values in section:
+                    raw = values.get(field.code)
+                    if not _is_empty(raw):
+                        target = targets.get(codes[raw])
+                        # کد ناشناخته به شکل یک خطای ردیف در مرحله بعد گزارش می‌شود
+                        values[field.code] = str(target) if target is not None else _UnresolvedLookup(raw)
+        return rows
+
+    def _build(self, rows):
+        built_rows = []
+        for row_number, data in rows:
+            try:
+                _check_unresolved(data, self.fields_map)
+                if self.plan:
+                    data['header_values'], data['items'] = self.plan.apply(data['header_values'], data['items'])
+                header_values = _build_values(HeaderValue, data['header_values'] or {}, self.fields_map)
+                items = [_build_values(ItemValue, item or {}, self.fields_map) for item in data['items'] if item]
+            except ValidationError as e:
+                self._add_error(row_number, _error_text(e))
+                continue
+            built_rows.append((row_number, (header_values, items)))
+        return built_rows
+
+    def _check_unique(self, rows):
+        """
+        تکراری بودن مقادیر فیلدهای یکتا (هدر و اقلام) را برای کل دسته با یک کوئری روی جدول کلیدها بررسی می‌کند
+        تا خطا به ردیف مربوط نسبت داده شود؛ تضمین نهایی همان ایندکس یکتای جدول هنگام درج است.
+        """
+        field_ids = {field.pk for field in self.unique_fields}
+        if not field_ids:
+            return rows
+
+        keys = {}
+        for index, (_, (header_values, items)) in enumerate(rows):
+            for values in [header_values, *items]:
+                for value_obj in values.values():
+                    if value_obj.field_id in field_ids:
+                        key = unique_key(value_obj)
+                        if key is not None:
+                            keys.setdefault((value_obj.field_id, key), []).append((index, value_obj))
+        if not keys:
+            return rows
+
+        existing = set(
+            UniqueValueKey.objects.filter(
+                field_id__in={field_id for field_id, _ in keys}, key__in={key for _, key in keys},
+            ).values_list('field_id', 'key')
+        )
+        rejected = set()
+        for field_key, occurrences in keys.items():
+            # اولین ردیف یک مقدار تکراری درون همین دسته پذیرفته می‌شود، مگر اینکه قبلاً در دیتابیس باشد
+            duplicates = occurrences if field_key in existing else occurrences[1:]
+            for index, value_obj in duplicates:
+                if index not in rejected:
+                    rejected.add(index)
+                    self._add_error(rows[index][0], duplicate_message(value_obj))
+
+        return [row for index, row in enumerate(rows) if index not in rejected]
+
+
+class _UnresolvedLookup(str):
+    pass
+
+
+def _check_unresolved(data, fields_map):
+    for values in [data['header_values'] or {}] + [item or {} for item in data['items']]:
+        for code, value in values.items():
+            if isinstance(value, _UnresolvedLookup):
+                raise ValidationError(f"رکوردی با کد '{value}' برای فیلد '{fields_map[code].name}' پیدا نشد.")
+
+
+def _normalize_code(raw, column):
+    """کد مرجع خوانده‌شده از فایل به شکل ستون ذخیره‌شده؛ None یعنی کد نامعتبر (و پیدا نشده)."""
+    try:
+        if column == 'value_number':
+            return Decimal(str(raw).strip())
+        if column == 'value_date_gregorian':
+            return parse_jalali(str(raw))[0]
+        if column == 'value_lookup':
+            return parse_lookup_id(raw)
+    except (InvalidOperation, ValueError):
+        return None
+    return str(raw)
+
+
+def _error_text(error: ValidationError) -> str:
+    detail = error.detail
+    if isinstance(detail, list):
+        return ' '.join(str(d) for d in detail)
+    return str(detail)
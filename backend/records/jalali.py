@@ -0,0 +1,104 @@
+# backend/records/jalali.py
+
+import datetime
+from functools import lru_cache
+
+# تبدیل محاسباتی شمسی ↔ میلادی با شماره روز (ordinal)؛ قاعده کبیسه همان چرخه ۳۳ ساله jdatetime است
+_LEAP_REMAINDERS = (1, 5, 9, 13, 17, 22, 26, 30)
+# تعداد سال‌های کبیسه در باقی‌مانده‌های 1..r از یک چرخه ۳۳ ساله
+_LEAPS_UPTO = [sum(1 for s in _LEAP_REMAINDERS if s <= r) for r in range(33)]
+_DAYS_BEFORE_MONTH = [0, 0, 31, 62, 93, 124, 155, 186, 216, 246, 276, 306, 336]
+_CYCLE_DAYS = 33 * 365 + 8
+JALALI_MIN_YEAR, JALALI_MAX_YEAR = 1, 9377
+
+QUARTER_MONTHS = {1: (1, 3), 2: (4, 6), 3: (7, 9), 4: (10, 12)}
+_MEMO_SIZE = 4096
+
+
+def is_leap(year: int) -> bool:
+    return year % 33 in _LEAP_REMAINDERS
+
+
+def month_length(year: int, month: int) -> int:
+    if month <= 6:
+        return 31
+    if month <= 11:
+        return 30
+    return 30 if is_leap(year) else 29
+
+
+def _days_before_year(year: int) -> int:
+    previous = year - 1
+    return 365 * previous + 8 * (previous // 33) + _LEAPS_UPTO[previous % 33]
+
+
+# شماره روز میلادیِ روز قبل از ۱ فروردین سال ۱ (۱ فروردین ۱۴۰۳ = ۲۰ مارس ۲۰۲۴)
+_EPOCH = datetime.date(2024, 3, 20).toordinal() - 1 - _days_before_year(1403)
+
+
+def jalali_to_gregorian(year: int, month: int, day: int) -> datetime.date:
+    if not (JALALI_MIN_YEAR <= year <= JALALI_MAX_YEAR and 1 <= month <= 12 and 1 <= day <= month_length(year, month)):
+        raise ValueError(f"تاریخ شمسی {year}/{month}/{day} معتبر نیست.")
+    return datetime.date.fromordinal(_EPOCH + _days_before_year(year) + _DAYS_BEFORE_MONTH[month] + day)
+
+
+def gregorian_to_jalali(value: datetime.date) -> tuple:
+    days = value.toordinal() - _EPOCH
+    year = 33 * days // _CYCLE_DAYS + 1
+    while _days_before_year(year) >= days:
+        year -= 1
+    while _days_before_year(year + 1) < days:
+        year += 1
+    day_of_year = days - _days_before_year(year)
+    month = (day_of_year - 1) // 31 + 1 if day_of_year <= 186 else (day_of_year - 187) // 30 + 7
+    return year, month, day_of_year - _DAYS_BEFORE_MONTH[month]
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def parse_jalali(text: str) -> tuple:
+    """
+    ورودی شمسی «YYYY-MM-DD» یا «YYYY/MM/DD» (بخش ساعت پس از T نادیده گرفته می‌شود) را به
+    (تاریخ میلادی، رشته شمسی ذخیره‌شده YYYY/MM/DD) تبدیل می‌کند؛ نتایج برای تاریخ‌های تکراری نگه داشته می‌شوند.
+    """
+    parts = text.strip().split('T')[0].replace('/', '-').split('-')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"'{text}' با قالب YYYY-MM-DD مطابقت ندارد.")
+    year, month, day = map(int, parts)
+    return jalali_to_gregorian(year, month, day), f'{year:04d}/{month:02d}/{day:02d}'
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def format_jalali(value: datetime.date) -> str:
+    return '%04d/%02d/%02d' % gregorian_to_jalali(value)
+
+
+def format_jalali_many(dates) -> dict:
+    """تبدیل دسته‌ای برای گزارش و خروجی؛ خروجی: تاریخ میلادی -> رشته شمسی"""
+    return {value: format_jalali(value) for value in set(dates) if value is not None}
+
+
+def jalali_period_range(year: int, month: int = None, quarter: int = None) -> tuple:
+    """بازه میلادی (شروع، پایان، هر دو شامل) یک سال، فصل یا ماه شمسی برای شرط BETWEEN روی ستون میلادی."""
+    if month is not None:
+        first, last = month, month
+    elif quarter is not None:
+        if quarter not in QUARTER_MONTHS:
+            raise ValueError(f"فصل {quarter} معتبر نیست.")
+        first, last = QUARTER_MONTHS[quarter]
+    else:
+        first, last = 1, 12
+    return jalali_to_gregorian(year, first, 1), jalali_to_gregorian(year, last, month_length(year, last))
+
+
+def parse_jalali_period(text: str) -> tuple:
+    """«1403» (سال)، «1403-02» (ماه) یا «1403-Q2» (فصل) را به بازه میلادی تبدیل می‌کند."""
+    year, _, part = text.strip().replace('/', '-').partition('-')
+    if not year.isdigit():
+        raise ValueError(f"'{text}' یک دوره شمسی معتبر نیست.")
+    if not part:
+        return jalali_period_range(int(year))
+    if part[:1] in ('Q', 'q') and part[1:].isdigit():
+        return jalali_period_range(int(year), quarter=int(part[1:]))
+    if part.isdigit():
+        return jalali_period_range(int(year), month=int(part))
+    raise ValueError(f"'{text}' یک دوره شمسی معتبر نیست.")
@@ -0,0 +1,116 @@
+# backend/records/lookups.py
+
+from decimal import Decimal
+
+from .models import HeaderValue
+
+# حداکثر تعداد شناسه در هر عبارت IN (برای محدودیت متغیرهای SQLite)
+LOOKUP_BATCH_SIZE = 500
+
+
+def format_lookup_code(value, field_type):
+    # حذف صفرهای اضافی از کدهای عددی (مثلاً 12.00000 -> 12)
+    if field_type == 'NUMBER' and value is not None:
+        return int(value) if value == int(value) else value
+    return value
+
+
+def parse_lookup_id(value) -> int:
+    """شناسه رکورد مرجع؛ ورودی‌هایی مثل '12' یا 12.0 پذیرفته می‌شوند ولی عدد اعشاری نه."""
+    number = Decimal(str(value).strip())
+    if number != number.to_integral_value():
+        raise ValueError(f"شناسه رکورد '{value}' باید عدد صحیح باشد.")
+    return int(number)
+
+
+class LookupResolver:
+    """
+    مقادیر مرجع و نمایشی رکوردهای لوکاپ را به صورت دسته‌ای واکشی و کش می‌کند
+    تا سریالایزرها برای هر مقدار لوکاپ کوئری جداگانه نزنند.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._loaded = set()
+
+    def prime(self, value_objs):
+        """همه جفت‌های (رکورد مرجع، فیلد) مورد نیاز این مقادیر را با یک کوئری بارگذاری می‌کند."""
+        record_ids, field_ids = set(), set()
+        for value_obj in value_objs:
+            if value_obj.field_type != 'LOOKUP' or value_obj.value_lookup is None:
+                continue
+            field, record_id = value_obj.field, value_obj.value_lookup
+            for field_id in (field.lookup_reference_field_id, field.lookup_display_field_id):
+                if field_id and (record_id, field_id) not in self._loaded:
+                    record_ids.add(record_id)
+                    field_ids.add(field_id)
+        self._fetch(record_ids, field_ids)
+
+    def prime_records(self, records):
+        self.prime(_iter_record_values(records))
+
+    def prime_ids(self, record_ids, field_ids):
+        """بارگذاری مستقیم بر اساس شناسه‌ها (برای مسیرهایی که با values_list کار می‌کنند)."""
+        self._fetch(
+            {record_id for record_id in record_ids for field_id in field_ids if (record_id, field_id) not in self._loaded},
+            set(field_ids),
+        )
+
+    def __len__(self):
+        return len(self._loaded)
+
+    def clear(self):
+        self._values.clear()
+        self._loaded.clear()
+
+    def _fetch(self, record_ids, field_ids):
+        if not record_ids or not field_ids:
+            return
+        record_ids = sorted(record_ids)
+        for start in range(0, len(record_ids), LOOKUP_BATCH_SIZE):
+            chunk = record_ids[start:start + LOOKUP_BATCH_SIZE]
+            # نوع هر مقدار روی خود ردیف است، پس join با جدول فیلدها لازم نیست
+            values = HeaderValue.objects.filter(header_id__in=chunk, field_id__in=field_ids)
+            for value_obj in values:
+                self._values[(value_obj.header_id, value_obj.field_id)] = value_obj
+            self._loaded.update((record_id, field_id) for record_id in chunk for field_id in field_ids)
+
+    def get(self, record_id, field_id):
+        """مقدار فیلد `field_id` از رکورد مرجع `record_id` (یا None اگر وجود نداشته باشد)."""
+        key = (record_id, field_id)
+        if key not in self._loaded:
+            self._fetch({record_id}, {field_id})
+        return self._values.get(key)
+
+    def get_code(self, value_obj):
+        """کد (مقدار فیلد مرجع) رکوردی که مقدار لوکاپ به آن اشاره می‌کند."""
+        return self.code_for(value_obj.field, value_obj.value_lookup)
+
+    def get_label(self, value_obj):
+        """برچسب «کد - نمایش» برای یک مقدار لوکاپ."""
+        return self.label_for(value_obj.field, value_obj.value_lookup)
+
+    def code_for(self, field, record_id):
+        ref_val_obj = self.get(record_id, field.lookup_reference_field_id)
+        if ref_val_obj is None:
+            return record_id
+        return ref_val_obj.get_value()
+
+    def label_for(self, field, record_id):
+        if not field.lookup_reference_field_id or not field.lookup_display_field_id:
+            return str(record_id)
+
+        ref_val_obj = self.get(record_id, field.lookup_reference_field_id)
+        disp_val_obj = self.get(record_id, field.lookup_display_field_id)
+        if ref_val_obj is None or disp_val_obj is None:
+            return str(record_id)
+
+        ref_val = format_lookup_code(ref_val_obj.get_value(), ref_val_obj.field_type)
+        return f"{ref_val} - {disp_val_obj.get_value()}"
+
+
+def _iter_record_values(records):
+    for record in records:
+        yield from record.values.all()
+        for item in record.items.all():
+            yield from item.values.all()
@@ -0,0 +1,70 @@
+# backend/records/management/commands/benchmark_record_writes.py
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from form_builder.models import Field, Form
+from records.services import create_or_update_record
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "زمان ثبت و ویرایش یک رکورد دوبخشی با تعداد اقلام مختلف (create_or_update_record) را اندازه می‌گیرد. "
+        "فرم آزمون و رکوردها داخل یک تراکنش ساخته و در پایان rollback می‌شوند؛ "
+        "برای مقایسه قبل و بعد از یک تغییر، دستور روی هر دو نسخه کد اجرا شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', default='10,100,1000', help="تعداد اقلام هر رکورد (جدا شده با کاما)")
+        parser.add_argument('--fields', type=int, default=10, help="تعداد فیلد عددی بخش اقلام")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['items'].split(',')]
+        except ValueError:
+            raise CommandError("--items باید فهرستی از اعداد باشد.")
+
+        results = []
+        try:
+            with transaction.atomic():
+                form = Form.objects.create(code='__benchmark_writes', name='benchmark', form_type='DOUBLE_SECTION')
+                Field.objects.create(form=form, code='title', name='title', field_type='TEXT')
+                codes = [f'f{index}' for index in range(options['fields'])]
+                for code in codes:
+                    Field.objects.create(form=form, code=code, name=code, field_type='NUMBER', section='ITEM')
+
+                for size in sizes:
+                    create_times, update_times = [], []
+                    for run in range(options['repeat']):
+                        data = {
+                            'header_values': {'title': f'record {run}'},
+                            'items': [{code: str(row * 10 + col) for col, code in enumerate(codes)} for row in range(size)],
+                        }
+                        started = time.perf_counter()
+                        record = create_or_update_record(form, data)
+                        create_times.append((time.perf_counter() - started) * 1000)
+
+                        # نیمی از خانه‌ها تغییر می‌کنند تا هم مسیر مقایسه و هم مسیر درج سنجیده شود
+                        data['items'] = [
+                            {code: str(int(value) + 1) if col % 2 else value for col, (code, value) in enumerate(item.items())}
+                            for item in data['items']
+                        ]
+                        started = time.perf_counter()
+                        create_or_update_record(form, data, instance=record)
+                        update_times.append((time.perf_counter() - started) * 1000)
+                    results.append((size, statistics.median(create_times), statistics.median(update_times)))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        self.stdout.write(f"{'items':>7}   create/update ms")
+        for size, create_ms, update_ms in results:
+            self.stdout.write(f"{size:>7}   {create_ms:8.0f} / {update_ms:.0f}")
@@ -0,0 +1,87 @@
+# backend/records/management/commands/benchmark_value_storage.py
+
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from form_builder.models import Form
+from records.models import HeaderValue, ItemValue
+from records.views import RecordViewSet
+
+
+def table_sizes(table: str):
+    """(حجم داده، حجم ایندکس‌ها) یک جدول به بایت؛ None اگر دیتابیس آن را گزارش نکند."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_table_size(%s), pg_indexes_size(%s)', [table, table])
+            return cursor.fetchone()
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s", [table])
+            indexes = [row[0] for row in cursor.fetchall()]
+            try:
+                cursor.execute(
+                    f"SELECT name, SUM(pgsize) FROM dbstat WHERE name IN ({', '.join(['%s'] * (len(indexes) + 1))}) GROUP BY name",
+                    [table, *indexes],
+                )
+            except Exception:
+                # SQLite بدون ماژول dbstat
+                return None
+            sizes = dict(cursor.fetchall())
+            return sizes.get(table, 0), sum(size for name, size in sizes.items() if name != table)
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "حجم جداول مقادیر و سرعت خواندن صفحات لیست رکوردها (همان مسیر API) را گزارش می‌کند؛ "
+        "برای مقایسه قبل و بعد از تغییر ساختار ذخیره‌سازی، یک بار پیش و یک بار پس از migrate اجرا شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', help="کد فرم؛ پیش‌فرض فرمی که بیشترین رکورد را دارد")
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        for model in (HeaderValue, ItemValue):
+            table = model._meta.db_table
+            rows = model.objects.count()
+            sizes = table_sizes(table)
+            if sizes is None:
+                self.stdout.write(f"{table}: {rows} ردیف (حجم در این دیتابیس قابل گزارش نیست)")
+                continue
+            data, indexes = sizes
+            per_row = (data + indexes) / rows if rows else 0
+            self.stdout.write(
+                f"{table}: {rows} ردیف، داده {data / 2 ** 20:.1f}MB، ایندکس‌ها {indexes / 2 ** 20:.1f}MB، {per_row:.0f} بایت برای هر ردیف"
+            )
+
+        forms = Form.objects.annotate(record_count=Count('records')).order_by('-record_count')
+        form = forms.filter(code=options['form']).first() if options['form'] else forms.first()
+        if form is None or not form.record_count:
+            raise CommandError("فرمی با رکورد برای سنجش خواندن پیدا نشد.")
+
+        view = RecordViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        user = User(username='benchmark', is_active=True)
+        durations, cursor_url = [], f'/api/forms/{form.pk}/records/?page_size={options["page_size"]}'
+        for _ in range(options['pages']):
+            request = factory.get(cursor_url)
+            force_authenticate(request, user=user)
+            started = time.perf_counter()
+            response = view(request, form_pk=form.pk)
+            response.render()
+            durations.append((time.perf_counter() - started) * 1000)
+            cursor_url = response.data.get('next')
+            if not cursor_url:
+                break
+
+        self.stdout.write(
+            f"لیست فرم '{form.code}' ({form.record_count} رکورد): {len(durations)} صفحه {options['page_size']}تایی، "
+            f"میانه {statistics.median(durations):.1f}ms، بیشینه {max(durations):.1f}ms"
+        )
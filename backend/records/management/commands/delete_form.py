@@ -0,0 +1,35 @@
+# backend/records/management/commands/delete_form.py
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from form_builder.models import Form
+from records.deletion import DELETE_BATCH_SIZE, delete_form
+
+
+class Command(BaseCommand):
+    help = (
+        "فرم و همه رکوردهایش را دسته به دسته (هر دسته در تراکنش جداگانه) حذف می‌کند. "
+        "اگر اجرا قطع شود، اجرای دوباره همین دستور از رکوردهای باقی‌مانده ادامه می‌دهد."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('form_id', type=int)
+        parser.add_argument('--batch-size', type=int, default=DELETE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        form = Form.objects.filter(pk=options['form_id']).first()
+        if form is None:
+            raise CommandError(f"فرمی با شناسه {options['form_id']} وجود ندارد.")
+
+        total = form.records.count()
+        self.stdout.write(f"حذف فرم '{form.name}' با {total} رکورد...")
+
+        def progress(deleted):
+            self.stdout.write(f"{deleted}/{total} رکورد حذف شد.")
+
+        try:
+            deleted = delete_form(form, batch_size=options['batch_size'], progress=progress)
+        except ValidationError as e:
+            raise CommandError(e.detail[0])
+        self.stdout.write(self.style.SUCCESS(f"فرم '{form.name}' با {deleted} رکورد حذف شد."))
@@ -0,0 +1,94 @@
+# backend/records/management/commands/generate_benchmark_data.py
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from form_builder.models import Field, Form
+from records.deletion import delete_form
+from records.importers import RecordImporter
+from records.synthetic import random_record
+
+FIELD_TYPE_PREFIXES = {'NUMBER': 'n', 'TEXT': 't', 'DATE': 'd'}
+
+
+class Command(BaseCommand):
+    help = (
+        "فرم‌ها و رکوردهای مصنوعی برای سنجش کارایی می‌سازد: زنجیره‌ای از فرم‌ها که هر کدام با لوکاپ به فرم قبلی "
+        "اشاره می‌کنند (فرم اول یک‌بخشی و بقیه دوبخشی). با seed ثابت داده هر بار یکسان ساخته می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="پیشوند کد فرم‌ها")
+        parser.add_argument('--forms', type=int, default=3, help="طول زنجیره لوکاپ بین فرم‌ها")
+        parser.add_argument('--fields-per-type', type=int, default=2, help="تعداد فیلد عددی/متنی/تاریخی در هر بخش")
+        parser.add_argument('--records', type=int, default=1000, help="تعداد رکورد هر فرم")
+        parser.add_argument('--items', type=int, default=5, help="تعداد ردیف اقلام هر رکورد در فرم‌های دوبخشی")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--clear', action='store_true', help="فرم‌های قبلی با همین پیشوند حذف شوند")
+
+    def handle(self, *args, **options):
+        prefix, count = options['prefix'], options['forms']
+        if count < 1:
+            raise CommandError("حداقل یک فرم لازم است.")
+
+        existing = Form.objects.filter(code__startswith=prefix)
+        if existing.exists():
+            if not options['clear']:
+                raise CommandError(f"فرم‌هایی با پیشوند '{prefix}' وجود دارند؛ برای ساخت دوباره --clear بدهید.")
+            # فرم‌های آخر زنجیره به فرم‌های قبلی ارجاع دارند و اول حذف می‌شوند
+            for form in existing.order_by('-pk'):
+                delete_form(form)
+
+        rng = random.Random(options['seed'])
+        previous = None
+        for index in range(count):
+            form = self._create_form(f'{prefix}{index}', index, previous, options)
+            started = time.perf_counter()
+            summary = RecordImporter(form).run(self._rows(rng, form, options))
+            if summary['failed']:
+                raise CommandError(f"{form.code}: {summary['failed']} رکورد ثبت نشد: {summary['errors'][0]['error']}")
+            self.stdout.write(f"{form.code}: {summary['created']} رکورد در {time.perf_counter() - started:.1f} ثانیه")
+            previous = form
+
+        self.stdout.write(self.style.SUCCESS(f"{count} فرم با پیشوند '{prefix}' ساخته شد."))
+
+    def _create_form(self, code, index, previous, options):
+        double = index > 0 and options['items'] > 0
+        form = Form.objects.create(
+            code=code, name=f'فرم آزمون {index}',
+            form_type='DOUBLE_SECTION' if double else 'SINGLE_SECTION', display_order=100 + index,
+        )
+        Field.objects.create(form=form, code='code', name='کد', field_type='NUMBER', is_unique=True, is_required=True)
+        Field.objects.create(form=form, code='name', name='نام', field_type='TEXT')
+
+        sections = ['HEADER', 'ITEM'] if double else ['HEADER']
+        for section in sections:
+            prefix = 'i_' if section == 'ITEM' else ''
+            for field_type, letter in FIELD_TYPE_PREFIXES.items():
+                for number in range(1, options['fields_per_type'] + 1):
+                    Field.objects.create(
+                        form=form, section=section, code=f'{prefix}{letter}{number}',
+                        name=f'{prefix}{letter}{number}', field_type=field_type,
+                    )
+            if previous is not None:
+                Field.objects.create(
+                    form=form, section=section, code=f'{prefix}ref', name=f'{prefix}ref', field_type='LOOKUP',
+                    lookup_form=previous,
+                    lookup_reference_field=previous.fields.get(code='code'),
+                    lookup_display_field=previous.fields.get(code='name'),
+                )
+        return form
+
+    def _rows(self, rng, form, options):
+        fields = list(form.fields.all())
+        header_fields = [field for field in fields if field.section == 'HEADER']
+        item_fields = [field for field in fields if field.section == 'ITEM']
+        items = options['items'] if form.form_type == 'DOUBLE_SECTION' else 0
+        # مقدار لوکاپ کد رکورد فرم قبلی است و RecordImporter آن را به شناسه تبدیل می‌کند
+        codes = range(1, options['records'] + 1)
+        lookup_values = {field.pk: codes for field in fields if field.field_type == 'LOOKUP'}
+
+        for number in codes:
+            yield number, random_record(rng, header_fields, item_fields, items, number, lookup_values)
@@ -0,0 +1,34 @@
+# backend/records/management/commands/import_records.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from form_builder.models import Form
+from records.importers import (
+    IMPORT_CHUNK_SIZE, IMPORT_FORMATS, RecordImporter, guess_import_format, iter_import_records,
+)
+
+
+class Command(BaseCommand):
+    help = "رکوردهای یک فرم را از فایل CSV یا JSONL به صورت جریانی و دسته‌ای وارد می‌کند."
+
+    def add_arguments(self, parser):
+        parser.add_argument('form', help="کد یا شناسه فرم")
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=IMPORT_FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lookup = {'pk': options['form']} if options['form'].isdigit() else {'code': options['form']}
+        try:
+            form = Form.objects.get(**lookup)
+        except Form.DoesNotExist:
+            raise CommandError(f"فرم '{options['form']}' پیدا نشد.")
+
+        import_format = options['format'] or guess_import_format(options['path'])
+        importer = RecordImporter(form, chunk_size=options['chunk_size'], max_errors=10000)
+        with open(options['path'], 'rb') as stream:
+            summary = importer.run(iter_import_records(stream, import_format, importer.item_codes))
+
+        for error in summary['errors']:
+            self.stderr.write(f"ردیف {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(f"{summary['created']} رکورد ثبت شد، {summary['failed']} ردیف خطا داشت."))
@@ -0,0 +1,16 @@
+# backend/records/management/commands/prune_record_tombstones.py
+
+from django.core.management.base import BaseCommand
+
+from records.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = (
+        "سنگ‌قبر رکوردهای حذف‌شده قدیمی‌تر از RECORD_TOMBSTONE_RETENTION_DAYS را پاک می‌کند؛ "
+        "cursorهای قدیمی‌تر از همین مدت منقضی هستند."
+    )
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} سنگ‌قبر حذف شد."))
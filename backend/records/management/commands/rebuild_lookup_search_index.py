@@ -0,0 +1,16 @@
+# backend/records/management/commands/rebuild_lookup_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from records.search import SEARCH_BATCH_SIZE, rebuild_lookup_search_index
+
+
+class Command(BaseCommand):
+    help = "ایندکس جستجوی لوکاپ (LookupSearchEntry/LookupSearchToken) را برای همه لوکاپ‌ها از نو می‌سازد."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SEARCH_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = rebuild_lookup_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} ردیف جستجوی لوکاپ ساخته شد."))
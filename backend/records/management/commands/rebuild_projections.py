@@ -0,0 +1,49 @@
+# backend/records/management/commands/rebuild_projections.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from form_builder.models import Form
+from records.models import RecordProjection
+from records.projections import (
+    PROJECTION_BATCH_SIZE, create_projection_indexes, drop_projection_indexes, rebuild_projections,
+)
+
+
+class Command(BaseCommand):
+    help = "جدول تخت گزارش‌گیری فرم‌ها را فعال و از نو ساخته یا غیرفعال می‌کند."
+
+    def add_arguments(self, parser):
+        parser.add_argument('forms', nargs='*', help="کد یا شناسه فرم‌ها؛ بدون آن همه فرم‌های دارای جدول تخت بازسازی می‌شوند")
+        parser.add_argument('--disable', action='store_true', help="جدول تخت فرم‌ها حذف و غیرفعال می‌شود")
+        parser.add_argument('--batch-size', type=int, default=PROJECTION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        forms = [self._get_form(value) for value in options['forms']] or list(Form.objects.filter(has_projection=True))
+
+        for form in forms:
+            if options['disable']:
+                form.has_projection = False
+                form.save(update_fields=['has_projection', 'schema_version', 'updated_at'])
+                drop_projection_indexes(form)
+                RecordProjection.objects.filter(form=form).delete()
+                self.stdout.write(f"{form.code}: جدول تخت غیرفعال شد.")
+                continue
+
+            started = timezone.now()
+            count = rebuild_projections(form, batch_size=options['batch_size'])
+            if not form.has_projection:
+                # فیلترها فقط بعد از ساخت کامل جدول از آن استفاده می‌کنند؛ رکوردهایی که حین ساخت ثبت یا ویرایش شده‌اند
+                # (وقتی ذخیره رکورد هنوز جدول تخت را به‌روز نمی‌کرد) بعد از فعال شدن دوباره ساخته می‌شوند
+                form.has_projection = True
+                form.save(update_fields=['has_projection', 'schema_version', 'updated_at'])
+                rebuild_projections(form, batch_size=options['batch_size'], since=started)
+            indexes = create_projection_indexes(form)
+            self.stdout.write(self.style.SUCCESS(f"{form.code}: {count} رکورد در جدول تخت ثبت شد ({len(indexes)} ایندکس)."))
+
+    def _get_form(self, value):
+        lookup = {'pk': value} if value.isdigit() else {'code': value}
+        try:
+            return Form.objects.get(**lookup)
+        except Form.DoesNotExist:
+            raise CommandError(f"فرم '{value}' پیدا نشد.")
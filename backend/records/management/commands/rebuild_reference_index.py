@@ -0,0 +1,16 @@
+# backend/records/management/commands/rebuild_reference_index.py
+
+from django.core.management.base import BaseCommand
+
+from records.services import rebuild_reference_index
+
+
+class Command(BaseCommand):
+    help = "ایندکس ارجاعات لوکاپ (RecordReference) را از روی داده‌های موجود از نو می‌سازد."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_reference_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} ارجاع لوکاپ در ایندکس ثبت شد."))
@@ -0,0 +1,16 @@
+# backend/records/management/commands/rebuild_unique_keys.py
+
+from django.core.management.base import BaseCommand
+
+from records.uniqueness import rebuild_unique_keys
+
+
+class Command(BaseCommand):
+    help = "جدول کلیدهای یکتا (UniqueValueKey) را برای همه فیلدهای یکتا از روی مقادیر موجود از نو می‌سازد."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_unique_keys(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{count} کلید یکتا ثبت شد."))
@@ -0,0 +1,20 @@
+# backend/records/management/commands/reseed_sequences.py
+
+from django.core.management.base import BaseCommand
+
+from form_builder.models import Field
+from records.sequences import reseed_sequences
+
+
+class Command(BaseCommand):
+    help = "شمارنده فیلدهای افزایشی خودکار را از روی بیشترین مقدار ثبت‌شده مقداردهی مجدد می‌کند."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--field', type=int, action='append', help="شناسه فیلد (قابل تکرار)")
+
+    def handle(self, *args, **options):
+        fields = Field.objects.filter(has_auto_increment=True)
+        if options['field']:
+            fields = fields.filter(pk__in=options['field'])
+        for field_id, next_value in reseed_sequences(fields).items():
+            self.stdout.write(f"فیلد {field_id}: شماره بعدی {next_value}")
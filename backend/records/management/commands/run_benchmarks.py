@@ -0,0 +1,187 @@
+# backend/records/management/commands/run_benchmarks.py
+
+import json
+import random
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from form_builder.models import Form
+from form_builder.views import FieldViewSet, FormViewSet
+from records.models import HeaderValue, ItemValue, RecordHeader, RecordItem, RecordReference
+from records.synthetic import WORDS, random_record
+from records.views import RecordViewSet
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(durations: list, queries: list) -> dict:
+    ordered = sorted(durations)
+    return {
+        'iterations': len(durations),
+        'median_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+        'max_ms': round(ordered[-1], 2),
+        'ops_per_sec': round(len(durations) / (sum(durations) / 1000), 1),
+        'queries': statistics.median(queries),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "ایجاد، ویرایش، لیست، جزئیات، جستجوی لوکاپ، بررسی حذف و لیست فرم‌ها را روی داده generate_benchmark_data "
+        "از مسیر ویوهای API اجرا و زمان و تعداد کوئری هر کدام را به صورت JSON گزارش می‌کند. "
+        "رکوردهای ساخته‌شده در پایان حذف می‌شوند و داده آزمون تغییری نمی‌کند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="پیشوند کد فرم‌های داده آزمون")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="مسیر فایل JSON نتایج")
+        parser.add_argument('--compare', help="فایل JSON نتایج قبلی برای نمایش تغییر میانه زمان‌ها")
+
+    def handle(self, *args, **options):
+        forms = list(Form.objects.filter(code__startswith=options['prefix']).order_by('pk'))
+        if not forms:
+            raise CommandError(f"فرمی با پیشوند '{options['prefix']}' نیست؛ ابتدا generate_benchmark_data را اجرا کنید.")
+        # فرم آخر زنجیره (با لوکاپ و اقلام) هدف عملیات رکوردهاست و رکوردهای فرم اول مرجع آن‌ها هستند
+        self.master, self.target = forms[0], forms[-1]
+        self.rng = random.Random(options['seed'])
+        self.factory = APIRequestFactory()
+        # کاربر ذخیره‌نشده فقط برای عبور از IsAuthenticated
+        self.user = get_user_model()(username='benchmark')
+
+        fields = list(self.target.fields.all())
+        self.header_fields = [field for field in fields if field.section == 'HEADER']
+        self.item_fields = [field for field in fields if field.section == 'ITEM']
+        self.lookup_fields = [field for field in self.header_fields if field.field_type == 'LOOKUP' and field.lookup_form_id]
+        self.lookup_ids = {
+            field.pk: list(RecordHeader.objects.filter(form_id=field.lookup_form_id).values_list('pk', flat=True))
+            for field in fields if field.field_type == 'LOOKUP' and field.lookup_form_id
+        }
+        self.record_ids = list(self.target.records.values_list('pk', flat=True))
+        # رکوردهای جدید هم‌اندازه میانگین رکوردهای موجود ساخته می‌شوند
+        self.item_count = round(RecordItem.objects.filter(header__form=self.target).count() / max(len(self.record_ids), 1))
+        self.referenced_ids = list(RecordReference.objects.filter(target__form=self.master).values_list('target_id', flat=True).distinct()[:1000])
+        self.serial = int(time.time()) * 1000
+        self.created = []
+
+        iterations = options['iterations']
+        results = {}
+        for name, operation, expected in self._operations():
+            durations, queries = [], []
+            for index in range(iterations):
+                request, view, kwargs = operation(index)
+                force_authenticate(request, user=self.user)
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = view(request, **kwargs)
+                    response.render()
+                    durations.append((time.perf_counter() - started) * 1000)
+                if response.status_code != expected:
+                    raise CommandError(f"{name}: پاسخ {response.status_code} به جای {expected}: {response.content[:300]!r}")
+                if name == 'create':
+                    self.created.append(response.data['id'])
+                queries.append(len(ctx.captured_queries))
+            results[name] = summarize(durations, queries)
+            self.stdout.write(
+                f"{name:14} میانه {results[name]['median_ms']:8.2f}ms  p95 {results[name]['p95_ms']:8.2f}ms  "
+                f"{results[name]['ops_per_sec']:8.1f}/s  {results[name]['queries']:g} کوئری"
+            )
+
+        report = {
+            'commit': git_commit(),
+            'database': connection.vendor,
+            'created_at': timezone.now().isoformat(),
+            'iterations': iterations,
+            'dataset': {
+                'forms': len(forms),
+                'records': RecordHeader.objects.filter(form__in=forms).count(),
+                'header_values': HeaderValue.objects.filter(header__form__in=forms).count(),
+                'item_values': ItemValue.objects.filter(item__header__form__in=forms).count(),
+            },
+            'results': results,
+        }
+        if options['compare']:
+            self._compare(options['compare'], results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"نتایج در {options['output']} ذخیره شد."))
+
+    def _operations(self):
+        target, records = self.target.pk, f'/api/forms/{self.target.pk}/records/'
+        record_list = RecordViewSet.as_view({'get': 'list', 'post': 'create'})
+        record_detail = RecordViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'})
+        search = FieldViewSet.as_view({'get': 'search_lookup'})
+        form_list = FormViewSet.as_view({'get': 'list'})
+
+        def create(index):
+            return self.factory.post(records, self._payload(), format='json'), record_list, {'form_pk': target}
+
+        def update(index):
+            pk = self.created[index % len(self.created)]
+            return self.factory.put(f'{records}{pk}/', self._payload(), format='json'), record_detail, {'form_pk': target, 'pk': pk}
+
+        def list_records(index):
+            return self.factory.get(records), record_list, {'form_pk': target}
+
+        def detail(index):
+            pk = self.rng.choice(self.record_ids)
+            return self.factory.get(f'{records}{pk}/'), record_detail, {'form_pk': target, 'pk': pk}
+
+        def search_lookup(index):
+            field = self.lookup_fields[index % len(self.lookup_fields)]
+            # متناوب با کلمه متنی و پیشوند عددی کد
+            query = self.rng.choice(WORDS)[:3] if index % 2 else str(self.rng.randint(1, 99))
+            path = f'/api/forms/{target}/fields/{field.pk}/search-lookup/'
+            return self.factory.get(path, {'q': query}), search, {'form_pk': target, 'pk': field.pk}
+
+        def delete_check(index):
+            # حذف رکورد مرجع رد می‌شود؛ فقط هزینه بررسی ارجاعات سنجیده می‌شود
+            pk = self.referenced_ids[index % len(self.referenced_ids)]
+            path = f'/api/forms/{self.master.pk}/records/{pk}/'
+            return self.factory.delete(path), record_detail, {'form_pk': self.master.pk, 'pk': pk}
+
+        def delete(index):
+            pk = self.created.pop()
+            return self.factory.delete(f'{records}{pk}/'), record_detail, {'form_pk': target, 'pk': pk}
+
+        operations = [('create', create, 201), ('update', update, 200), ('list', list_records, 200), ('detail', detail, 200)]
+        if self.lookup_fields:
+            operations.append(('search_lookup', search_lookup, 200))
+        if self.referenced_ids:
+            operations.append(('delete_check', delete_check, 400))
+        operations += [('form_list', lambda index: (self.factory.get('/api/forms/'), form_list, {}), 200), ('delete', delete, 204)]
+        return operations
+
+    def _payload(self):
+        self.serial += 1
+        return random_record(self.rng, self.header_fields, self.item_fields, self.item_count, self.serial, self.lookup_ids)
+
+    def _compare(self, path, results):
+        with open(path, encoding='utf-8') as stream:
+            baseline = json.load(stream)
+        self.stdout.write(f"مقایسه با {baseline.get('commit') or path}:")
+        for name, result in results.items():
+            previous = baseline.get('results', {}).get(name)
+            if not previous:
+                continue
+            change = (result['median_ms'] - previous['median_ms']) / previous['median_ms'] * 100
+            self.stdout.write(f"{name:14} {previous['median_ms']:8.2f}ms -> {result['median_ms']:8.2f}ms ({change:+.0f}%)")
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+REFERENCE_BATCH_SIZE = 1000
+
+
+def populate_references(apps, schema_editor):
+    # مقادیر لوکاپ به صورت جریانی خوانده و دسته به دسته درج می‌شوند؛ وجود رکورد مقصد در خود SQL بررسی می‌شود
+    RecordHeader = apps.get_model('records', 'RecordHeader')
+    RecordReference = apps.get_model('records', 'RecordReference')
+    for model_name, source_path in (('HeaderValue', 'header_id'), ('ItemValue', 'item__header_id')):
+        model = apps.get_model('records', model_name)
+        values = model.objects.filter(
+            field__field_type='LOOKUP', value_number__in=models.Subquery(RecordHeader.objects.values('pk')),
+        ).order_by().values_list(source_path, 'field_id', 'value_number').distinct()
+        batch = []
+        for source_id, field_id, target in values.iterator(chunk_size=REFERENCE_BATCH_SIZE):
+            batch.append(RecordReference(source_id=source_id, field_id=field_id, target_id=int(target)))
+            if len(batch) >= REFERENCE_BATCH_SIZE:
+                RecordReference.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        RecordReference.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0001_initial'),
+        ('records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field')),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_references', to='records.recordheader')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_references', to='records.recordheader')),
+            ],
+            options={
+                'unique_together': {('source', 'field', 'target')},
+            },
+        ),
+        migrations.RunPython(populate_references, migrations.RunPython.noop),
+    ]
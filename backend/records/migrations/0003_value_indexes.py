@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:14
+
+from django.db import DatabaseError, migrations, models, transaction
+
+TEXT_INDEXES = [
+    ('hv_field_text_idx', 'records_headervalue'),
+    ('iv_field_text_idx', 'records_itemvalue'),
+]
+
+
+def create_text_indexes(apps, schema_editor):
+    # ایندکس متنی وابسته به دیتابیس است؛ btree ساده روی TextField در PostgreSQL برای متن‌های بلند خطا می‌دهد
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        for name, table in TEXT_INDEXES:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (field_id, value_text)')
+    elif connection.vendor == 'postgresql':
+        try:
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        except DatabaseError:
+            # بدون دسترسی ساخت extension، فقط از ایندکس‌های عددی و تاریخ استفاده می‌شود
+            return
+        for name, table in TEXT_INDEXES:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (value_text gin_trgm_ops)')
+
+
+def drop_text_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for name, _ in TEXT_INDEXES:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0001_initial'),
+        ('records', '0002_recordreference'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='headervalue',
+            index=models.Index(fields=['field', 'value_number', 'header'], name='hv_field_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='headervalue',
+            index=models.Index(fields=['field', 'value_date_gregorian', 'header'], name='hv_field_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemvalue',
+            index=models.Index(fields=['field', 'value_number', 'item'], name='iv_field_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemvalue',
+            index=models.Index(fields=['field', 'value_date_gregorian', 'item'], name='iv_field_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recordheader',
+            index=models.Index(fields=['form', 'created_at', 'id'], name='rh_form_created_idx'),
+        ),
+        migrations.RunPython(create_text_indexes, drop_text_indexes),
+    ]
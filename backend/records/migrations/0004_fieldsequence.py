@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0001_initial'),
+        ('records', '0003_value_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FieldSequence',
+            fields=[
+                ('field', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sequence', serialize=False, to='form_builder.field')),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0003_form_has_projection'),
+        ('records', '0004_fieldsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordProjection',
+            fields=[
+                ('header', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='projection', serialize=False, to='records.recordheader')),
+                ('data', models.JSONField(default=dict)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.form')),
+            ],
+        ),
+    ]
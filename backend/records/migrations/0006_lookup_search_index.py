@@ -0,0 +1,119 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# نسخه ثابت نرمال‌سازی records.search در زمان این مایگریشن؛ تغییرات بعدی آن ماژول نباید مایگریشن را عوض کند
+_NORMALIZE_TABLE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    '\u200c': ' ', '\u200f': ' ', '\u00a0': ' ',
+    **{persian: str(digit) for digit, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(digit) for digit, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+_BATCH_SIZE = 500
+
+
+def _normalize(value):
+    if value is None:
+        return ''
+    return ' '.join(str(value).translate(_NORMALIZE_TABLE).lower().split())
+
+
+def _value_text(field_type, text, number, jalali):
+    if field_type in ['NUMBER', 'LOOKUP']:
+        if number is None:
+            return None
+        number = number.normalize()
+        return str(int(number) if number == int(number) else number)
+    if field_type == 'DATE':
+        return jalali
+    return text
+
+
+def build_search_index(apps, schema_editor):
+    Field = apps.get_model('form_builder', 'Field')
+    HeaderValue = apps.get_model('records', 'HeaderValue')
+    RecordHeader = apps.get_model('records', 'RecordHeader')
+    LookupSearchEntry = apps.get_model('records', 'LookupSearchEntry')
+    LookupSearchToken = apps.get_model('records', 'LookupSearchToken')
+
+    pairs = set(
+        Field.objects.filter(field_type='LOOKUP', lookup_reference_field__isnull=False, lookup_display_field__isnull=False)
+        .values_list('lookup_reference_field_id', 'lookup_display_field_id')
+    )
+    for reference_id, display_id in pairs:
+        field_types = dict(Field.objects.filter(pk__in=[reference_id, display_id]).values_list('pk', 'field_type'))
+        form_id = Field.objects.filter(pk=reference_id).values_list('form_id', flat=True).get()
+        header_ids = RecordHeader.objects.filter(form_id=form_id).order_by('pk').values_list('pk', flat=True)
+        chunk = []
+        for header_id in header_ids.iterator(chunk_size=_BATCH_SIZE):
+            chunk.append(header_id)
+            if len(chunk) == _BATCH_SIZE:
+                _index_chunk(chunk, reference_id, display_id, field_types, HeaderValue, LookupSearchEntry, LookupSearchToken)
+                chunk = []
+        if chunk:
+            _index_chunk(chunk, reference_id, display_id, field_types, HeaderValue, LookupSearchEntry, LookupSearchToken)
+
+
+def _index_chunk(chunk, reference_id, display_id, field_types, HeaderValue, LookupSearchEntry, LookupSearchToken):
+    texts = {}
+    values = HeaderValue.objects.filter(header_id__in=chunk, field_id__in=field_types)\
+        .values_list('header_id', 'field_id', 'value_text', 'value_number', 'value_date_jalali')
+    for header_id, field_id, text, number, jalali in values:
+        texts[header_id, field_id] = _value_text(field_types[field_id], text, number, jalali)
+    entries = []
+    for header_id in chunk:
+        code, display = texts.get((header_id, reference_id)), texts.get((header_id, display_id))
+        entries.append(LookupSearchEntry(
+            header_id=header_id, reference_field_id=reference_id, display_field_id=display_id, code=code, display=display,
+            code_key=_normalize(code)[:255], display_key=_normalize(display)[:255],
+        ))
+    LookupSearchEntry.objects.bulk_create(entries, batch_size=_BATCH_SIZE)
+    # شناسه‌ها دوباره خوانده می‌شوند چون همه دیتابیس‌ها شناسه‌های bulk_create را برنمی‌گردانند
+    keys = LookupSearchEntry.objects.filter(reference_field_id=reference_id, display_field_id=display_id, header_id__in=chunk)\
+        .values_list('pk', 'code_key', 'display_key')
+    LookupSearchToken.objects.bulk_create([
+        LookupSearchToken(entry_id=entry_id, reference_field_id=reference_id, token=token)
+        for entry_id, code_key, display_key in keys for token in {token[:100] for token in f'{code_key} {display_key}'.split()}
+    ], batch_size=_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0003_form_has_projection'),
+        ('records', '0005_record_projection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LookupSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.TextField(blank=True, null=True)),
+                ('display', models.TextField(blank=True, null=True)),
+                ('code_key', models.CharField(blank=True, default='', max_length=255)),
+                ('display_key', models.CharField(blank=True, default='', max_length=255)),
+                ('display_field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field')),
+                ('header', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='records.recordheader')),
+                ('reference_field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field')),
+            ],
+            options={
+                'unique_together': {('reference_field', 'display_field', 'header')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LookupSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='records.lookupsearchentry')),
+                ('reference_field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reference_field', 'token', 'entry'], name='lst_field_token_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
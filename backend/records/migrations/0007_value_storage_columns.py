@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+VALUE_TYPE_CHOICES = [(1, 'NUMBER'), (2, 'TEXT'), (3, 'DATE'), (4, 'LOOKUP'), (5, 'LOOKUP_DISPLAY')]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0006_lookup_search_index'),
+    ]
+
+    # ستون‌ها ابتدا nullable اضافه می‌شوند؛ 0008 داده‌ها را تبدیل و 0009 ستون شمسی را حذف می‌کند
+    operations = [
+        migrations.AddField(
+            model_name='headervalue',
+            name='value_type',
+            field=models.PositiveSmallIntegerField(choices=VALUE_TYPE_CHOICES, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='headervalue',
+            name='value_lookup',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemvalue',
+            name='value_type',
+            field=models.PositiveSmallIntegerField(choices=VALUE_TYPE_CHOICES, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemvalue',
+            name='value_lookup',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='headervalue',
+            index=models.Index(fields=['field', 'value_lookup', 'header'], name='hv_field_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemvalue',
+            index=models.Index(fields=['field', 'value_lookup', 'item'], name='iv_field_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+# همان records.models.VALUE_TYPES در زمان این مایگریشن
+VALUE_TYPES = {'NUMBER': 1, 'TEXT': 2, 'DATE': 3, 'LOOKUP': 4, 'LOOKUP_DISPLAY': 5}
+
+
+def convert_values(apps, schema_editor):
+    # هر تبدیل یک UPDATE روی کل جدول است، نه حلقه روی ردیف‌ها
+    for model_name in ('HeaderValue', 'ItemValue'):
+        model = apps.get_model('records', model_name)
+        for field_type, code in VALUE_TYPES.items():
+            model.objects.filter(field__field_type=field_type).update(value_type=code)
+        model.objects.filter(value_type=VALUE_TYPES['LOOKUP']).update(
+            value_lookup=Cast('value_number', models.BigIntegerField()), value_number=None,
+        )
+
+
+def revert_values(apps, schema_editor):
+    for model_name in ('HeaderValue', 'ItemValue'):
+        model = apps.get_model('records', model_name)
+        model.objects.filter(value_type=VALUE_TYPES['LOOKUP']).update(value_number=models.F('value_lookup'), value_lookup=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0003_form_has_projection'),
+        ('records', '0007_value_storage_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(convert_values, revert_values),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+VALUE_TYPE_CHOICES = [(1, 'NUMBER'), (2, 'TEXT'), (3, 'DATE'), (4, 'LOOKUP'), (5, 'LOOKUP_DISPLAY')]
+
+
+TEXT_INDEXES = [
+    ('hv_field_text_idx', 'records_headervalue'),
+    ('iv_field_text_idx', 'records_itemvalue'),
+]
+
+
+def recreate_text_indexes(apps, schema_editor):
+    # SQLite برای حذف/تغییر ستون جدول را از نو می‌سازد و ایندکس‌های متنی 0003 که خارج از state جنگو هستند از بین می‌روند
+    if schema_editor.connection.vendor == 'sqlite':
+        for name, table in TEXT_INDEXES:
+            schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (field_id, value_text)')
+
+
+def restore_jalali(apps, schema_editor):
+    # در بازگشت، ستون شمسی برای هر تاریخ یکتا با یک UPDATE دوباره پر می‌شود
+    from records.jalali import format_jalali
+
+    for model_name in ('HeaderValue', 'ItemValue'):
+        model = apps.get_model('records', model_name)
+        dates = model.objects.filter(value_date_gregorian__isnull=False).values_list('value_date_gregorian', flat=True).distinct()
+        for date in list(dates):
+            model.objects.filter(value_date_gregorian=date).update(value_date_jalali=format_jalali(date))
+    recreate_text_indexes(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0008_convert_value_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_jalali),
+        migrations.RemoveField(
+            model_name='headervalue',
+            name='value_date_jalali',
+        ),
+        migrations.RemoveField(
+            model_name='itemvalue',
+            name='value_date_jalali',
+        ),
+        migrations.AlterField(
+            model_name='headervalue',
+            name='value_type',
+            field=models.PositiveSmallIntegerField(choices=VALUE_TYPE_CHOICES, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='itemvalue',
+            name='value_type',
+            field=models.PositiveSmallIntegerField(choices=VALUE_TYPE_CHOICES, editable=False),
+        ),
+        migrations.RunPython(recreate_text_indexes, migrations.RunPython.noop),
+    ]
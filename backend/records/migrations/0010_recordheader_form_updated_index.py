@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0009_drop_value_date_jalali'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recordheader',
+            index=models.Index(fields=['form', 'updated_at'], name='rh_form_updated_idx'),
+        ),
+    ]
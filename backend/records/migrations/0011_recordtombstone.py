@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0004_form_updated_at'),
+        ('records', '0010_recordheader_form_updated_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.form')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['form', 'deleted_at'], name='rt_form_deleted_idx')],
+            },
+        ),
+    ]
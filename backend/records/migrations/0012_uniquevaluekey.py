@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_unique_keys(apps, schema_editor):
+    # کلیدهای مقادیر موجود با مدل‌های تاریخی ساخته می‌شوند؛ از records.uniqueness فقط نرمال‌سازی مقدار استفاده می‌شود.
+    # اگر داده قدیمی از قبل تکراری باشد (race در بررسی قبلی)، فقط قدیمی‌ترین مقدار کلید می‌گیرد
+    from records.uniqueness import unique_key
+
+    Field = apps.get_model('form_builder', 'Field')
+    HeaderValue = apps.get_model('records', 'HeaderValue')
+    ItemValue = apps.get_model('records', 'ItemValue')
+    UniqueValueKey = apps.get_model('records', 'UniqueValueKey')
+
+    field_ids = list(Field.objects.filter(is_unique=True).values_list('pk', flat=True))
+    for model, header_path in ((HeaderValue, 'header_id'), (ItemValue, 'item__header_id')):
+        values = model.objects.filter(field_id__in=field_ids).order_by('pk').annotate(owner_id=models.F(header_path))
+        keys = []
+        for value_obj in values.iterator(chunk_size=1000):
+            key = unique_key(value_obj)
+            if key is not None:
+                keys.append(UniqueValueKey(header_id=value_obj.owner_id, field_id=value_obj.field_id, key=key))
+        UniqueValueKey.objects.bulk_create(keys, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0004_form_updated_at'),
+        ('records', '0011_recordtombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UniqueValueKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('field', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field')),
+                ('header', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unique_keys', to='records.recordheader')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('field', 'key'), name='uvk_field_key_uniq')],
+            },
+        ),
+        migrations.RunPython(build_unique_keys, migrations.RunPython.noop),
+    ]
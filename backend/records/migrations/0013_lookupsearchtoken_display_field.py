@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_display_field(apps, schema_editor):
+    # فیلد نمایشی هر کلمه از ردیف جستجوی خودش برداشته می‌شود
+    LookupSearchEntry = apps.get_model('records', 'LookupSearchEntry')
+    LookupSearchToken = apps.get_model('records', 'LookupSearchToken')
+    LookupSearchToken.objects.update(display_field_id=models.Subquery(
+        LookupSearchEntry.objects.filter(pk=models.OuterRef('entry_id')).values('display_field_id')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('form_builder', '0003_form_has_projection'),
+        ('records', '0012_uniquevaluekey'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lookupsearchtoken',
+            name='display_field',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field'),
+        ),
+        migrations.RunPython(copy_display_field, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='lookupsearchtoken',
+            name='display_field',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='form_builder.field'),
+        ),
+        migrations.RemoveIndex(
+            model_name='lookupsearchtoken',
+            name='lst_field_token_idx',
+        ),
+        migrations.AddIndex(
+            model_name='lookupsearchtoken',
+            index=models.Index(fields=['reference_field', 'display_field', 'token', 'entry'], name='lst_pair_token_idx', opclasses=['int8_ops', 'int8_ops', 'varchar_pattern_ops', 'int8_ops']),
+        ),
+    ]
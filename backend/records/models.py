@@ -2,12 +2,50 @@
 
 from django.db import models
 from form_builder.models import Form, Field
+from .jalali import format_jalali
+
+
+# کد عددی نوع فیلد روی ردیف‌های مقدار (به جای تکرار رشته نوع در هر ردیف)
+VALUE_TYPES = {'NUMBER': 1, 'TEXT': 2, 'DATE': 3, 'LOOKUP': 4, 'LOOKUP_DISPLAY': 5}
+VALUE_TYPE_NAMES = {code: name for name, code in VALUE_TYPES.items()}
+VALUE_TYPE_CHOICES = [(code, name) for name, code in VALUE_TYPES.items()]
+
+
+def value_column_for(field_type: str) -> str:
+    # ستونی از جداول مقادیر که مقدار اصلی هر نوع فیلد در آن ذخیره می‌شود
+    if field_type == 'NUMBER': return 'value_number'
+    if field_type == 'LOOKUP': return 'value_lookup'
+    if field_type == 'DATE': return 'value_date_gregorian'
+    return 'value_text'
+
+
+def typed_value(value_obj, display: bool = True):
+    """
+    مقدار نوع‌دار یک ردیف مقدار بر اساس نوع ذخیره‌شده در خود ردیف (بدون نیاز به بارگذاری فیلد).
+    تاریخ برای نمایش (برچسب لوکاپ، خروجی فایل، پیام خطا) رشته شمسی است
+    و برای API (display=False) تاریخ میلادی که فرانت‌اند آن را تبدیل می‌کند.
+    """
+    field_type = value_obj.field_type
+    if field_type in ['TEXT', 'LOOKUP_DISPLAY']: return value_obj.value_text
+    if field_type == 'NUMBER': return value_obj.value_number
+    if field_type == 'LOOKUP': return value_obj.value_lookup
+    if field_type == 'DATE':
+        return value_obj.value_date_jalali if display else value_obj.value_date_gregorian
+    return None
 
 class RecordHeader(models.Model):
     form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='records', verbose_name="فرم")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاریخ ثبت")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="تاریخ ویرایش")
 
+    class Meta:
+        indexes = [
+            # لیست رکوردهای یک فرم با ترتیب (created_at, id)
+            models.Index(fields=['form', 'created_at', 'id'], name='rh_form_created_idx'),
+            # تعداد و آخرین ویرایش رکوردهای هر فرم (ETag لیست رکوردها) فقط از روی ایندکس
+            models.Index(fields=['form', 'updated_at'], name='rh_form_updated_idx'),
+        ]
+
     def __str__(self):
         return f"رکورد {self.id} از فرم {self.form.name}"
 
@@ -21,39 +59,148 @@ class HeaderValue(models.Model):
     header = models.ForeignKey(RecordHeader, on_delete=models.CASCADE, related_name='values')
     field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='header_values')
     
+    # نوع فیلد روی خود ردیف تکرار می‌شود تا خواندن مقدار به فیلد وابسته نباشد؛ هر نوع فقط یک ستون مقدار دارد
+    value_type = models.PositiveSmallIntegerField(choices=VALUE_TYPE_CHOICES, editable=False)
     value_text = models.TextField(null=True, blank=True)
     value_number = models.DecimalField(max_digits=20, decimal_places=5, null=True, blank=True)
+    # شناسه رکورد مرجع فیلدهای لوکاپ
+    value_lookup = models.BigIntegerField(null=True, blank=True)
     value_date_gregorian = models.DateField(null=True, blank=True)
-    value_date_jalali = models.CharField(max_length=10, null=True, blank=True)
 
     class Meta:
         unique_together = [
             ('header', 'field'),
         ]
+        indexes = [
+            # بررسی ارجاع لوکاپ، Max برای افزایش خودکار و کنترل یکتایی؛ header برای پوشش کامل کوئری
+            models.Index(fields=['field', 'value_number', 'header'], name='hv_field_number_idx'),
+            models.Index(fields=['field', 'value_lookup', 'header'], name='hv_field_lookup_idx'),
+            models.Index(fields=['field', 'value_date_gregorian', 'header'], name='hv_field_date_idx'),
+        ]
+
+    def get_value(self, display: bool = True):
+        return typed_value(self, display)
 
-    def get_value(self):
-        field_type = self.field.field_type
-        if field_type in ['TEXT', 'LOOKUP_DISPLAY']: return self.value_text
-        if field_type in ['NUMBER', 'LOOKUP']: return self.value_number
-        if field_type == 'DATE': return self.value_date_jalali
-        return None
+    @property
+    def field_type(self) -> str:
+        return VALUE_TYPE_NAMES.get(self.value_type)
+
+    @property
+    def value_date_jalali(self):
+        # رشته شمسی ذخیره نمی‌شود و از تاریخ میلادی ساخته می‌شود
+        return format_jalali(self.value_date_gregorian) if self.value_date_gregorian is not None else None
 
 class ItemValue(models.Model):
     item = models.ForeignKey(RecordItem, on_delete=models.CASCADE, related_name='values')
     field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='item_values')
     
+    # نوع فیلد روی خود ردیف تکرار می‌شود تا خواندن مقدار به فیلد وابسته نباشد؛ هر نوع فقط یک ستون مقدار دارد
+    value_type = models.PositiveSmallIntegerField(choices=VALUE_TYPE_CHOICES, editable=False)
     value_text = models.TextField(null=True, blank=True)
     value_number = models.DecimalField(max_digits=20, decimal_places=5, null=True, blank=True)
+    # شناسه رکورد مرجع فیلدهای لوکاپ
+    value_lookup = models.BigIntegerField(null=True, blank=True)
     value_date_gregorian = models.DateField(null=True, blank=True)
-    value_date_jalali = models.CharField(max_length=10, null=True, blank=True)
 
     # ✅✅✅ این متد را به اینجا اضافه کنید ✅✅✅
-    def get_value(self):
-        field_type = self.field.field_type
-        if field_type in ['TEXT', 'LOOKUP_DISPLAY']: return self.value_text
-        if field_type in ['NUMBER', 'LOOKUP']: return self.value_number
-        if field_type == 'DATE': return self.value_date_jalali
-        return None
+    def get_value(self, display: bool = True):
+        return typed_value(self, display)
+
+    @property
+    def field_type(self) -> str:
+        return VALUE_TYPE_NAMES.get(self.value_type)
+
+    @property
+    def value_date_jalali(self):
+        # رشته شمسی ذخیره نمی‌شود و از تاریخ میلادی ساخته می‌شود
+        return format_jalali(self.value_date_gregorian) if self.value_date_gregorian is not None else None
+
+    class Meta:
+        unique_together = ('item', 'field')
+        indexes = [
+            models.Index(fields=['field', 'value_number', 'item'], name='iv_field_number_idx'),
+            models.Index(fields=['field', 'value_lookup', 'item'], name='iv_field_lookup_idx'),
+            models.Index(fields=['field', 'value_date_gregorian', 'item'], name='iv_field_date_idx'),
+        ]
+
+class RecordReference(models.Model):
+    # ایندکس معکوس لوکاپ‌ها: رکورد source از طریق field به رکورد target اشاره می‌کند
+    source = models.ForeignKey(RecordHeader, on_delete=models.CASCADE, related_name='outgoing_references')
+    target = models.ForeignKey(RecordHeader, on_delete=models.CASCADE, related_name='incoming_references')
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='+')
 
     class Meta:
-        unique_together = ('item', 'field')
\ No newline at end of file
+        unique_together = ('source', 'field', 'target')
+
+
+class RecordTombstone(models.Model):
+    # شناسه رکوردهای حذف‌شده برای همگام‌سازی تغییرات (records/changes/)؛ رکورد خودش دیگر وجود ندارد
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='+')
+    record_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['form', 'deleted_at'], name='rt_form_deleted_idx'),
+        ]
+
+
+class UniqueValueKey(models.Model):
+    # یک ردیف برای هر مقدار فیلدهای یکتا (هدر و اقلام)؛ ایندکس یکتای (field, key) تکراری نبودن را
+    # در خود دیتابیس و همزمان با درج تضمین می‌کند. key نسخه نرمال‌شده مقدار است (records/uniqueness.py)
+    # ایندکس یکتای (field, key) برای جستجو بر اساس field هم کافی است
+    field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='+', db_index=False)
+    key = models.CharField(max_length=255)
+    header = models.ForeignKey(RecordHeader, on_delete=models.CASCADE, related_name='unique_keys')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['field', 'key'], name='uvk_field_key_uniq'),
+        ]
+
+
+class FieldSequence(models.Model):
+    # شمارنده فیلدهای افزایشی خودکار؛ هر تخصیص فقط یک UPDATE روی همین ردیف است
+    field = models.OneToOneField(Field, on_delete=models.CASCADE, primary_key=True, related_name='sequence')
+    next_value = models.BigIntegerField(default=1)
+
+
+class RecordProjection(models.Model):
+    # نمای تخت هدر یک رکورد برای گزارش‌گیری: کلید data شناسه فیلد و مقدار آن نوع‌دار است
+    # (عدد JSON برای عددی و لوکاپ، 'YYYY-MM-DD' میلادی برای تاریخ). منبع اصلی داده همچنان جداول مقادیر است.
+    header = models.OneToOneField(RecordHeader, on_delete=models.CASCADE, primary_key=True, related_name='projection')
+    form = models.ForeignKey(Form, on_delete=models.CASCADE, related_name='+')
+    data = models.JSONField(default=dict)
+
+
+class LookupSearchEntry(models.Model):
+    # یک ردیف برای هر رکورد فرم مرجع و هر جفت (فیلد مرجع، فیلد نمایشی) که در لوکاپ‌ها استفاده شده است
+    header = models.ForeignKey(RecordHeader, on_delete=models.CASCADE, related_name='+')
+    reference_field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='+')
+    display_field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='+')
+    code = models.TextField(null=True, blank=True)
+    display = models.TextField(null=True, blank=True)
+    # نسخه نرمال‌شده (records/search.py) برای رتبه‌بندی تطابق از ابتدای کد یا متن نمایشی
+    code_key = models.CharField(max_length=255, blank=True, default='')
+    display_key = models.CharField(max_length=255, blank=True, default='')
+
+    class Meta:
+        unique_together = ('reference_field', 'display_field', 'header')
+
+
+class LookupSearchToken(models.Model):
+    # کلمات نرمال‌شده کد و متن نمایشی؛ جستجوی پیشوندی روی (reference_field, display_field, token) با یک بازه ایندکس
+    # انجام می‌شود تا ردیف‌های جفت‌های دیگر همان فیلد مرجع سقف کاندیدها را پر نکنند
+    entry = models.ForeignKey(LookupSearchEntry, on_delete=models.CASCADE, related_name='tokens')
+    reference_field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='+')
+    display_field = models.ForeignKey(Field, on_delete=models.CASCADE, related_name='+')
+    token = models.CharField(max_length=100)
+
+    class Meta:
+        indexes = [
+            # opclass فقط در PostgreSQL اعمال می‌شود تا LIKE 'p%' مستقل از collation دیتابیس از ایندکس استفاده کند
+            models.Index(
+                fields=['reference_field', 'display_field', 'token', 'entry'], name='lst_pair_token_idx',
+                opclasses=['int8_ops', 'int8_ops', 'varchar_pattern_ops', 'int8_ops'],
+            ),
+        ]
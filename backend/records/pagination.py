@@ -0,0 +1,28 @@
+# backend/records/pagination.py
+
+from rest_framework.pagination import CursorPagination
+
+from .filters import ORDERING_PARAM, SORT_ANNOTATION
+
+
+class RecordCursorPagination(CursorPagination):
+    # ترتیب پایدار: id برای رکوردهایی که created_at یکسان دارند
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        # FieldOrderingFilter مقدار فیلد مرتب‌سازی را با نام sort_value annotate کرده است
+        if SORT_ANNOTATION in queryset.query.annotations:
+            direction = '-' if request.query_params.get(ORDERING_PARAM, '').startswith('-') else ''
+            return (f'{direction}{SORT_ANNOTATION}',) + self.ordering
+        return self.ordering
+
+
+class RecordItemPagination(CursorPagination):
+    # ردیف‌های اقلام یک رکورد به ترتیب ثبت
+    ordering = ('id',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,145 @@
+# backend/records/projections.py
+
+import datetime
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from form_builder.models import Form, Field
+from .models import VALUE_TYPE_NAMES, RecordHeader, HeaderValue, RecordProjection
+
+PROJECTION_BATCH_SIZE = 500
+PROJECTION_TABLE = RecordProjection._meta.db_table
+
+
+def projection_key(field_id) -> str:
+    # کلید بر اساس شناسه فیلد است تا تغییر کد فیلد نیازی به بازسازی نداشته باشد؛
+    # پیشوند لازم است چون جنگو کلید عددی را اندیس آرایه JSON تفسیر می‌کند
+    return f'f{field_id}'
+
+
+def projection_field_id(key: str) -> int:
+    return int(key[1:])
+
+
+def projection_value(field_type: str, text, number, lookup, date):
+    """مقدار نوع‌دار JSON؛ اعداد float می‌شوند پس دقت گزارش‌ها حدود ۱۵ رقم معنی‌دار است."""
+    if field_type == 'NUMBER':
+        return float(number) if number is not None else None
+    if field_type == 'LOOKUP':
+        return lookup
+    if field_type == 'DATE':
+        return date.isoformat() if date is not None else None
+    return text
+
+
+def build_projection_data(value_objs) -> dict:
+    data = {}
+    for value_obj in value_objs:
+        value = projection_value(value_obj.field_type, value_obj.value_text, value_obj.value_number,
+                                 value_obj.value_lookup, value_obj.value_date_gregorian)
+        if value is not None:
+            data[projection_key(value_obj.field_id)] = value
+    return data
+
+
+def refresh_projection(record_header: RecordHeader, value_objs) -> None:
+    """ردیف تخت یک رکورد را با مقادیر فعلی هدر آن جایگزین می‌کند."""
+    RecordProjection.objects.update_or_create(
+        header=record_header, defaults={'form_id': record_header.form_id, 'data': build_projection_data(value_objs)},
+    )
+
+
+def bulk_create_projections(headers, values_per_header) -> None:
+    RecordProjection.objects.bulk_create([
+        RecordProjection(header=record_header, form_id=record_header.form_id, data=build_projection_data(values))
+        for record_header, values in zip(headers, values_per_header)
+    ], batch_size=PROJECTION_BATCH_SIZE)
+
+
+def rebuild_projections(form: Form, batch_size: int = PROJECTION_BATCH_SIZE, since=None) -> int:
+    """
+    جدول تخت یک فرم (یا فقط رکوردهای ویرایش‌شده از since به بعد) را از روی مقادیر هدر دسته به دسته از نو می‌سازد.
+    ردیف‌ها با upsert جایگزین می‌شوند و چیزی پاک نمی‌شود، پس خواننده‌ها حین بازسازی جدول خالی یا ناقص نمی‌بینند.
+    هر دسته رکوردهایش را قفل می‌کند تا با refresh_projection یک ذخیره همزمان مقدار قدیمی‌تر جایگزین نشود.
+    """
+    field_ids = list(form.fields.filter(section='HEADER').values_list('pk', flat=True))
+    headers = RecordHeader.objects.filter(form=form)
+    if since is not None:
+        headers = headers.filter(updated_at__gte=since)
+
+    total, last_id = 0, 0
+    while True:
+        with transaction.atomic():
+            chunk = list(headers.filter(pk__gt=last_id).select_for_update().order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not chunk:
+                return total
+            rows = {record_id: {} for record_id in chunk}
+            values = HeaderValue.objects.filter(header_id__in=chunk, field_id__in=field_ids)\
+                .values_list('header_id', 'field_id', 'value_type', 'value_text', 'value_number', 'value_lookup', 'value_date_gregorian')
+            for header_id, field_id, value_type, *columns in values:
+                value = projection_value(VALUE_TYPE_NAMES[value_type], *columns)
+                if value is not None:
+                    rows[header_id][projection_key(field_id)] = value
+            RecordProjection.objects.bulk_create(
+                [RecordProjection(header_id=record_id, form=form, data=data) for record_id, data in rows.items()],
+                batch_size=batch_size, update_conflicts=True, unique_fields=['header'], update_fields=['data'],
+            )
+        total += len(chunk)
+        last_id = chunk[-1]
+
+
+def create_projection_indexes(form: Form) -> list:
+    """
+    در PostgreSQL برای هر فیلد هدر یک ایندکس عبارتی جزئی (فقط ردیف‌های همین فرم) روی کلید JSON می‌سازد
+    تا فیلتر و مرتب‌سازی روی جدول تخت از ایندکس استفاده کنند. در SQLite مسیر JSON پارامتری است و
+    ایندکس عبارتی قابل استفاده نیست، پس فقط ایندکس فرم کافی است.
+    """
+    if connection.vendor != 'postgresql':
+        return []
+    names = []
+    with connection.cursor() as cursor:
+        for field_id in form.fields.filter(section='HEADER').values_list('pk', flat=True):
+            name = f'rp_f{field_id}_idx'
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {PROJECTION_TABLE} ((data -> '{projection_key(field_id)}')) WHERE form_id = {form.pk}"
+            )
+            names.append(name)
+    return names
+
+
+def drop_projection_indexes(form: Form) -> None:
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for field_id in form.fields.values_list('pk', flat=True):
+            cursor.execute(f'DROP INDEX IF EXISTS rp_f{field_id}_idx')
+
+
+def projection_condition(field: Field, lookup: str, value) -> Q:
+    """
+    شرط فیلتر روی جدول تخت؛ value از قبل با _parse_scalar پارس شده است. شرط form_id خود جدول تخت
+    (نه فقط فرم رکورد) لازم است تا PostgreSQL شرط ایندکس‌های جزئی create_projection_indexes را برقرار ببیند.
+    """
+    return Q(projection__form_id=field.form_id) & _projection_value_condition(field, lookup, value)
+
+
+def _projection_value_condition(field: Field, lookup: str, value) -> Q:
+    path = f'projection__data__{projection_key(field.pk)}'
+    if lookup == 'isnull':
+        return Q(**{f'{path}__isnull': value})
+    if lookup == 'range':
+        low, high = [_json_scalar(v) for v in value]
+        return Q(**{f'{path}__gte': low, f'{path}__lte': high})
+    if lookup == 'in':
+        return Q(**{f'{path}__in': [_json_scalar(v) for v in value]})
+    return Q(**{f'{path}__{lookup}': _json_scalar(value)})
+
+
+def _json_scalar(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
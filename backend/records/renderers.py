@@ -0,0 +1,36 @@
+# backend/records/renderers.py
+
+import json
+from decimal import Decimal
+
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:  # orjson اختیاری است؛ بدون آن از json استاندارد استفاده می‌شود
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} قابل تبدیل به JSON نیست")
+
+
+class ColumnarJSONRenderer(BaseRenderer):
+    """
+    ?format=columnar: لیست رکوردها را به شکل ستونی (records/columnar.py) برمی‌گرداند.
+    خروجی فقط از انواع ساده JSON تشکیل شده است و بدون encoder سفارشی DRF با orjson نوشته می‌شود.
+    """
+    media_type = 'application/json'
+    format = 'columnar'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is not None:
+            return orjson.dumps(data, default=_default)
+        return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')).encode()
@@ -0,0 +1,106 @@
+# backend/records/schema.py
+
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from form_builder.models import Form
+from .formulas import ComputationPlan
+from .search import referencing_form_ids, search_pairs_for
+
+# نام کش مشترک جنگو (مثلاً 'default') برای اشتراک ساختار فرم بین پروسه‌ها؛ None یعنی فقط کش داخل پروسه
+SCHEMA_CACHE_ALIAS = getattr(settings, 'FORM_SCHEMA_CACHE', None)
+SCHEMA_CACHE_TIMEOUT = 24 * 60 * 60
+
+_schemas = {}
+_lock = threading.Lock()
+
+
+class FormSchema:
+    """
+    ساختار کامپایل‌شده یک فرم: فیلدها به تفکیک کد و شناسه، فیلدهای یکتا و افزایشی،
+    مشخصات لوکاپ (فیلدهای مرجع و نمایشی از قبل بارگذاری شده‌اند)، ترتیب محاسبه فیلدهای محاسباتی
+    و جفت‌های لوکاپی که ایندکس جستجویشان از رکوردهای این فرم ساخته می‌شود.
+    برای یک نسخه مشخص از فرم ساخته می‌شود و تغییر نمی‌کند.
+    """
+
+    def __init__(self, form: Form, fields: list, search_pairs: list, referencing_ids: set):
+        self.form_id = form.pk
+        self.version = form.schema_version
+        self.form_type = form.form_type
+        self.has_projection = form.has_projection
+        self.fields = fields
+        self.fields_by_code = {f.code: f for f in fields}
+        self.fields_by_id = {f.pk: f for f in fields}
+        self.item_codes = {f.code for f in fields if f.section == 'ITEM'}
+        self.unique_fields = [f for f in fields if f.is_unique]
+        self.auto_increment_fields = [f for f in fields if f.has_auto_increment and f.section == 'HEADER']
+        self.lookup_fields = [f for f in fields if f.field_type == 'LOOKUP' and f.lookup_reference_field_id]
+        self.plan = ComputationPlan(fields)
+        # لوکاپ‌های فرم‌های دیگر که به این فرم اشاره می‌کنند؛ ایندکس جستجوی آن‌ها با ثبت رکورد به‌روز می‌شود
+        self.search_pairs = search_pairs
+        # فرم‌هایی که رکوردهایشان در خروجی این فرم دیده می‌شوند (برچسب لوکاپ و قابل حذف بودن)
+        self.related_form_ids = sorted(
+            {form.pk} | {f.lookup_form_id for f in self.lookup_fields if f.lookup_form_id} | referencing_ids
+        )
+
+    def attach_fields(self, records) -> None:
+        """فیلد هر مقدار را از همین ساختار مقداردهی می‌کند تا سریالایزرها برای field کوئری نزنند."""
+        for record in records:
+            self.attach_values(record.values.all())
+            self.attach_item_fields(record.items.all())
+
+    def attach_item_fields(self, items) -> None:
+        for item in items:
+            self.attach_values(item.values.all())
+
+    def attach_values(self, value_objs) -> None:
+        for value_obj in value_objs:
+            field = self.fields_by_id.get(value_obj.field_id)
+            if field is not None:
+                value_obj.field = field
+
+
+def _load_definition(form: Form) -> dict:
+    # لوکاپ‌های فرم‌های دیگر به این فرم هم جزء ساختار هستند؛ تغییرشان نسخه این فرم را هم بالا می‌برد
+    return {
+        'fields': list(form.fields.select_related('lookup_reference_field', 'lookup_display_field').order_by('pk')),
+        'search_pairs': search_pairs_for(form.pk),
+        'referencing_ids': referencing_form_ids(form.pk),
+    }
+
+
+def _cache_key(form: Form) -> str:
+    return f'form_definition:{form.pk}:{form.schema_version}'
+
+
+def get_form_schema(form: Form) -> FormSchema:
+    """
+    ساختار فرم را از کش داخل پروسه، سپس کش مشترک (در صورت تنظیم) و در نهایت دیتابیس برمی‌گرداند.
+    کلید کش نسخه ساختار فرم است، پس با خواندن خود فرم نسخه معتبر بدون کوئری اضافه مشخص می‌شود.
+    """
+    schema = _schemas.get(form.pk)
+    if schema is not None and schema.version == form.schema_version:
+        return schema
+
+    definition = None
+    shared = caches[SCHEMA_CACHE_ALIAS] if SCHEMA_CACHE_ALIAS else None
+    if shared is not None:
+        definition = shared.get(_cache_key(form))
+    if definition is None:
+        definition = _load_definition(form)
+        if shared is not None:
+            # تابع‌های کامپایل‌شده فرمول قابل pickle نیستند؛ فقط داده‌های خوانده‌شده از دیتابیس به اشتراک گذاشته می‌شوند
+            shared.set(_cache_key(form), definition, SCHEMA_CACHE_TIMEOUT)
+
+    schema = FormSchema(form, **definition)
+    with _lock:
+        current = _schemas.get(form.pk)
+        if current is None or current.version <= schema.version:
+            _schemas[form.pk] = schema
+    return schema
+
+
+def clear_schema_cache() -> None:
+    _schemas.clear()
@@ -0,0 +1,178 @@
+# backend/records/search.py
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Case, Exists, IntegerField, OuterRef, Q, Value, When
+
+from form_builder.models import Field
+from .jalali import format_jalali
+from .lookups import format_lookup_code
+from .models import VALUE_TYPE_NAMES, RecordHeader, HeaderValue, LookupSearchEntry, LookupSearchToken
+
+SEARCH_RESULT_LIMIT = 50
+# سقف ردیف‌های کاندید برای رتبه‌بندی؛ پیشوندهای کوتاه در فرم‌های بزرگ صدها هزار تطابق دارند
+SEARCH_CANDIDATE_LIMIT = 1000
+SEARCH_BATCH_SIZE = 500
+_TOKEN_LENGTH = 100
+_KEY_LENGTH = 255
+# بزرگ‌ترین نویسه یونیکد؛ در SQLite (collation دودویی) پیشوند p معادل بازه [p, p + _MAX_CHAR) روی ایندکس btree است
+_MAX_CHAR = '\U0010ffff'
+
+# یکسان‌سازی حروف عربی/فارسی، ارقام و نیم‌فاصله تا «علي» و «علی» یا «۱۲» و «12» یکی شوند
+_NORMALIZE_TABLE = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'ٱ': 'ا',
+    '\u200c': ' ', '\u200f': ' ', '\u00a0': ' ',
+    **{persian: str(digit) for digit, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{arabic: str(digit) for digit, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+
+
+def normalize_search_text(value) -> str:
+    if value is None:
+        return ''
+    return ' '.join(str(value).translate(_NORMALIZE_TABLE).lower().split())
+
+
+def _tokens(*texts) -> set:
+    return {token[:_TOKEN_LENGTH] for text in texts for token in text.split()}
+
+
+def _prefix(column: str, prefix: str) -> dict:
+    # بازه فقط با مقایسه دودویی معادل پیشوند است؛ در بقیه دیتابیس‌ها ترتیب collation زبانی است
+    # و LIKE 'p%' روی ایندکس pattern_ops (lst_pair_token_idx) جستجو می‌شود
+    if connection.vendor == 'sqlite':
+        return {f'{column}__gte': prefix, f'{column}__lt': prefix + _MAX_CHAR}
+    return {f'{column}__startswith': prefix}
+
+
+def _value_text(field_type, text, number, jalali):
+    if field_type in ['NUMBER', 'LOOKUP']:
+        if isinstance(number, Decimal):
+            number = number.normalize()
+        return str(format_lookup_code(number, 'NUMBER')) if number is not None else None
+    if field_type == 'DATE':
+        return jalali
+    return text
+
+
+def search_pairs_for(form_id) -> list:
+    """جفت‌های (فیلد مرجع، فیلد نمایشی) لوکاپ‌هایی که به فیلدهای این فرم اشاره می‌کنند."""
+    return list(
+        Field.objects.filter(field_type='LOOKUP', lookup_reference_field__form_id=form_id, lookup_display_field__isnull=False)
+        .values_list('lookup_reference_field_id', 'lookup_display_field_id').distinct()
+    )
+
+
+def referencing_form_ids(form_id) -> set:
+    """فرم‌هایی که فیلد لوکاپشان به این فرم اشاره می‌کند."""
+    return set(Field.objects.filter(field_type='LOOKUP', lookup_reference_field__form_id=form_id).values_list('form_id', flat=True))
+
+
+def index_headers(pairs, header_ids, batch_size: int = SEARCH_BATCH_SIZE) -> int:
+    """ردیف‌های جستجوی لوکاپ این رکوردها را برای جفت‌های داده‌شده از روی مقادیر هدر از نو می‌سازد."""
+    from .services import _insert_returning_ids
+
+    pairs, header_ids = list(pairs), list(header_ids)
+    if not pairs or not header_ids:
+        return 0
+    field_ids = {field_id for pair in pairs for field_id in pair}
+    pair_filter = Q()
+    for reference_id, display_id in pairs:
+        pair_filter |= Q(reference_field_id=reference_id, display_field_id=display_id)
+
+    created = 0
+    for start in range(0, len(header_ids), batch_size):
+        chunk = header_ids[start:start + batch_size]
+        texts = {}
+        values = HeaderValue.objects.filter(header_id__in=chunk, field_id__in=field_ids)\
+            .values_list('header_id', 'field_id', 'value_type', 'value_text', 'value_number', 'value_lookup', 'value_date_gregorian')
+        for header_id, field_id, value_type, text, number, lookup, date in values:
+            field_type = VALUE_TYPE_NAMES[value_type]
+            jalali = format_jalali(date) if date is not None else None
+            texts[header_id, field_id] = _value_text(field_type, text, lookup if field_type == 'LOOKUP' else number, jalali)
+
+        entries = []
+        for header_id in chunk:
+            for reference_id, display_id in pairs:
+                code, display = texts.get((header_id, reference_id)), texts.get((header_id, display_id))
+                entries.append(LookupSearchEntry(
+                    header_id=header_id, reference_field_id=reference_id, display_field_id=display_id,
+                    code=code, display=display,
+                    code_key=normalize_search_text(code)[:_KEY_LENGTH], display_key=normalize_search_text(display)[:_KEY_LENGTH],
+                ))
+
+        with transaction.atomic():
+            LookupSearchEntry.objects.filter(pair_filter, header_id__in=chunk).delete()
+            entries = _insert_returning_ids(LookupSearchEntry, entries)
+            LookupSearchToken.objects.bulk_create([
+                LookupSearchToken(entry=entry, reference_field_id=entry.reference_field_id, display_field_id=entry.display_field_id, token=token)
+                for entry in entries for token in _tokens(entry.code_key, entry.display_key)
+            ], batch_size=batch_size)
+        created += len(entries)
+    return created
+
+
+def rebuild_lookup_search_index(pairs=None, batch_size: int = SEARCH_BATCH_SIZE) -> int:
+    """ایندکس جستجو را برای جفت‌های داده‌شده (یا همه لوکاپ‌های تعریف‌شده) کامل بازسازی می‌کند."""
+    if pairs is None:
+        pairs = Field.objects.filter(field_type='LOOKUP', lookup_reference_field__isnull=False, lookup_display_field__isnull=False)\
+            .values_list('lookup_reference_field_id', 'lookup_display_field_id').distinct()
+        LookupSearchEntry.objects.all().delete()
+
+    created = 0
+    for reference_id, display_id in set(pairs):
+        form_id = Field.objects.filter(pk=reference_id).values_list('form_id', flat=True).first()
+        header_ids = RecordHeader.objects.filter(form_id=form_id).order_by('pk').values_list('pk', flat=True)
+        created += index_headers([(reference_id, display_id)], header_ids, batch_size)
+    return created
+
+
+def search_lookup_records(ref_field: Field, disp_field: Field, query: str, limit: int = SEARCH_RESULT_LIMIT) -> list:
+    """
+    جستجوی لوکاپ با یک کوئری: هر کلمه ورودی باید پیشوند یکی از کلمات کد یا متن نمایشی باشد.
+    رتبه‌بندی روی حداکثر SEARCH_CANDIDATE_LIMIT کاندید انجام می‌شود تا زمان پاسخ به اندازه فرم وابسته نباشد.
+    رتبه‌بندی: تطابق کامل کد، سپس شروع کد، سپس شروع متن نمایشی، سپس بقیه؛ در هر گروه رکوردهای جدیدتر اول.
+    """
+    entries = LookupSearchEntry.objects.filter(reference_field=ref_field, display_field=disp_field)
+    terms = sorted({term[:_TOKEN_LENGTH] for term in normalize_search_text(query).split()}, key=len, reverse=True)
+    if terms:
+        # کاندیدها از بلندترین کلمه برداشته می‌شوند: جدیدترین ردیف‌هایی که کلمه‌ای با این پیشوند دارند، به علاوه
+        # جدیدترین ردیف‌هایی که دقیقاً همین کلمه را دارند (مثلاً کد کامل) تا با پیشوندهای پرتکرار از قلم نیفتند
+        tokens = LookupSearchToken.objects.filter(reference_field=ref_field, display_field=disp_field)
+        exact = tokens.filter(token=terms[0]).order_by('-entry_id').values('entry_id')[:SEARCH_CANDIDATE_LIMIT]
+        recent = tokens.filter(**_prefix('token', terms[0])).order_by('-entry_id').values('entry_id')[:SEARCH_CANDIDATE_LIMIT]
+        entries = entries.filter(Q(pk__in=exact) | Q(pk__in=recent))
+    for term in terms[1:]:
+        entries = entries.filter(Exists(LookupSearchToken.objects.filter(entry=OuterRef('pk'), **_prefix('token', term))))
+
+    if terms:
+        phrase = ' '.join(terms)[:_KEY_LENGTH]
+        entries = entries.annotate(rank=Case(
+            When(code_key=phrase, then=Value(0)),
+            When(**_prefix('code_key', phrase), then=Value(1)),
+            When(**_prefix('display_key', phrase), then=Value(2)),
+            default=Value(3), output_field=IntegerField(),
+        )).order_by('rank', '-header_id')
+    else:
+        entries = entries.order_by('-header_id')
+
+    results = []
+    for header_id, code, display in entries.values_list('header_id', 'code', 'display')[:limit]:
+        results.append({
+            "value": header_id,
+            "label": " - ".join(str(part) for part in (code, display) if part is not None) or str(header_id),
+            "display_value": _typed_value(disp_field, display),
+            "code_value": _typed_value(ref_field, code),
+        })
+    return results
+
+
+def _typed_value(field: Field, text):
+    # مانند پاسخ قبلی search-lookup، مقدار فیلدهای عددی به صورت عدد برگردانده می‌شود
+    if text is not None and field.field_type == 'NUMBER':
+        try:
+            return format_lookup_code(Decimal(text), 'NUMBER')
+        except InvalidOperation:
+            return text
+    return text
@@ -0,0 +1,66 @@
+# backend/records/sequences.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+
+from form_builder.models import Field
+from .models import FieldSequence, HeaderValue
+
+# 'reserve': شماره در لحظه پیشنهاد رزرو می‌شود | 'save': شماره هنگام ذخیره رکورد تخصیص داده می‌شود
+AUTO_INCREMENT_MODES = ['reserve', 'save']
+
+
+def auto_increment_mode() -> str:
+    return getattr(settings, 'AUTO_INCREMENT_MODE', 'reserve')
+
+
+def _current_max(field: Field) -> int:
+    max_value = HeaderValue.objects.filter(field=field).aggregate(max_val=Max('value_number'))['max_val']
+    return int(max_value) if max_value is not None else 0
+
+
+def _ensure_sequence(field: Field) -> None:
+    # فقط بار اول برای هر فیلد، شمارنده از روی بیشترین مقدار ثبت‌شده مقداردهی می‌شود
+    FieldSequence.objects.get_or_create(field=field, defaults={'next_value': _current_max(field) + 1})
+
+
+def peek_next_value(field: Field) -> int:
+    """شماره بعدی را بدون رزرو کردن برمی‌گرداند."""
+    next_value = FieldSequence.objects.filter(field=field).values_list('next_value', flat=True).first()
+    if next_value is None:
+        return _current_max(field) + 1
+    return next_value
+
+
+@transaction.atomic
+def allocate_values(field: Field, count: int = 1) -> list:
+    """
+    count شماره پشت‌سرهم را به صورت اتمیک تخصیص می‌دهد.
+    ابتدا UPDATE اجرا می‌شود تا قفل ردیف (یا قفل نوشتن SQLite) قبل از خواندن گرفته شود.
+    """
+    updated = FieldSequence.objects.filter(field=field).update(next_value=F('next_value') + count)
+    if not updated:
+        _ensure_sequence(field)
+        FieldSequence.objects.filter(field=field).update(next_value=F('next_value') + count)
+    next_value = FieldSequence.objects.filter(field=field).values_list('next_value', flat=True).get()
+    return list(range(next_value - count, next_value))
+
+
+def advance_past(field: Field, value: int) -> None:
+    """اگر مقداری دستی بزرگ‌تر از شمارنده ثبت شد، شمارنده از آن عبور می‌کند."""
+    updated = FieldSequence.objects.filter(field=field, next_value__lte=value).update(next_value=value + 1)
+    if not updated and not FieldSequence.objects.filter(field=field).exists():
+        _ensure_sequence(field)
+
+
+@transaction.atomic
+def reseed_sequences(fields=None) -> dict:
+    """شمارنده فیلدها را برابر بیشترین مقدار ثبت‌شده + ۱ قرار می‌دهد."""
+    fields = fields if fields is not None else Field.objects.filter(has_auto_increment=True)
+    result = {}
+    for field in fields:
+        next_value = _current_max(field) + 1
+        FieldSequence.objects.update_or_create(field=field, defaults={'next_value': next_value})
+        result[field.pk] = next_value
+    return result
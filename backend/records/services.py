@@ -1,79 +1,281 @@
 # backend/records/services.py
 
-import jdatetime
 from decimal import Decimal, InvalidOperation
-from django.db import transaction, IntegrityError
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Subquery
 from rest_framework.exceptions import ValidationError
 
 from form_builder.models import Form
-from .models import RecordHeader, HeaderValue, RecordItem, ItemValue
+from .models import VALUE_TYPES, RecordHeader, HeaderValue, RecordItem, ItemValue, RecordReference, RecordTombstone
+from .jalali import parse_jalali
+from .lookups import parse_lookup_id
+from .sequences import advance_past, allocate_values
+from .schema import get_form_schema
+from .projections import bulk_create_projections, refresh_projection
+from .search import index_headers
+from .uniqueness import insert_unique_keys, sync_unique_keys, unique_entries
+from .deletion import delete_headers, delete_items
+
+WRITE_BATCH_SIZE = 500
 
 def _set_field_value(instance, field, value):
     if value is None or str(value).strip() == '': return
     
+    instance.value_type = VALUE_TYPES[field.field_type]
     try:
         if field.field_type in ['TEXT', 'LOOKUP_DISPLAY']:
             instance.value_text = str(value)
-        elif field.field_type in ['NUMBER', 'LOOKUP']:
+        elif field.field_type == 'NUMBER':
             instance.value_number = Decimal(value)
+        elif field.field_type == 'LOOKUP':
+            instance.value_lookup = parse_lookup_id(value)
         elif field.field_type == 'DATE':
-            # ۱. رشته تاریخ ورودی را از هرگونه اطلاعات اضافه (مثل ساعت) پاک می‌کنیم
-            date_str = str(value).split('T')[0]
-            
-            # ۲. رشته را با jdatetime به عنوان یک تاریخ شمسی معتبر پارس می‌کنیم
-            jalali_date_obj = jdatetime.datetime.strptime(date_str, '%Y-%m-%d').date()
-            
-            # ۳. آبجکت شمسی را به میلادی تبدیل کرده و در فیلد میلادی ذخیره می‌کنیم
-            instance.value_date_gregorian = jalali_date_obj.togregorian()
-            
-            # ۴. رشته شمسی را با فرمت صحیح در فیلد شمسی ذخیره می‌کنیم
-            instance.value_date_jalali = jalali_date_obj.strftime('%Y/%m/%d')
+            # ورودی شمسی است (YYYY-MM-DD، بخش ساعت نادیده گرفته می‌شود)؛ فقط تاریخ میلادی ذخیره می‌شود
+            instance.value_date_gregorian = parse_jalali(str(value))[0]
             
     except (ValueError, TypeError, InvalidOperation) as e:
         raise ValidationError(f"مقدار '{value}' برای فیلد '{field.name}' نامعتبر است: {e}")
 
 
+def _collect_references(value_objs):
+    refs = set()
+    for value_obj in value_objs:
+        if value_obj.field_type == 'LOOKUP' and value_obj.value_lookup is not None:
+            refs.add((value_obj.field_id, value_obj.value_lookup))
+    return refs
+
+
+def sync_record_references(record_header: RecordHeader, value_objs) -> None:
+    """ایندکس ارجاعات خروجی یک رکورد را با مقادیر لوکاپ فعلی آن همگام می‌کند."""
+    refs = _collect_references(value_objs)
+    target_ids = {target_id for _, target_id in refs}
+    # ارجاع به رکوردی که وجود ندارد در ایندکس ثبت نمی‌شود
+    existing_ids = set(RecordHeader.objects.filter(pk__in=target_ids).values_list('pk', flat=True))
+
+    record_header.outgoing_references.all().delete()
+    RecordReference.objects.bulk_create([
+        RecordReference(source=record_header, field_id=field_id, target_id=target_id)
+        for field_id, target_id in refs if target_id in existing_ids
+    ])
+
+
+@transaction.atomic
+def rebuild_reference_index(batch_size: int = 1000) -> int:
+    """
+    کل ایندکس ارجاعات را از روی مقادیر لوکاپ موجود از نو می‌سازد. مقادیر به صورت جریانی خوانده و دسته به دسته
+    درج می‌شوند و وجود رکورد مقصد در خود SQL بررسی می‌شود تا حافظه به اندازه جدول‌ها وابسته نباشد.
+    """
+    RecordReference.objects.all().delete()
+
+    sources = [(HeaderValue, 'header_id'), (ItemValue, 'item__header_id')]
+    for model, source_path in sources:
+        values = model.objects.filter(
+            value_type=VALUE_TYPES['LOOKUP'], value_lookup__in=Subquery(RecordHeader.objects.values('pk')),
+        ).order_by().values_list(source_path, 'field_id', 'value_lookup').distinct()
+        batch = []
+        for source_id, field_id, target_id in values.iterator(chunk_size=batch_size):
+            batch.append(RecordReference(source_id=source_id, field_id=field_id, target_id=target_id))
+            if len(batch) >= batch_size:
+                RecordReference.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        RecordReference.objects.bulk_create(batch, ignore_conflicts=True)
+    return RecordReference.objects.count()
+
+
+VALUE_COLUMNS = ['value_type', 'value_text', 'value_number', 'value_lookup', 'value_date_gregorian']
+
+
+def _is_blank(value) -> bool:
+    return value is None or str(value).strip() == ''
+
+
+def _build_values(model, data: dict, fields_map: dict, **owner) -> dict:
+    """آبجکت‌های ذخیره‌نشده مقادیر را می‌سازد (کلید: field_id)."""
+    values = {}
+    for code, value in data.items():
+        if code in fields_map and value is not None and str(value).strip() != '':
+            field = fields_map[code]
+            value_obj = model(field=field, **owner)
+            _set_field_value(value_obj, field, value)
+            values[field.pk] = value_obj
+    return values
+
+
+class _ValueChanges:
+    """تغییرات لازم روی یک جدول مقادیر که در انتها به صورت دسته‌ای اعمال می‌شوند."""
+
+    def __init__(self, model):
+        self.model = model
+        self.to_create = []
+        self.to_delete = []
+        self.final = []
+
+    def diff(self, existing: dict, new: dict):
+        # existing و new هر دو بر اساس field_id کلید خورده‌اند؛ مقادیر بدون تغییر دست نمی‌خورند
+        for field_id, old_obj in existing.items():
+            if field_id not in new:
+                self.to_delete.append(old_obj.pk)
+        for field_id, new_obj in new.items():
+            old_obj = existing.get(field_id)
+            if old_obj is not None and all(getattr(old_obj, col) == getattr(new_obj, col) for col in VALUE_COLUMNS):
+                old_obj.field = new_obj.field
+                self.final.append(old_obj)
+                continue
+            # مقادیر تغییرکرده حذف و دوباره درج می‌شوند؛ bulk_update با CASE WHEN روی هزاران ردیف بسیار کندتر است
+            if old_obj is not None:
+                self.to_delete.append(old_obj.pk)
+            self.to_create.append(new_obj)
+            self.final.append(new_obj)
+
+    def apply(self, batch_size: int):
+        for start in range(0, len(self.to_delete), batch_size):
+            self.model.objects.filter(pk__in=self.to_delete[start:start + batch_size]).delete()
+        if self.to_create:
+            self.model.objects.bulk_create(self.to_create, batch_size=batch_size)
+
+
+def _insert_returning_ids(model, objs: list) -> list:
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=WRITE_BATCH_SIZE)
+    # دیتابیس‌هایی که شناسه‌های bulk_create را برنمی‌گردانند
+    for obj in objs:
+        obj.save()
+    return objs
+
+
+def _create_items(record_header: RecordHeader, count: int) -> list:
+    return _insert_returning_ids(RecordItem, [RecordItem(header=record_header) for _ in range(count)])
+
+
+def bulk_create_records(form: Form, records: list) -> list:
+    """
+    چند رکورد جدید را با درج دسته‌ای ذخیره می‌کند.
+    هر عضو records یک جفت (مقادیر هدر، لیست مقادیر ردیف‌ها) است که مقادیرشان
+    آبجکت‌های ذخیره‌نشده HeaderValue/ItemValue با کلید field_id هستند.
+    """
+    headers = _insert_returning_ids(RecordHeader, [RecordHeader(form=form) for _ in records])
+
+    header_values, item_rows = [], []
+    for record_header, (values, items) in zip(headers, records):
+        for value_obj in values.values():
+            value_obj.header = record_header
+            header_values.append(value_obj)
+        if form.form_type == 'DOUBLE_SECTION':
+            item_rows.extend((record_header, item_values) for item_values in items)
+
+    record_items = _insert_returning_ids(RecordItem, [RecordItem(header=h) for h, _ in item_rows])
+    item_values = []
+    for record_item, (_, values) in zip(record_items, item_rows):
+        for value_obj in values.values():
+            value_obj.item = record_item
+            item_values.append(value_obj)
+
+    try:
+        HeaderValue.objects.bulk_create(header_values, batch_size=WRITE_BATCH_SIZE)
+        ItemValue.objects.bulk_create(item_values, batch_size=WRITE_BATCH_SIZE)
+    except IntegrityError:
+        raise ValidationError("یک یا چند مقدار از فیلدهای یکتا (unique) تکراری است.")
+
+    schema = get_form_schema(form)
+    if schema.unique_fields:
+        unique_ids = {field.pk for field in schema.unique_fields}
+        insert_unique_keys(unique_entries(header_values + item_values, unique_ids))
+
+    refs = set()
+    for value_obj in header_values:
+        refs.update((value_obj.header_id, field_id, target_id) for field_id, target_id in _collect_references([value_obj]))
+    for value_obj in item_values:
+        refs.update((value_obj.item.header_id, field_id, target_id) for field_id, target_id in _collect_references([value_obj]))
+    existing_ids = set(RecordHeader.objects.filter(pk__in={t for _, _, t in refs}).values_list('pk', flat=True))
+    RecordReference.objects.bulk_create(
+        [RecordReference(source_id=s, field_id=f, target_id=t) for s, f, t in refs if t in existing_ids],
+        batch_size=WRITE_BATCH_SIZE,
+    )
+    if schema.has_projection:
+        bulk_create_projections(headers, [values.values() for values, _ in records])
+    if schema.search_pairs:
+        index_headers(schema.search_pairs, [record_header.pk for record_header in headers])
+
+    return headers
+
+
 @transaction.atomic
 def create_or_update_record(form: Form, validated_data: dict, instance: RecordHeader = None) -> RecordHeader:
-    is_update = instance is not None
     header_data = validated_data.get('header_values', {})
     items_data = validated_data.get('items', [])
-    
-    record_header = instance or RecordHeader.objects.create(form=form)
 
+    record_header = instance or RecordHeader.objects.create(form=form)
     if instance:
-        record_header.values.all().delete()
-        if form.form_type == 'DOUBLE_SECTION':
-            ItemValue.objects.filter(item__header=record_header).delete()
-            record_header.items.all().delete()
+        # فقط برای به‌روزرسانی updated_at
+        record_header.save(update_fields=['updated_at'])
 
-    fields_map = {f.code: f for f in form.fields.all()}
-    
-    # ❌ حلقه اعتبارسنجی اضافی و پراشتباه به طور کامل حذف شد.
+    schema = get_form_schema(form)
+    fields_map = schema.fields_by_code
+    auto_fields = schema.auto_increment_fields
 
-    try:
-        # ذخیره مقادیر هدر
-        for code, value in header_data.items():
-            if code in fields_map and value is not None and str(value).strip() != '':
-                field = fields_map[code]
-                value_obj = HeaderValue(header=record_header, field=field)
-                _set_field_value(value_obj, field, value)
-                value_obj.save()
-
-        # ذخیره مقادیر اقلام
-        if form.form_type == 'DOUBLE_SECTION' and items_data:
-            for item_dict in items_data:
-                if not item_dict: continue
-                record_item = RecordItem.objects.create(header=record_header)
-                for code, value in item_dict.items():
-                    if code in fields_map and value is not None and str(value).strip() != '':
-                        field = fields_map[code]
-                        item_value_obj = ItemValue(item=record_item, field=field)
-                        _set_field_value(item_value_obj, field, value)
-                        item_value_obj.save()
+    if auto_fields and not instance:
+        # فیلد افزایشی خالی هنگام ثبت از شمارنده فیلد مقدار می‌گیرد (حالت تخصیص هنگام ذخیره)
+        header_data = dict(header_data)
+        for field in auto_fields:
+            if _is_blank(header_data.get(field.code)):
+                header_data[field.code] = str(allocate_values(field)[0])
+
+    # فیلدهای محاسباتی در سمت سرور حساب می‌شوند و مقدار ارسالی کلاینت برای آن‌ها نادیده گرفته می‌شود
+    if schema.plan:
+        header_data, items_data = schema.plan.apply(header_data, items_data)
+
+    header_changes = _ValueChanges(HeaderValue)
+    item_changes = _ValueChanges(ItemValue)
 
+    # مقادیر هدر: در حالت ویرایش با مقادیر فعلی مقایسه می‌شوند، نه حذف و درج دوباره
+    existing_header = {v.field_id: v for v in record_header.values.all()} if instance else {}
+    header_changes.diff(existing_header, _build_values(HeaderValue, header_data, fields_map, header=record_header))
+
+    if form.form_type == 'DOUBLE_SECTION':
+        items_data = [item_dict for item_dict in (items_data or []) if item_dict]
+        existing_items = list(record_header.items.prefetch_related('values').order_by('pk')) if instance else []
+
+        # ردیف‌ها به ترتیب با ردیف‌های موجود جفت می‌شوند؛ ردیف‌های اضافه حذف و کمبودها درج می‌شوند
+        reused_items = existing_items[:len(items_data)]
+        removed_item_ids = [item.pk for item in existing_items[len(items_data):]]
+        new_items = _create_items(record_header, max(len(items_data) - len(reused_items), 0))
+
+        for index, (record_item, item_dict) in enumerate(zip(reused_items + new_items, items_data)):
+            existing = {v.field_id: v for v in record_item.values.all()} if index < len(reused_items) else {}
+            item_changes.diff(existing, _build_values(ItemValue, item_dict, fields_map, item=record_item))
+
+        if removed_item_ids:
+            delete_items(RecordItem.objects.filter(pk__in=removed_item_ids))
+
+    # تکراری بودن مقادیر یکتا را ایندکس یکتای جدول کلیدها تشخیص می‌دهد، پیش از نوشتن خود مقادیر
+    sync_unique_keys(record_header, header_changes.final + item_changes.final, schema.unique_fields, created=not instance)
+
+    try:
+        header_changes.apply(WRITE_BATCH_SIZE)
+        item_changes.apply(WRITE_BATCH_SIZE)
     except IntegrityError:
         # ✅ اگر دیتابیس (که دیگر اشتباه نمی‌کند) خطای یکتا بودن داد، آن را به پیغام صحیح تبدیل می‌کنیم
         raise ValidationError("یک یا چند مقدار از فیلدهای یکتا (unique) تکراری است.")
-    
-    return record_header
\ No newline at end of file
+
+    sync_record_references(record_header, header_changes.final + item_changes.final)
+    if schema.has_projection:
+        refresh_projection(record_header, header_changes.final)
+    if schema.search_pairs:
+        index_headers(schema.search_pairs, [record_header.pk])
+
+    for value_obj in header_changes.to_create:
+        if value_obj.field.has_auto_increment and value_obj.value_number is not None:
+            advance_past(value_obj.field, int(value_obj.value_number))
+
+    # مانند UpdateModelMixin در DRF، کش prefetch قدیمی را دور می‌ریزیم تا خروجی مقادیر جدید را نشان دهد
+    record_header._prefetched_objects_cache = {}
+
+    return record_header
+
+
+@transaction.atomic
+def delete_record(record_header: RecordHeader) -> None:
+    """رکورد را حذف می‌کند و سنگ‌قبر آن را برای همگام‌سازی تغییرات (records/changes/) ثبت می‌کند."""
+    RecordTombstone.objects.create(form_id=record_header.form_id, record_id=record_header.pk)
+    # رکورد دوبخشی بزرگ بدون بارگذاری اقلام و مقادیرش در حافظه حذف می‌شود (records/deletion.py)
+    delete_headers([record_header.pk])
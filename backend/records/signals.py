@@ -0,0 +1,38 @@
+# backend/records/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from form_builder.models import Field
+from .models import UniqueValueKey
+from .search import rebuild_lookup_search_index
+from .uniqueness import rebuild_unique_keys
+
+
+@receiver(post_save, sender=Field)
+def index_lookup_pair(sender, instance, raw=False, **kwargs):
+    """با تعریف لوکاپ یا تغییر فیلد مرجع/نمایشی آن، ایندکس جستجوی رکوردهای فعلی فرم مرجع ساخته می‌شود."""
+    if raw or instance.field_type != 'LOOKUP':
+        return
+    pair = (instance.lookup_reference_field_id, instance.lookup_display_field_id)
+    # ذخیره‌های دیگر فیلد (نام، ترتیب، ...) ایندکس را تغییر نمی‌دهند؛ جفت قبلی در form_builder.signals.field_pre_save خوانده می‌شود
+    if not all(pair) or pair == getattr(instance, '_previous_lookup_pair', None):
+        return
+    # اگر لوکاپ دیگری با همین جفت وجود داشته باشد، ایندکس از قبل ساخته شده است
+    siblings = Field.objects.filter(field_type='LOOKUP', lookup_reference_field_id=pair[0], lookup_display_field_id=pair[1])
+    if siblings.exclude(pk=instance.pk).exists():
+        return
+    transaction.on_commit(lambda: rebuild_lookup_search_index([pair]))
+
+
+@receiver(post_save, sender=Field)
+def sync_field_unique_keys(sender, instance, raw=False, **kwargs):
+    """فیلدی که یکتا می‌شود از مقادیر فعلی‌اش کلید می‌گیرد و کلیدهای فیلدی که دیگر یکتا نیست پاک می‌شوند."""
+    if raw:
+        return
+    keys = UniqueValueKey.objects.filter(field=instance)
+    if not instance.is_unique:
+        keys.delete()
+    elif not keys.exists():
+        rebuild_unique_keys([instance])
@@ -0,0 +1,43 @@
+# backend/records/synthetic.py
+
+import random
+
+# واژه‌های متن تصادفی؛ فارسی تا مسیر نرمال‌سازی جستجو هم سنجیده شود
+WORDS = [
+    'کالا', 'مشتری', 'انبار', 'فاکتور', 'تهران', 'اصفهان', 'شیراز', 'تبریز', 'مشهد', 'کرج',
+    'قطعه', 'لوله', 'پیچ', 'مهره', 'کابل', 'سیم', 'رنگ', 'چسب', 'ورق', 'پروفیل',
+    'سفید', 'مشکی', 'آبی', 'بزرگ', 'کوچک', 'ویژه', 'عمده', 'خرده', 'نقدی', 'اقساطی',
+]
+
+
+def random_value(rng: random.Random, field_type: str) -> str:
+    """مقدار تصادفی یک فیلد به همان شکلی که کاربر وارد می‌کند (تاریخ شمسی)."""
+    if field_type == 'NUMBER':
+        return str(rng.randint(1, 100000))
+    if field_type == 'DATE':
+        return f'{rng.randint(1398, 1404)}/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}'
+    return ' '.join(rng.sample(WORDS, 2))
+
+
+def random_record(rng: random.Random, header_fields, item_fields, items: int, serial: int, lookup_values: dict) -> dict:
+    """
+    داده یک رکورد تصادفی به شکل ورودی API و RecordImporter.
+    فیلدهای یکتا مقدار serial می‌گیرند و مقدار هر فیلد لوکاپ از lookup_values[field_id] انتخاب می‌شود
+    (شناسه رکورد برای API، کد مرجع برای RecordImporter).
+    """
+    def values(fields):
+        data = {}
+        for field in fields:
+            if field.is_computed or field.field_type == 'LOOKUP_DISPLAY':
+                continue
+            if field.field_type == 'LOOKUP':
+                candidates = lookup_values.get(field.pk)
+                if candidates:
+                    data[field.code] = str(rng.choice(candidates))
+            elif field.is_unique:
+                data[field.code] = str(serial)
+            else:
+                data[field.code] = random_value(rng, field.field_type)
+        return data
+
+    return {'header_values': values(header_fields), 'items': [values(item_fields) for _ in range(items)]}
@@ -0,0 +1,247 @@
+# backend/records/tests.py
+
+import datetime
+import re
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.db.models import Max
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from form_builder.models import Field, Form
+from .filters import field_condition
+from .models import HeaderValue, RecordHeader, RecordProjection, RecordReference, UniqueValueKey
+from .projections import create_projection_indexes, rebuild_projections
+from .schema import clear_schema_cache, get_form_schema
+from .search import search_lookup_records
+from .sequences import allocate_values
+from .services import create_or_update_record
+
+# الگوی پیمایش کامل جدول در خروجی EXPLAIN هر دیتابیس
+FULL_SCAN_PATTERNS = {
+    'sqlite': re.compile(r'\bSCAN (\w+)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+class RecordDataMixin:
+    """داده مشترک تست‌ها: فرم مشتری‌ها و فرم دوبخشی فاکتورها با لوکاپ به مشتری در هدر و اقلام."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customers = Form.objects.create(code='customers', name='مشتری‌ها')
+        cls.customer_code = Field.objects.create(form=cls.customers, code='code', name='کد', field_type='NUMBER', is_unique=True)
+        cls.customer_name = Field.objects.create(form=cls.customers, code='name', name='نام', field_type='TEXT')
+
+        cls.invoices = Form.objects.create(code='invoices', name='فاکتورها', form_type='DOUBLE_SECTION')
+        cls.invoice_no = Field.objects.create(form=cls.invoices, code='no', name='شماره', field_type='NUMBER', is_unique=True)
+        cls.invoice_date = Field.objects.create(form=cls.invoices, code='date', name='تاریخ', field_type='DATE')
+        lookup = {'lookup_form': cls.customers, 'lookup_reference_field': cls.customer_code, 'lookup_display_field': cls.customer_name}
+        cls.customer_lookup = Field.objects.create(form=cls.invoices, code='customer', name='مشتری', field_type='LOOKUP', **lookup)
+        Field.objects.create(form=cls.invoices, code='qty', name='تعداد', field_type='NUMBER', section='ITEM')
+        Field.objects.create(form=cls.invoices, code='product', name='کالا', field_type='LOOKUP', section='ITEM', **lookup)
+
+        customer_ids = [
+            create_or_update_record(cls.customers, {'header_values': {'code': str(index), 'name': f'مشتری {index}'}}).pk
+            for index in range(1, 6)
+        ]
+        for index in range(1, 11):
+            create_or_update_record(cls.invoices, {
+                'header_values': {'no': str(index), 'date': '1403-01-15', 'customer': str(customer_ids[index % 5])},
+                'items': [{'qty': str(row), 'product': str(customer_ids[row % 5])} for row in range(1, 4)],
+            })
+        cls.invoice = RecordHeader.objects.filter(form=cls.invoices).order_by('-pk').first()
+
+
+class QueryPlanTests(RecordDataMixin, TestCase):
+    """کوئری‌های پرتکرار جداول مقادیر باید از ایندکس ترکیبی مناسب استفاده کنند (ایندکس تک‌ستونی field_id کافی نیست)."""
+
+    def hot_queries(self):
+        record_id = self.invoice.pk
+        return [
+            ('is_record_referenced', None,
+             RecordReference.objects.filter(target_id=record_id).select_related('field__form')[:1]),
+            ('max number value', 'hv_field_number_idx',
+             HeaderValue.objects.filter(field_id=self.invoice_no.pk).values('field_id').annotate(max_val=Max('value_number'))),
+            # در SQLite ایندکس قید یکتا نام خودکار دارد؛ فقط نبود پیمایش کامل بررسی می‌شود
+            ('unique key conflict', None,
+             UniqueValueKey.objects.filter(field_id=self.invoice_no.pk, key__in=['1', 'x'])),
+            ('lookup filter', 'hv_field_lookup_idx',
+             HeaderValue.objects.filter(field_id=self.customer_lookup.pk, value_lookup=record_id)),
+            ('date range filter', 'hv_field_date_idx',
+             HeaderValue.objects.filter(field_id=self.invoice_date.pk, value_date_gregorian__range=(datetime.date(2024, 3, 20), datetime.date(2025, 3, 20)))),
+            ('record list page', 'rh_form_created_idx',
+             RecordHeader.objects.filter(form_id=self.invoices.pk).order_by('-created_at', '-id')[:50]),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        pattern = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f"بررسی پلن برای دیتابیس '{connection.vendor}' پشتیبانی نمی‌شود.")
+        if connection.vendor == 'postgresql':
+            # روی جدول‌های کوچک PostgreSQL همیشه Seq Scan را ترجیح می‌دهد؛ فقط امکان استفاده از ایندکس بررسی می‌شود
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        for name, expected_index, queryset in self.hot_queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                scanned = [table for table in pattern.findall(plan) if table.startswith('records_')]
+                self.assertEqual(scanned, [], f"پیمایش کامل جدول:\n{plan}")
+                if expected_index:
+                    self.assertIn(expected_index, plan)
+
+
+class ProjectionQueryTests(RecordDataMixin, TestCase):
+    """فیلترهای جدول تخت باید شرط ایندکس‌های جزئی آن (form_id جدول تخت) را داشته باشند."""
+
+    def setUp(self):
+        rebuild_projections(self.invoices)
+        self.projection_indexes = create_projection_indexes(self.invoices)
+
+    def filtered(self, lookup, raw):
+        condition = field_condition(self.invoice_no, lookup, raw, projected=True)
+        return RecordHeader.objects.filter(form=self.invoices).filter(condition)
+
+    def test_projected_filter(self):
+        queryset = self.filtered('gte', '5')
+        self.assertEqual(queryset.count(), 6)
+        table = connection.ops.quote_name(RecordProjection._meta.db_table)
+        self.assertIn(f'{table}.{connection.ops.quote_name("form_id")} = {self.invoices.pk}', str(queryset.query))
+
+    def test_projected_filter_uses_partial_index(self):
+        if connection.vendor != 'postgresql':
+            self.skipTest("ایندکس‌های جدول تخت فقط در PostgreSQL ساخته می‌شوند.")
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = self.filtered('gte', '5').explain()
+        self.assertIn(f'rp_f{self.invoice_no.pk}_idx', plan)
+
+
+class SchemaCacheTests(RecordDataMixin, TestCase):
+    """با کش مشترک، ساختار فرم در پروسه‌ای که آن را نساخته بدون کوئری ساخته می‌شود."""
+
+    @mock.patch('records.schema.SCHEMA_CACHE_ALIAS', 'default')
+    def test_shared_cache_hit_without_queries(self):
+        caches['default'].clear()
+        clear_schema_cache()
+        expected = get_form_schema(self.customers)
+        clear_schema_cache()
+        with self.assertNumQueries(0):
+            schema = get_form_schema(self.customers)
+        self.assertEqual(schema.search_pairs, expected.search_pairs)
+        self.assertEqual(schema.related_form_ids, [self.customers.pk, self.invoices.pk])
+
+
+class LookupSearchTests(RecordDataMixin, TestCase):
+    """کاندیدهای جستجوی لوکاپ فقط از ردیف‌های همان جفت (فیلد مرجع، فیلد نمایشی) برداشته می‌شوند."""
+
+    def test_other_pair_does_not_fill_candidates(self):
+        # جفت دوم با همان فیلد مرجع بعد از جفت اول ایندکس می‌شود، پس ردیف‌هایش جدیدترند
+        city = Field.objects.create(form=self.customers, code='city', name='شهر', field_type='TEXT')
+        with self.captureOnCommitCallbacks(execute=True):
+            Field.objects.create(form=self.invoices, code='customer_city', name='شهر مشتری', field_type='LOOKUP',
+                                 lookup_form=self.customers, lookup_reference_field=self.customer_code, lookup_display_field=city)
+        with mock.patch('records.search.SEARCH_CANDIDATE_LIMIT', 1):
+            results = search_lookup_records(self.customer_code, self.customer_name, '1')
+        self.assertEqual([result['label'] for result in results], ['1 - مشتری 1'])
+
+
+class RecordImportTests(RecordDataMixin, TestCase):
+    """ردیف‌های بدشکل فایل ورود فقط خطای همان ردیف را می‌دهند و بقیه فایل وارد می‌شود."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+
+    def test_malformed_jsonl_rows(self):
+        lines = [
+            '{"header_values": [1]}',
+            '{"header_values": {"no": "100"}, "items": [1]}',
+            '{"items": {"qty": "1"}}',
+            '{"header_values": {"no": "101"}, "items": [{"qty": "2"}]}',
+        ]
+        upload = SimpleUploadedFile('records.jsonl', '\n'.join(lines).encode())
+        response = self.client.post(f'/api/forms/{self.invoices.pk}/records/import/', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['row'] for error in response.json()['errors']], [1, 2, 3])
+
+
+class SequenceConcurrencyTests(TransactionTestCase):
+    """تخصیص همزمان شماره‌های افزایشی از چند thread (هر کدام با اتصال دیتابیس خودش) نباید شماره تکراری یا جاافتاده بدهد."""
+
+    THREADS = 8
+    ALLOCATIONS = 5
+    COUNT = 2
+
+    def test_concurrent_allocations(self):
+        form = Form.objects.create(code='orders', name='سفارش‌ها')
+        field = Field.objects.create(form=form, code='no', name='شماره', field_type='NUMBER', has_auto_increment=True)
+        barrier = threading.Barrier(self.THREADS)
+        allocated, errors = [], []
+
+        def allocate():
+            try:
+                barrier.wait()
+                for _ in range(self.ALLOCATIONS):
+                    allocated.append(allocate_values(field, self.COUNT))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=allocate) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        for values in allocated:
+            self.assertEqual(values, list(range(values[0], values[0] + self.COUNT)))
+        numbers = sorted(value for values in allocated for value in values)
+        self.assertEqual(numbers, list(range(1, self.THREADS * self.ALLOCATIONS * self.COUNT + 1)))
+
+
+@override_settings(API_PROFILING=True, API_QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(RecordDataMixin, TestCase):
+    """endpointهای API_QUERY_BUDGETS از مسیر میدل‌ور پروفایل؛ عبور از سقف QueryBudgetExceeded می‌دهد."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create(username='tester'))
+        # سقف‌ها برای حالت پایدار است؛ ساختار فرم‌ها فقط در اولین درخواست بعد از هر تغییر از دیتابیس خوانده می‌شود
+        for form in Form.objects.all():
+            get_form_schema(form)
+
+    def test_endpoints_within_budget(self):
+        form, record = self.invoices.pk, self.invoice.pk
+        paths = {
+            'FormViewSet.list': '/api/forms/',
+            'FormViewSet.retrieve': f'/api/forms/{form}/',
+            'FieldViewSet.list': f'/api/forms/{form}/fields/',
+            'FieldViewSet.search_lookup': f'/api/forms/{form}/fields/{self.customer_lookup.pk}/search-lookup/?q=1',
+            'RecordViewSet.list': f'/api/forms/{form}/records/',
+            'RecordViewSet.retrieve': f'/api/forms/{form}/records/{record}/',
+            'RecordViewSet.record_items': f'/api/forms/{form}/records/{record}/items/',
+        }
+        self.assertEqual(set(paths), set(settings.API_QUERY_BUDGETS))
+        for endpoint, path in paths.items():
+            with self.subTest(endpoint), self.assertLogs('api.profiling', 'INFO') as logs:
+                self.assertEqual(self.client.get(path).status_code, 200)
+                self.assertEqual(logs.records[-1].api_profile['endpoint'], endpoint)
+
+    def test_streamed_export_is_profiled(self):
+        # کوئری‌های تولید بدنه پاسخ استریم هم در آمار درخواست شمرده می‌شوند
+        with self.assertLogs('api.profiling', 'INFO') as logs, CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/forms/{self.invoices.pk}/records/export/')
+            b''.join(response.streaming_content)
+        self.assertEqual(logs.records[-1].api_profile['queries'], len(queries))
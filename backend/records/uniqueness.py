@@ -0,0 +1,157 @@
+# backend/records/uniqueness.py
+
+import hashlib
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from rest_framework.exceptions import ValidationError
+
+from form_builder.models import Field
+from .models import VALUE_TYPES, HeaderValue, ItemValue, UniqueValueKey
+
+UNIQUE_BATCH_SIZE = 1000
+_KEY_LENGTH = 255
+# همان دقت ستون value_number؛ 12 و 12.000001 در دیتابیس یکی ذخیره می‌شوند
+_NUMBER_PLACES = Decimal('0.00001')
+
+
+def unique_key(value_obj):
+    """
+    نسخه نرمال‌شده مقدار برای مقایسه یکتایی: عدد بدون صفرهای اضافه (12 و 12.00 یکی هستند)،
+    لوکاپ با شناسه رکورد مرجع، تاریخ با مقدار میلادی و متن بلند با هش آن.
+    """
+    value_type = value_obj.value_type
+    if value_type == VALUE_TYPES['NUMBER']:
+        number = value_obj.value_number
+        if number is None:
+            return None
+        try:
+            number = Decimal(number).quantize(_NUMBER_PLACES)
+        except InvalidOperation:
+            pass
+        return '0' if number == 0 else format(number.normalize(), 'f')
+    if value_type == VALUE_TYPES['LOOKUP']:
+        return str(value_obj.value_lookup) if value_obj.value_lookup is not None else None
+    if value_type == VALUE_TYPES['DATE']:
+        day = value_obj.value_date_gregorian
+        return day.isoformat() if day is not None else None
+    text = value_obj.value_text
+    if text is None:
+        return None
+    if len(text) > _KEY_LENGTH:
+        return 'sha256:' + hashlib.sha256(text.encode()).hexdigest()
+    return text
+
+
+def duplicate_message(value_obj) -> str:
+    return f"مقدار '{value_obj.get_value()}' برای فیلد '{value_obj.field.name}' تکراری است و قبلاً ثبت شده است."
+
+
+def unique_entries(value_objs, field_ids, header_id=None) -> list:
+    """(header_id, field_id, key, value_obj) برای مقادیر فیلدهای یکتا؛ بدون header_id از رکورد خود مقدار خوانده می‌شود."""
+    entries = []
+    for value_obj in value_objs:
+        if value_obj.field_id in field_ids:
+            key = unique_key(value_obj)
+            if key is not None:
+                owner_id = header_id
+                if owner_id is None:
+                    owner_id = value_obj.header_id if isinstance(value_obj, HeaderValue) else value_obj.item.header_id
+                entries.append((owner_id, value_obj.field_id, key, value_obj))
+    return entries
+
+
+def _conflict(entries):
+    """مقداری که درج کلیدها را رد کرده است: تکرار درون همین دسته یا کلیدی که از قبل ثبت شده."""
+    counts = Counter((field_id, key) for _, field_id, key, _ in entries)
+    taken = set(
+        UniqueValueKey.objects.filter(
+            field_id__in={field_id for _, field_id, _, _ in entries}, key__in={key for _, _, key, _ in entries},
+        ).values_list('field_id', 'key')
+    )
+    for _, field_id, key, value_obj in entries:
+        if counts[field_id, key] > 1 or (field_id, key) in taken:
+            return value_obj
+    return None
+
+
+def insert_unique_keys(entries) -> None:
+    """
+    کلیدهای (header_id, field_id, key, value_obj) را درج می‌کند. تکراری بودن را ایندکس یکتای دیتابیس
+    تشخیص می‌دهد (بدون بررسی قبلی و بدون race بین درخواست‌های همزمان) و به ValidationError تبدیل می‌شود.
+    """
+    if not entries:
+        return
+    try:
+        # savepoint تا بعد از خطا (که در PostgreSQL کل تراکنش را متوقف می‌کند) بتوان مقدار تکراری را پیدا کرد
+        with transaction.atomic():
+            UniqueValueKey.objects.bulk_create(
+                [UniqueValueKey(header_id=header_id, field_id=field_id, key=key) for header_id, field_id, key, _ in entries],
+                batch_size=UNIQUE_BATCH_SIZE,
+            )
+    except IntegrityError:
+        value_obj = _conflict(entries)
+        if value_obj is None:
+            raise ValidationError("یک یا چند مقدار از فیلدهای یکتا (unique) تکراری است.")
+        raise ValidationError(duplicate_message(value_obj))
+
+
+def sync_unique_keys(record_header, value_objs, unique_fields, created: bool = False) -> None:
+    """کلیدهای یکتای یک رکورد (هدر و اقلام) را با مقادیر فعلی آن همگام می‌کند."""
+    field_ids = {field.pk for field in unique_fields}
+    if not field_ids:
+        # کلیدهای فیلدی که دیگر یکتا نیست هنگام تغییر همان فیلد پاک شده‌اند (records/signals.py)
+        return
+    entries = unique_entries(value_objs, field_ids, header_id=record_header.pk)
+
+    existing = {} if created else {
+        (field_id, key): pk for pk, field_id, key in record_header.unique_keys.values_list('pk', 'field_id', 'key')
+    }
+    wanted = {(field_id, key) for _, field_id, key, _ in entries}
+    stale = [pk for field_key, pk in existing.items() if field_key not in wanted]
+    if stale:
+        UniqueValueKey.objects.filter(pk__in=stale).delete()
+
+    # تکرار یک مقدار در دو ردیف همین رکورد با کلید موجود آن قابل تشخیص نیست و جداگانه بررسی می‌شود
+    counts = Counter((field_id, key) for _, field_id, key, _ in entries)
+    for _, field_id, key, value_obj in entries:
+        if counts[field_id, key] > 1:
+            raise ValidationError(duplicate_message(value_obj))
+    insert_unique_keys([entry for entry in entries if (entry[1], entry[2]) not in existing])
+
+
+@transaction.atomic
+def rebuild_unique_keys(fields=None, batch_size: int = UNIQUE_BATCH_SIZE) -> int:
+    """
+    کلیدهای یکتای فیلدهای داده‌شده (بدون fields کل جدول) را از روی مقادیر موجود از نو می‌سازد؛
+    کلیدهای فیلدهای غیر یکتا فقط پاک می‌شوند. اگر داده قدیمی از قبل تکراری باشد، فقط قدیمی‌ترین مقدار کلید می‌گیرد.
+    """
+    if fields is None:
+        UniqueValueKey.objects.all().delete()
+        fields = list(Field.objects.filter(is_unique=True))
+    else:
+        fields = list(fields)
+        UniqueValueKey.objects.filter(field__in=fields).delete()
+    field_ids = {field.pk for field in fields if field.is_unique}
+    if not field_ids:
+        return 0
+
+    sources = [(HeaderValue, 'header_id'), (ItemValue, 'item__header_id')]
+    for model, header_path in sources:
+        values = (
+            model.objects.filter(field_id__in=field_ids).order_by('pk')
+            .only('field_id', 'value_type', 'value_text', 'value_number', 'value_lookup', 'value_date_gregorian')
+            .annotate(owner_id=F(header_path))
+        )
+        keys = []
+        for value_obj in values.iterator(chunk_size=batch_size):
+            key = unique_key(value_obj)
+            if key is not None:
+                keys.append(UniqueValueKey(header_id=value_obj.owner_id, field_id=value_obj.field_id, key=key))
+            if len(keys) >= batch_size:
+                UniqueValueKey.objects.bulk_create(keys, ignore_conflicts=True)
+                keys = []
+        UniqueValueKey.objects.bulk_create(keys, ignore_conflicts=True)
+    return UniqueValueKey.objects.filter(field_id__in=field_ids).count()
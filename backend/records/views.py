@@ -1,67 +1,151 @@
 # backend/records/views.py
 
+from django.http import FileResponse, StreamingHttpResponse
 from rest_framework import viewsets, status
 from rest_framework.response import Response
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.exceptions import ValidationError
-from rest_framework.filters import SearchFilter # ✅ این رو اضافه کن
-from form_builder.models import Form, Field
-from .models import RecordHeader, HeaderValue
+from rest_framework.settings import api_settings
+from django.db.models import Count, Exists, Max, OuterRef
+from form_builder.models import Form
+from .models import RecordHeader, RecordReference
 from .serializers import (
     RecordHeaderDetailSerializer,
+    RecordHeaderSummarySerializer,
+    RecordItemSerializer,
     RecordCreateUpdateSerializer
 )
-from .services import create_or_update_record
+from .services import create_or_update_record, delete_record
+from .changes import CHANGES_PAGE_SIZE, MAX_CHANGES_PAGE_SIZE, collect_changes
+from .columnar import columnar_page
+from .renderers import ColumnarJSONRenderer
+from .importers import IMPORT_FORMATS, RecordImporter, guess_import_format, iter_import_records
+from .exporters import EXPORT_FORMATS, RecordExporter
+from .lookups import LookupResolver
+from .filters import FieldOrderingFilter, FieldValueFilter, RecordSearchFilter
+from .pagination import RecordCursorPagination, RecordItemPagination
+from .schema import get_form_schema
+from .aggregates import aggregate_records, attach_item_summaries, parse_group_by, parse_metrics
+from raveshgostar_back.conditional import conditional_get
+from raveshgostar_back.profiling import ProfiledViewMixin
+from raveshgostar_back.routing import ReplicaReadMixin
 
 def is_record_referenced(record_header: RecordHeader) -> (bool, str):
-    lookup_fields = Field.objects.filter(field_type='LOOKUP', lookup_form_id=record_header.form_id)
-    
-    for lookup_field in lookup_fields:
-        is_referenced = HeaderValue.objects.filter(
-            field=lookup_field,
-            value_number=record_header.pk
-        ).exists()
-        
-        if is_referenced:
-            referencing_form = lookup_field.form
-            return True, f"این رکورد در فرم '{referencing_form.name}' به عنوان مرجع استفاده شده است."
+    reference = record_header.incoming_references.select_related('field__form').first()
+    if reference:
+        referencing_form = reference.field.form
+        return True, f"این رکورد در فرم '{referencing_form.name}' به عنوان مرجع استفاده شده است."
 
     return False, ""
 
-class RecordViewSet(viewsets.ModelViewSet):
+class RecordViewSet(ProfiledViewMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     # ✅ اضافه کردن قابلیت‌های فیلتر و جستجو
-    filter_backends = [SearchFilter]
-    search_fields = ['values__value_text', 'values__value_number']
+    filter_backends = [RecordSearchFilter, FieldValueFilter, FieldOrderingFilter]
+    pagination_class = RecordCursorPagination
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer]
+    replica_actions = {'list', 'retrieve', 'record_items', 'changes', 'export_records', 'aggregate'}
+
+    def get_form(self) -> Form:
+        if not hasattr(self, '_form'):
+            self._form = Form.objects.get(pk=self.kwargs['form_pk'])
+        return self._form
 
-    ordering = ['-created_at']
+    def get_form_schema(self):
+        return get_form_schema(self.get_form())
 
     def get_queryset(self):
-        return RecordHeader.objects.filter(form_id=self.kwargs['form_pk'])\
-            .prefetch_related('values', 'values__field') # ✅ بهینه‌سازی کوئری
+        # فیلد هر مقدار از ساختار کش‌شده فرم مقداردهی می‌شود، پس values__field واکشی نمی‌شود
+        queryset = RecordHeader.objects.filter(form_id=self.kwargs['form_pk'])\
+            .annotate(is_referenced=Exists(RecordReference.objects.filter(target=OuterRef('pk'))))\
+            .order_by('-created_at', '-id')
+        # لیست فقط مقادیر هدر را نشان می‌دهد و اقلام جداگانه و صفحه‌بندی‌شده خوانده می‌شوند
+        if self.action in ['list', 'changes']:
+            return queryset.prefetch_related('values')
+        if self.action == 'record_items':
+            return queryset
+        return queryset.prefetch_related('values', 'items__values') # ✅ بهینه‌سازی کوئری
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['lookup_resolver'] = LookupResolver()
+        context['form_schema'] = self.get_form_schema()
+        return context
+
+    def get_validators(self):
+        # رکوردهای این فرم، فرم‌های مرجع لوکاپ‌هایش (برچسب‌ها) و فرم‌هایی که به آن ارجاع می‌دهند (قابل حذف بودن)؛
+        # هر ثبت و ویرایش updated_at و هر حذف تعداد رکوردها را عوض می‌کند
+        form = self.get_form()
+        stats = list(
+            RecordHeader.objects.filter(form_id__in=self.get_form_schema().related_form_ids)
+            .values('form_id').annotate(count=Count('pk'), last_updated=Max('updated_at'))
+            .order_by('form_id').values_list('form_id', 'count', 'last_updated')
+        )
+        last_modified = max([form.updated_at] + [last_updated for _, _, last_updated in stats])
+        return (form.pk, form.schema_version, stats), last_modified
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.accepted_renderer.format == ColumnarJSONRenderer.format:
+            return self.columnar_list(queryset)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_summary_serializer(list(queryset if page is None else page))
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    def columnar_list(self, queryset):
+        # مقادیر از values_list خوانده می‌شوند؛ از رکوردها فقط ستون‌های خود هدر برای صفحه‌بندی و خلاصه اقلام لازم است
+        queryset = queryset.prefetch_related(None).only('id', 'created_at', 'updated_at')
+        page = self.paginate_queryset(queryset)
+        data = columnar_page(list(queryset if page is None else page), self.get_form_schema(), LookupResolver())
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_summary_serializer(self, records: list):
+        serializer = self.get_serializer(records, many=True)
+        schema = serializer.context['form_schema']
+        header_values = [value_obj for record in records for value_obj in record.values.all()]
+        schema.attach_values(header_values)
+        # مقادیر لوکاپ کل صفحه با یک کوئری واکشی می‌شوند، نه یک کوئری برای هر مقدار
+        serializer.context['lookup_resolver'].prime(header_values)
+        attach_item_summaries(records, schema)
+        return serializer
 
     def get_serializer_class(self):
-        # ✅ تغییر مهم: برای لیست هم از سریالایزر کامل استفاده می‌کنیم
-        if self.action == 'list':
-            return RecordHeaderDetailSerializer 
+        # لیست خلاصه هدر را برمی‌گرداند؛ جزئیات کامل رکورد همراه اقلام در retrieve است
+        if self.action in ['list', 'changes']:
+            return RecordHeaderSummarySerializer
+        if self.action == 'record_items':
+            return RecordItemSerializer
         if self.action in ['create', 'update', 'partial_update']:
             return RecordCreateUpdateSerializer
         return RecordHeaderDetailSerializer
 
     def create(self, request, *args, **kwargs):
-        form = Form.objects.get(pk=self.kwargs['form_pk'])
+        form = self.get_form()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         record_header = create_or_update_record(form, serializer.validated_data)
-        output_serializer = RecordHeaderDetailSerializer(record_header, context={'request': request})
+        record_header = self.get_queryset().get(pk=record_header.pk)
+        output_serializer = RecordHeaderDetailSerializer(record_header, context=self.get_serializer_context())
         return Response(output_serializer.data, status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
-        form = instance.form
+        form = self.get_form()
         # ✅ اصلاح اصلی: instance به سریالایزر پاس داده شد
         serializer = self.get_serializer(instance, data=request.data)
         serializer.is_valid(raise_exception=True)
         record_header = create_or_update_record(form, serializer.validated_data, instance=instance)
-        output_serializer = RecordHeaderDetailSerializer(record_header, context={'request': request})
+        record_header = self.get_queryset().get(pk=record_header.pk)
+        output_serializer = RecordHeaderDetailSerializer(record_header, context=self.get_serializer_context())
         return Response(output_serializer.data, status=status.HTTP_200_OK)
 
     def destroy(self, request, *args, **kwargs):
@@ -71,4 +155,96 @@ class RecordViewSet(viewsets.ModelViewSet):
             raise ValidationError(f"این رکورد قابل حذف نیست. {reason}")
         
         self.perform_destroy(instance)
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def perform_destroy(self, instance):
+        delete_record(instance)
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    def changes(self, request, *args, **kwargs):
+        """
+        همگام‌سازی تدریجی: ?since=<cursor>&page_size=500
+        رکوردهای ثبت یا ویرایش‌شده بعد از cursor (هم‌شکل ردیف‌های لیست)، شناسه رکوردهای حذف‌شده و cursor بعدی؛
+        تا وقتی has_more درست است درخواست با cursor جدید تکرار می‌شود. بدون since همه رکوردها برمی‌گردند.
+        """
+        try:
+            limit = min(int(request.query_params.get('page_size', CHANGES_PAGE_SIZE)), MAX_CHANGES_PAGE_SIZE)
+        except ValueError:
+            raise ValidationError({'page_size': "باید عدد صحیح باشد."})
+        change_set = collect_changes(self.get_queryset(), self.kwargs['form_pk'], request.query_params.get('since'), max(limit, 1))
+        return Response({
+            'results': self.get_summary_serializer(change_set.records).data,
+            'deleted': change_set.deleted,
+            'cursor': change_set.cursor,
+            'has_more': change_set.has_more,
+        })
+
+    @action(detail=True, methods=['get'], url_path='items')
+    @conditional_get
+    def record_items(self, request, *args, **kwargs):
+        """ردیف‌های اقلام یک رکورد به صورت صفحه‌بندی‌شده (?page_size=100)؛ مقادیر هر صفحه با یک کوئری واکشی می‌شوند."""
+        record_header = self.get_object()
+        paginator = RecordItemPagination()
+        items = paginator.paginate_queryset(record_header.items.prefetch_related('values'), request, view=self)
+
+        serializer = self.get_serializer(items, many=True)
+        item_values = [value_obj for item in items for value_obj in item.values.all()]
+        serializer.context['form_schema'].attach_values(item_values)
+        serializer.context['lookup_resolver'].prime(item_values)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_records(self, request, *args, **kwargs):
+        form = self.get_form()
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"detail": "فایل ورودی (file) ارسال نشده است."}, status=400)
+
+        import_format = request.data.get('format') or guess_import_format(upload.name)
+        if import_format not in IMPORT_FORMATS:
+            return Response({"detail": f"فرمت '{import_format}' پشتیبانی نمی‌شود."}, status=400)
+
+        importer = RecordImporter(form)
+        summary = importer.run(iter_import_records(upload, import_format, importer.item_codes))
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_records(self, request, *args, **kwargs):
+        form = self.get_form()
+        # پارامتر format توسط DRF برای انتخاب renderer رزرو شده است
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"detail": f"فرمت '{export_format}' پشتیبانی نمی‌شود."}, status=400)
+
+        exporter = RecordExporter(form)
+        filename = f"{form.code}.{export_format}"
+        if export_format == 'xlsx':
+            return FileResponse(exporter.write_xlsx(), as_attachment=True, filename=filename)
+
+        if export_format == 'jsonl':
+            response = StreamingHttpResponse(exporter.iter_jsonl(), content_type='application/x-ndjson; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(exporter.iter_csv(), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='aggregate')
+    def aggregate(self, request, *args, **kwargs):
+        """
+        گزارش تجمیعی: ?group_by=customer,date:jalali_month&metrics=sum:qty,count&f.date__gte=1403-01-01
+        فیلترها و جستجو مانند لیست رکوردها اعمال می‌شوند؛ گزارش با یک کوئری GROUP BY (یا دو، اگر معیارهای هدر و اقلام هر دو خواسته شوند) ساخته می‌شود.
+        """
+        schema = self.get_form_schema()
+        group_specs = parse_group_by(request.query_params.get('group_by'), schema.fields_by_code)
+        metric_specs = parse_metrics(request.query_params.get('metrics'), schema.fields_by_code)
+
+        headers = RecordHeader.objects.filter(form_id=self.kwargs['form_pk'])
+        for backend in (RecordSearchFilter, FieldValueFilter):
+            headers = backend().filter_queryset(request, headers, self)
+
+        rows = aggregate_records(headers, group_specs, metric_specs)
+        return Response({
+            'group_by': [spec.name for spec in group_specs],
+            'metrics': [spec.name for spec in metric_specs],
+            'results': rows,
+        })
@@ -1,6 +1,6 @@
 // src/pages/CreateEditRecordPage.jsx
 
-import React, { useState, useEffect, useMemo, useCallback } from "react";
+import React, { useState, useEffect, useMemo, useCallback, useRef } from "react";
 import { useParams, useNavigate, useLocation } from "react-router-dom";
 import { Form, Button, Card, Typography, message, Spin, Row, Col, Space, Divider } from "antd";
 import { PlusOutlined, DeleteOutlined } from "@ant-design/icons";
@@ -43,6 +43,8 @@ const CreateEditRecordPage = () => {
     const [loading, setLoading] = useState(true);
     const [submitting, setSubmitting] = useState(false);
     const [form] = Form.useForm();
+    // شماره‌ای که هنگام باز شدن صفحه فقط نمایش داده شده (رزرو نشده است)
+    const autoIncrementPreview = useRef(null);
 
     const isEditMode = !!recordId && location.pathname.endsWith("/edit");
     const isViewMode = !!recordId && location.pathname.endsWith("/view");
@@ -59,11 +61,17 @@ const CreateEditRecordPage = () => {
     const fetchAndSetAutoIncrementValue = useCallback(
         async (fields) => {
             const autoIncrementField = fields.find((f) => f.has_auto_increment);
+            autoIncrementPreview.current = null;
             if (autoIncrementField) {
                 try {
+                    // GET شماره بعدی را فقط نشان می‌دهد؛ رزرو هنگام ثبت انجام می‌شود تا باز کردن صفحه شماره مصرف نکند
                     const response = await axiosInstance.get(
                         `/forms/${formId}/fields/${autoIncrementField.id}/suggest-auto-increment/`
                     );
+                    autoIncrementPreview.current = {
+                        field: autoIncrementField,
+                        value: response.data.next_value,
+                    };
                     form.setFieldsValue({
                         [autoIncrementField.code]: response.data.next_value,
                     });
@@ -75,6 +83,21 @@ const CreateEditRecordPage = () => {
         [formId, form]
     );
 
+    // اگر کاربر شماره پیشنهادی را تغییر نداده باشد، شماره واقعی هنگام ثبت رزرو می‌شود؛
+    // در حالت تخصیص هنگام ذخیره (reserved=false) مقدار خالی فرستاده می‌شود تا سرور شماره را بدهد
+    const reserveAutoIncrementValue = async (headerValues) => {
+        const preview = autoIncrementPreview.current;
+        if (!preview || headerValues[preview.field.code] !== preview.value) return;
+        const response = await axiosInstance.post(
+            `/forms/${formId}/fields/${preview.field.id}/suggest-auto-increment/`
+        );
+        if (response.data.reserved) {
+            headerValues[preview.field.code] = response.data.next_value;
+        } else {
+            delete headerValues[preview.field.code];
+        }
+    };
+
     useEffect(() => {
         const fetchMetadata = async () => {
             setLoading(true);
@@ -189,12 +212,13 @@ const CreateEditRecordPage = () => {
             })
             .filter(Boolean);
 
-        const apiCall = isEditMode
-            ? axiosInstance.put(`/forms/${formId}/records/${recordId}/`, payload)
-            : axiosInstance.post(`/forms/${formId}/records/`, payload);
-
         try {
-            await apiCall;
+            if (isEditMode) {
+                await axiosInstance.put(`/forms/${formId}/records/${recordId}/`, payload);
+            } else {
+                await reserveAutoIncrementValue(payload.header_values);
+                await axiosInstance.post(`/forms/${formId}/records/`, payload);
+            }
             message.success(`رکورد با موفقیت ${isEditMode ? "ویرایش" : "ثبت"} شد`);
             if (isEditMode) {
                 navigate(`/forms/${formId}/records`);
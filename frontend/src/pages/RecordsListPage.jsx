@@ -16,7 +16,9 @@ const RecordsListPage = () => {
     const navigate = useNavigate();
     const [form, setForm] = useState(null);
     const [records, setRecords] = useState([]);
+    const [nextPageUrl, setNextPageUrl] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [searchTerm, setSearchTerm] = useState("");
 
     const screens = useBreakpoint();
@@ -36,9 +38,9 @@ const RecordsListPage = () => {
                     }
                 );
 
-                let recordsData = recordsResponse.data.results || recordsResponse.data || [];
-                recordsData.sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
-                setRecords(recordsData);
+                // لیست رکوردها صفحه‌بندی cursor دارد و از سمت سرور مرتب شده است
+                setRecords(recordsResponse.data.results || recordsResponse.data || []);
+                setNextPageUrl(recordsResponse.data.next || null);
             } catch (error) {
                 message.error("خطا در دریافت اطلاعات یا فرم مورد نظر یافت نشد");
                 navigate("/");
@@ -64,6 +66,20 @@ const RecordsListPage = () => {
         }
     }, [searchTerm, formId, debouncedFetchData]);
 
+    const loadMore = async () => {
+        if (!nextPageUrl) return;
+        setLoadingMore(true);
+        try {
+            const response = await axiosInstance.get(nextPageUrl);
+            setRecords((prev) => [...prev, ...(response.data.results || [])]);
+            setNextPageUrl(response.data.next || null);
+        } catch (error) {
+            message.error("خطا در دریافت رکوردهای بیشتر");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     // ✅✅✅ اصلاح اصلی و نهایی اینجا انجام شد ✅✅✅
     const handleDelete = async (recordId) => {
         try {
@@ -192,6 +208,13 @@ const RecordsListPage = () => {
                 scroll={{ x: "max-content" }}
                 pagination={{ position: ["bottomCenter"] }}
             />
+            {nextPageUrl && (
+                <div style={{ textAlign: "center", marginTop: "16px" }}>
+                    <Button onClick={loadMore} loading={loadingMore}>
+                        بارگذاری رکوردهای بیشتر
+                    </Button>
+                </div>
+            )}
         </div>
     );
 };